@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_ast_memory.py
+
+Measure memory retained by the AST of a large program for the dict,
+slotted-node and arena representations.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.nlang_parser import NLangParser
+from parser.transpiler import NLangTranspiler
+
+STATEMENTS = [
+    "let x{i} be {i}.",
+    "define y{i} as x{i} plus 2 times 3.",
+    "print \"value \" plus y{i}.",
+    "import module{i}.",
+]
+
+def generate_program(n: int) -> str:
+    """Generate a program of n mixed statements."""
+    return "\n".join(STATEMENTS[i % len(STATEMENTS)].format(i=i) for i in range(n))
+
+def measure(build):
+    """Return (result, retained bytes, seconds) for building an AST."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, elapsed
+
+def walk_seconds(statements) -> float:
+    """Time a full transpilation walk over the statements."""
+    start = time.perf_counter()
+    NLangTranspiler().transpile_program(statements)
+    return time.perf_counter() - start
+
+def main():
+    """Run the benchmark."""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = generate_program(n)
+    dict_parser = NLangParser()
+    compact_parser = NLangParser(compact=True)
+
+    print(f"AST memory for {n} statements")
+    print("=" * 64)
+    print(f"{'representation':<16} {'retained MB':>12} {'bytes/stmt':>11} {'parse s':>9} {'walk s':>8}")
+    for label, build in (
+        ("dict", lambda: dict_parser.parse_program(text)),
+        ("slotted nodes", lambda: compact_parser.parse_program(text)),
+        ("arena", lambda: compact_parser.parse_program_arena(text)),
+    ):
+        statements, retained, elapsed = measure(build)
+        walk = walk_seconds(statements)
+        print(f"{label:<16} {retained / 1e6:>12.1f} {retained / n:>11.0f} {elapsed:>9.2f} {walk:>8.2f}")
+        del statements
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_compile_server.py
+
+Check that one converter gives the same Python when shared by many
+threads as fresh converters do one program at a time, and that a
+program's imports no longer show up in the next one. Then compare the
+latency of compiling through the local compile server with starting the
+batch compiler for every file.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from parser.transpiler import NLangToPython
+from nlang_server import CompileService, connect, make_server, request_compile
+
+# Programs differ in their names, imports and loops, so outputs can be told apart
+PROGRAM = """
+import {module}.
+let value{seed} be {seed}.
+to twice a number n: return n times 2.
+for i from 1 to {seed}, set value{seed} to value{seed} plus twice(i).
+if value{seed} > 10, print value{seed}.
+"""
+
+MODULES = ["math", "json", "random", "os"]
+
+def programs(count: int):
+    return [PROGRAM.format(module=MODULES[seed % len(MODULES)], seed=seed) for seed in range(count)]
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def report(name: str, latencies):
+    print(f"{name:<22} p50 {percentile(latencies, 0.50) * 1000:8.2f} ms   "
+          f"p95 {percentile(latencies, 0.95) * 1000:8.2f} ms")
+
+def check(name: str, passed: bool) -> bool:
+    print(f"{'✓' if passed else '✗'} {name}")
+    return passed
+
+def check_threads(sources) -> bool:
+    expected = [NLangToPython(optimize=False).convert(source) for source in sources]
+    shared = NLangToPython(optimize=False)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(shared.convert, sources))
+    ok = check("a converter shared by 8 threads matches fresh converters", results == expected)
+
+    # Without the optimizer, unused imports are kept, so a leak would show
+    shared.convert("import math. print 1.")
+    ok &= check("imports do not carry over to the next program", "import math" not in shared.convert("print 2."))
+    return ok
+
+def bench_server(sources):
+    service = CompileService(converters=4)
+    expected = [NLangToPython().convert(source) for source in sources]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "nlang.sock")
+        server = make_server(service, unix=path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            connection = connect(unix=path)
+            latencies, results = [], []
+            for source in sources:
+                start = time.perf_counter()
+                results.append(request_compile(connection, source)["python"])
+                latencies.append(time.perf_counter() - start)
+            connection.close()
+
+            def one(source):
+                with_connection = connect(unix=path)
+                try:
+                    return request_compile(with_connection, source)["python"]
+                finally:
+                    with_connection.close()
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                concurrent = list(pool.map(one, sources))
+        finally:
+            server.shutdown()
+            server.server_close()
+    ok = check("server output matches NLangToPython.convert()", results == expected)
+    ok &= check("8 concurrent clients get the same output", concurrent == expected)
+    report("compile server", latencies)
+    return ok
+
+def bench_cold(sources):
+    env = dict(os.environ, NLANG_NO_CACHE="1")
+    latencies = []
+    with tempfile.TemporaryDirectory() as directory:
+        for index, source in enumerate(sources):
+            path = os.path.join(directory, f"program{index}.nlang")
+            with open(path, "w") as f:
+                f.write(source)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(SRC_DIR, "nlang_compile.py"), "-q", "-j", "1", path],
+                           env=env, capture_output=True, check=True)
+            latencies.append(time.perf_counter() - start)
+    report("nlang_compile.py/file", latencies)
+
+def main():
+    sources = programs(200)
+    print("Thread safety")
+    ok = check_threads(sources)
+    print("\nLatency per compile")
+    ok &= bench_server(sources)
+    bench_cold(sources[:20])
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_dataset.py
+
+Compare the lazy dataset engine with loading a whole CSV file into a list
+of dicts first: time and peak Python memory for the same split, filter
+and select, and check that both find the same rows.
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.dataset import load_csv, _parse_value, _unit
+
+COLUMNS = ["id", "sepal_length", "sepal_width", "petal_length", "petal_width", "species"]
+
+def write_csv(path: str, rows: int):
+    """Write an iris-like CSV file with ``rows`` data rows."""
+    rng = random.Random(0)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for n in range(rows):
+            writer.writerow([n, round(rng.uniform(4, 8), 1), round(rng.uniform(2, 4.5), 1),
+                             round(rng.uniform(1, 7), 1), round(rng.uniform(0.1, 2.5), 1),
+                             rng.choice(("setosa", "versicolor", "virginica"))])
+
+def eager(path: str) -> list:
+    """Read every row, then split, filter and select in separate passes."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [dict(zip(header, map(_parse_value, row))) for row in reader]
+    train = [row for n, row in enumerate(rows) if _unit(n, 1) < 0.8]
+    big = [row for row in train if row["sepal_length"] > 6 and row["species"] == "setosa"]
+    return [(row["species"], row["sepal_length"]) for row in big]
+
+def lazy(path: str) -> list:
+    """The same query as one fused, chunked pass."""
+    train, _ = load_csv(path).split(80, 20)
+    # Bound from locals(), as a filter in a procedure binds its variables
+    limit = 6
+    big = train.where(lambda sepal_length, species, limit: sepal_length > limit and species == "setosa", locals())
+    return [row for chunk in big.select("species", "sepal_length").iter_chunks() for row in chunk]
+
+def measure(query, path: str):
+    """Return (result, seconds, peak traced bytes); timed without tracing."""
+    start = time.perf_counter()
+    result = query(path)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    query(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    """Run the benchmark."""
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 200000]
+    print("Split, filter and select over a CSV file")
+    print("=" * 72)
+    print(f"{'rows':>8} {'eager s':>9} {'lazy s':>9} {'eager MiB':>10} {'lazy MiB':>10}  same")
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"iris_{size}.csv")
+            write_csv(path, size)
+            expected, eager_seconds, eager_peak = measure(eager, path)
+            actual, lazy_seconds, lazy_peak = measure(lazy, path)
+            same = expected == actual
+            failures += not same
+            print(f"{size:>8} {eager_seconds:>9.2f} {lazy_seconds:>9.2f} {eager_peak / 2**20:>10.1f} "
+                  f"{lazy_peak / 2**20:>10.1f}  {'✓' if same else '✗'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
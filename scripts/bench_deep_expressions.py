@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_deep_expressions.py
+
+Time parsing, AST building and transpiling of a single statement whose
+expression is a chain of n "plus" terms, for n from 10 up to 1M. Each
+term nests the tree one level deeper, so the time per term should stay
+flat as n grows. Then compile chains through the AST backend, which
+turns them into code objects as deep as Python can compile.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.codegen import MAX_NESTING
+from parser.nlang_parser import NLangParser
+from parser.transpiler import NLangToPython, NLangTranspiler
+
+def generate_chain(n: int, nested: bool = False) -> str:
+    """A let statement adding n terms, left-nested or fully parenthesized to the right."""
+    if nested:
+        return "let total be " + "x plus (" * (n - 1) + "x" + ")" * (n - 1) + "."
+    return "let total be " + " plus ".join(["x"] * n) + "."
+
+def main():
+    """Run the benchmark."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 10000, 100000, 1000000]
+    parser = NLangParser(compact=True)
+    transpiler = NLangTranspiler()
+
+    print("Deep expression chains")
+    print("=" * 64)
+    print(f"{'terms':>8} {'shape':>7} {'parse s':>9} {'transpile s':>12} {'us/term':>9}")
+    for n in sizes:
+        for nested in (False, True):
+            text = generate_chain(n, nested)
+            start = time.perf_counter()
+            statement, = parser.parse_program(text)
+            parsed = time.perf_counter()
+            python_code = transpiler.transpile(statement)
+            done = time.perf_counter()
+            assert python_code.count("x") == n
+            shape = "right" if nested else "left"
+            print(f"{n:>8} {shape:>7} {parsed - start:>9.3f} {done - parsed:>12.3f} {(done - start) / n * 1e6:>9.2f}")
+
+    print()
+    print(f"{'terms':>8} {'compile s':>10}  AST backend")
+    converter = NLangToPython()
+    ok = True
+    for n in (1000, 1500, 5000, MAX_NESTING - 10):
+        namespace = {}
+        start = time.perf_counter()
+        code = converter.compile(generate_chain(n).replace("let total be", "let x be 1. let total be"))
+        done = time.perf_counter()
+        exec(code, namespace)
+        passed = namespace["total"] == n
+        ok &= passed
+        print(f"{n:>8} {done - start:>10.3f}  {'✓' if passed else '✗'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_executor.py
+
+Run many small NLang programs through the pre-forked executor pool and
+through a cold interpreter per program ('python -m nlang -c ...'), and
+report throughput and latency percentiles of both. Then check that each
+resource limit stops a program that breaks it.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from nlang_runtime.executor import ExecutorPool, Limits
+
+# Generated programs differ in their constants, so no two compile alike
+PROGRAM = """
+to score a value v: return v times v plus {seed}.
+let total be 0.
+for i from 1 to {steps}, set total to total plus score(i).
+print total.
+"""
+
+# Programs breaking one limit each: (name, program, expected status)
+HOSTILE = [
+    ("wall-clock timeout", 'import time.\nlet nap be getattr(time, "sleep").\ncall nap(60).', "timeout"),
+    ("CPU limit", "let x be 0.\nwhile true, set x to x plus 1.", "crashed"),
+    ("memory limit", 'let s be "x".\nprint len(s times 4000000000).', "error"),
+    # Opens files named 0 to 199 in the working directory, keeping them all open
+    ("open file limit", "let files be list(map(open, map(str, range(200)))).", "error"),
+]
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def report(name: str, latencies, seconds: float):
+    print(f"{name:<10} {len(latencies) / seconds:8.1f} jobs/s   "
+          f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms   "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms")
+
+def run_cold(programs, workers: int):
+    """Latencies of running each program in a fresh interpreter, ``workers`` at a time."""
+    env = dict(os.environ, NLANG_NO_CACHE="1")
+
+    def run(source):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "nlang", "-c", source], cwd=SRC_DIR, env=env,
+                       capture_output=True, timeout=60)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        return list(threads.map(run, programs))
+
+def main():
+    """Run the benchmark."""
+    workers = os.cpu_count() or 1
+    jobs = 400
+    programs = [PROGRAM.format(seed=seed, steps=200 + seed % 50) for seed in range(jobs)]
+    print(f"{jobs} programs, {workers} worker(s)")
+    print("=" * 72)
+
+    start = time.perf_counter()
+    with ExecutorPool(workers=workers, max_jobs_per_worker=100) as pool:
+        results = list(pool.map(programs))
+        stats = pool.stats()
+    pool_seconds = time.perf_counter() - start
+    report("pool", [result.latency for result in results], pool_seconds)
+
+    cold_jobs = programs[:40]
+    start = time.perf_counter()
+    cold = run_cold(cold_jobs, workers)
+    report("cold", cold, time.perf_counter() - start)
+
+    ok = all(result.status == "ok" for result in results)
+    print(f"{'✓' if ok else '✗'} Every program ran ({stats['ok']} ok)")
+    recycled = stats["started"] >= jobs // 100
+    print(f"{'✓' if recycled else '✗'} Workers recycled every 100 jobs ({stats['started']} started)")
+
+    print("\nResource limits")
+    print("=" * 72)
+    limits = Limits(cpu_seconds=1, memory_bytes=1024 * 1024 * 1024, open_files=64)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(200):
+            open(os.path.join(directory, str(number)), "w").close()
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with ExecutorPool(workers=2, limits=limits, timeout=3) as pool:
+                futures = [(name, expected, pool.submit(source)) for name, source, expected in HOSTILE]
+                survivor = pool.submit(programs[0])
+                for name, expected, future in futures:
+                    result = future.result()
+                    passed = result.status == expected
+                    failures += not passed
+                    print(f"{'✓' if passed else '✗'} {name}: {result.status} ({result.error})")
+                passed = survivor.result().status == "ok"
+                failures += not passed
+                print(f"{'✓' if passed else '✗'} The pool keeps running programs afterwards")
+        finally:
+            os.chdir(cwd)
+    return 0 if ok and recycled and not failures else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
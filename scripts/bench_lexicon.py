@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_lexicon.py
+
+Compile domain packs of growing size into lexicons and measure what each
+size costs: building the lexicon once, opening it afterwards, and
+preprocessing the same program with it. For comparison, time adding the
+same phrases to the built-in phrase regex. Then check the rewriting, that
+lexicons are rebuilt exactly when pack contents change, and that warm
+compilers see pack edits.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser import lexicon
+from parser.lexicon import PackError, compile_packs, reload_packs, use_packs
+from parser.incremental import IncrementalCompiler
+from parser.nlang_parser import NATURAL_LANGUAGE_PHRASES, _compile_preprocessor, preprocess_natural_language
+from parser.transpiler import NLangToPython
+
+# Pack sizes, in phrases, each split over packs of at most this many
+SIZES = [1000, 10000, 50000]
+PHRASES_PER_PACK = 5000
+
+# A program using a few pack phrases among ordinary statements
+STATEMENT = 'Let score{i} be learning rate times {i}. If score{i} is at least 3, say "learning rate".\n'
+
+def write_packs(directory: str, size: int):
+    """Packs defining ``size`` two- and three-word nouns, plus a few fixed phrases."""
+    os.makedirs(directory, exist_ok=True)
+    for start in range(0, size, PHRASES_PER_PACK):
+        nouns = {f"metric {i} value" if i % 2 else f"feature {i}": f"m{i}"
+                 for i in range(start, min(size, start + PHRASES_PER_PACK))}
+        if start == 0:
+            nouns.update({"learning rate": "lr", "learning rate schedule": "lr_schedule"})
+        with open(os.path.join(directory, f"pack{start // PHRASES_PER_PACK:03d}.json"), "w") as f:
+            json.dump({"nouns": nouns, "verbs": {"report": "print"}}, f)
+
+def best_of(function, runs: int = 5) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def check(name: str, passed: bool) -> bool:
+    print(f"{'✓' if passed else '✗'} {name}")
+    return passed
+
+def bench(root: str):
+    program = "".join(STATEMENT.format(i=i) for i in range(2000))
+    use_packs([])
+    baseline = best_of(lambda: preprocess_natural_language(program))
+    print(f"{'phrases':>8} {'packs':>6} {'build':>10} {'open':>10} {'preprocess':>12} {'as regex':>10}")
+    print(f"{0:>8} {0:>6} {'':>10} {'':>10} {baseline * 1000:9.2f} ms")
+    for size in SIZES:
+        directory = os.path.join(root, f"packs{size}")
+        write_packs(directory, size)
+        cache = os.path.join(root, f"cache{size}")
+        start = time.perf_counter()
+        compile_packs([directory], cache).close()
+        build = time.perf_counter() - start
+        opened = best_of(lambda: compile_packs([directory], cache).close())
+
+        use_packs([directory])
+        preprocess = best_of(lambda: preprocess_natural_language(program))
+        use_packs([])
+
+        # The alternative: one regex over every phrase, recompiled whenever packs change
+        phrases = dict(NATURAL_LANGUAGE_PHRASES)
+        phrases.update({f"metric {i} value" if i % 2 else f"feature {i}": f"m{i}" for i in range(size)})
+        start = time.perf_counter()
+        _compile_preprocessor(phrases)
+        as_regex = time.perf_counter() - start
+        packs = len(os.listdir(directory))
+        print(f"{size:>8} {packs:>6} {build * 1000:7.1f} ms {opened * 1000:7.2f} ms "
+              f"{preprocess * 1000:9.2f} ms {as_regex * 1000:7.0f} ms")
+
+def check_rewriting(root: str) -> bool:
+    directory = os.path.join(root, "check")
+    write_packs(directory, 10)
+    use_packs([directory])
+    try:
+        ok = check("longest phrase wins", preprocess_natural_language("let a be learning rate schedule.")
+                   == "let a be lr_schedule.")
+        ok &= check("matches across case and whitespace",
+                    preprocess_natural_language("Report Learning\n  Rate.") == "print lr.")
+        ok &= check("strings and comments are left alone",
+                    preprocess_natural_language('say "learning rate". # learning rate')
+                    == 'print "learning rate". # learning rate')
+        ok &= check("replacements go through the built-in phrases",
+                    preprocess_natural_language("if feature 2 is at least 1, report 1.") == "if m2 >= 1, print 1.")
+    finally:
+        use_packs([])
+    return ok
+
+def check_invalidation(root: str) -> bool:
+    directory = os.path.join(root, "invalidation")
+    cache = os.path.join(root, "invalidation-cache")
+    write_packs(directory, 10)
+    first = compile_packs([directory], cache)
+    pack = os.path.join(directory, "pack000.json")
+
+    # A touched but unchanged pack is hashed again and finds the same lexicon
+    os.utime(pack, ns=(0, 0))
+    touched = compile_packs([directory], cache)
+    ok = check("an unchanged pack reuses its lexicon", touched.digest == first.digest)
+
+    with open(pack) as f:
+        data = json.load(f)
+    data["nouns"]["learning rate"] = "eta"
+    with open(pack, "w") as f:
+        json.dump(data, f)
+    changed = compile_packs([directory], cache)
+    ok &= check("an edited pack gets a new lexicon",
+                changed.digest != first.digest and changed.get("learning rate") == "eta")
+
+    with open(pack, "w") as f:
+        json.dump({"nouns": {"learning-rate": "lr"}}, f)
+    try:
+        compile_packs([directory], cache)
+        ok &= check("a bad phrase is rejected", False)
+    except PackError as e:
+        ok &= check(f"a bad phrase is rejected ({e.message})", True)
+    for opened in (first, touched, changed):
+        opened.close()
+    return ok
+
+def check_live_edits(root: str) -> bool:
+    directory = os.path.join(root, "live")
+    os.makedirs(directory)
+    pack = os.path.join(directory, "pack.json")
+
+    def write(name: str):
+        with open(pack, "w") as f:
+            json.dump({"nouns": {"learning rate": name}}, f)
+
+    write("lr")
+    use_packs([directory])
+    try:
+        converter = NLangToPython(optimize=False)
+        compiler = IncrementalCompiler()
+        program = "let learning rate be 1."
+        before = (converter.convert(program), compiler.compile(program, errors=[]).python,
+                  converter.compile(program).co_names)
+        write("eta")
+        reload_packs()
+        after = (converter.convert(program), compiler.compile(program, errors=[]).python,
+                 converter.compile(program).co_names)
+        # Without a reload the edit shows once the signature is due to be taken again
+        write("mu")
+        time.sleep(lexicon.CHECK_INTERVAL)
+        later = converter.convert(program)
+    finally:
+        use_packs([])
+    ok = check("a warm converter sees an edited pack", "lr = 1" in before[0] and "eta = 1" in after[0])
+    ok &= check("the incremental compiler recompiles statements after a pack edit",
+                "lr = 1" in before[1] and "eta = 1" in after[1])
+    ok &= check("compiled code objects are not reused after a pack edit",
+                "lr" in before[2] and "eta" in after[2])
+    ok &= check("edits are seen without a reload after the check interval", "mu = 1" in later)
+    return ok
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        os.environ["NLANG_CACHE_DIR"] = os.path.join(root, "cache")
+        os.environ.pop(lexicon.PACKS_ENV, None)
+        print("Domain pack lexicons (preprocessing 2000 statements)")
+        bench(root)
+        print()
+        ok = check_rewriting(root)
+        ok &= check_invalidation(root)
+        ok &= check_live_edits(root)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
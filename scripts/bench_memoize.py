@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_memoize.py
+
+Time an expensive procedure called repeatedly with a few distinct
+arguments, plain and with "remembering results", and check that both
+compute the same total. Then check that remembering procedures may not
+call procedures that print or set globals.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.procedures import ProcedureError
+from parser.transpiler import NLangToPython
+
+# A feature computed with a loop, over many rows with few distinct values
+PROGRAM = """
+To score a value v{qualifier}: begin
+    let total be 0.
+    for i from 1 to 2000, set total to total plus v times i divided by (i plus v).
+    return total.
+end.
+let result be 0.
+for row from 1 to {calls}, set result to result plus score(row - {distinct} * int((row - 1) / {distinct})).
+"""
+
+def run(qualifier: str, calls: int, distinct: int):
+    """Return (result, seconds) for one run of the program."""
+    source = PROGRAM.format(qualifier=qualifier, calls=calls, distinct=distinct)
+    code = NLangToPython().compile(source)
+    namespace = {}
+    start = time.perf_counter()
+    exec(code, namespace)
+    return namespace["result"], time.perf_counter() - start
+
+# Remembering procedures whose calls would skip an effect on a cache hit
+IMPURE_CALLS = [
+    ("to bump: set x to 5. to f with n, remembering results: return bump() plus n.", "'x'"),
+    ("to shout: print 1. to g: return shout(). to f with n, remembering results: return g() plus n.", "output"),
+]
+
+def check_impure_calls() -> bool:
+    ok = True
+    for source, expected in IMPURE_CALLS:
+        for backend in ("convert", "compile"):
+            try:
+                getattr(NLangToPython(), backend)(source)
+                passed, message = False, "accepted"
+            except ProcedureError as e:
+                passed, message = expected in e.message, e.message
+            print(f"{'✓' if passed else '✗'} {backend}: {message}")
+            ok &= passed
+    return ok
+
+def main():
+    """Run the benchmark."""
+    calls, distinct = 2000, 20
+    print(f"{calls} calls of a 2000-step procedure with {distinct} distinct arguments")
+    print("=" * 64)
+    plain, plain_seconds = run("", calls, distinct)
+    cached, cached_seconds = run(", remembering results", calls, distinct)
+    same = plain == cached
+    print(f"plain:      {plain_seconds * 1000:8.1f} ms")
+    print(f"remembered: {cached_seconds * 1000:8.1f} ms ({plain_seconds / cached_seconds:.0f}x faster)")
+    print(f"{'✓' if same else '✗'} Same result")
+    same &= check_impure_calls()
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
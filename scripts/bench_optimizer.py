@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_optimizer.py
+
+Compare the Python emitted with and without the optimization pass: size
+of the generated code, time to run it, and that both print the same.
+Then check that small programs whose procedures read and set variables
+print the same either way.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.transpiler import NLangToPython
+
+# Literal-heavy statements with values redefined before use, the shape of
+# the configuration blocks in examples/
+STATEMENTS = [
+    "import module{m}.",
+    "let rate{i} be 0.01.",
+    "let rate{i} be 1 divided by 100 times 2.",
+    "define size{i} as 60 times 60 times 24.",
+    "define label{i} as \"run\" plus \" \" plus \"number\".",
+    "let total{i} be size{i} times rate{i} plus 10 minus 4.",
+    "print label{i} plus \": done\".",
+    "print total{i}.",
+]
+
+# Calls to procedures that set or read the variables around them
+PROCEDURE_PROGRAMS = [
+    "to bump: set x to 5. let x be 1. let y be bump(). print x.",
+    "to report: return x. let x be 1. print report(). let x be 2.",
+    "to bump: set x to 5. to outer: return bump(). let x be 1. let y be outer(). print x plus 1.",
+    "to report: return x. let x be 1. let x be 2. print report() plus x.",
+]
+
+def generate_program(n: int) -> str:
+    """Generate a program of n statements."""
+    return "\n".join(STATEMENTS[i % len(STATEMENTS)].format(i=i // len(STATEMENTS), m=i % 5) for i in range(n))
+
+def run(python_code: str, repeat: int):
+    """Return (stdout, best seconds) for executing the generated code."""
+    code = compile(python_code.replace("import module", "import os as module"), "<bench>", "exec")
+    best = float("inf")
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__bench__"})
+        best = min(best, time.perf_counter() - start)
+    return output.getvalue(), best
+
+def main():
+    """Run the benchmark."""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    text = generate_program(n)
+
+    print(f"Optimization pass on {n} statements")
+    print("=" * 64)
+    print(f"{'pass':<12} {'lines':>7} {'bytes':>9} {'convert s':>10} {'run ms':>8}")
+    results = {}
+    for label, optimize in (("off", False), ("on", True)):
+        converter = NLangToPython(optimize=optimize)
+        start = time.perf_counter()
+        python_code = converter.convert(text)
+        elapsed = time.perf_counter() - start
+        output, seconds = run(python_code, repeat)
+        results[label] = output
+        print(f"{label:<12} {python_code.count(chr(10)) + 1:>7} {len(python_code):>9} {elapsed:>10.3f} {seconds * 1000:>8.2f}")
+
+    assert results["on"] == results["off"], "optimized program printed something different"
+    print("Output identical.")
+
+    for program in PROCEDURE_PROGRAMS:
+        outputs = [run(NLangToPython(optimize=optimize).convert(program), 1)[0] for optimize in (False, True)]
+        assert outputs[0] == outputs[1], f"optimized program printed something different: {program}"
+    print(f"Output identical for {len(PROCEDURE_PROGRAMS)} programs calling procedures.")
+
+if __name__ == "__main__":
+    main()
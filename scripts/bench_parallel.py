@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_parallel.py
+
+Time a CPU-bound "for each" loop run sequentially and "in parallel" on
+every core, both as a summing loop and as a loop that prints, and check
+that the parallel runs give the same total and print the same lines in
+the same order. Then check that loops calling procedures that set
+globals are rejected, on either backend.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.parallel import ParallelLoopError
+from parser.transpiler import NLangToPython
+
+# A per-record feature computed with a loop, summed, then printed per record
+PROGRAM = """
+To score a record r: begin
+    let total be 0.
+    for i from 1 to 5000, set total to total plus r times i divided by (i plus r).
+    return total.
+end.
+let result be 0.
+for each record in range({records}){qualifier}, set result to result plus score(record).
+for each record in range(0, {records}, 10){qualifier}, print score(record).
+"""
+
+def run(qualifier: str, records: int):
+    """Return (result, printed output, seconds) for one run of the program."""
+    code = NLangToPython().compile(PROGRAM.format(qualifier=qualifier, records=records))
+    namespace = {"__name__": "__main__"}
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        exec(code, namespace)
+    return namespace["result"], output.getvalue(), time.perf_counter() - start
+
+# Calls that set a global, directly or through another procedure, which workers would lose
+SHARED_WRITES = [
+    "let hits be 0. to record with x: set hits to hits plus x. "
+    "for each v in range(10) in parallel using 4 workers, call record(v). print hits.",
+    "let hits be 0. to record with x: set hits to hits plus x. to outer with x: return record(x). "
+    "let t be 0. for each v in range(10) in parallel using 2 threads, set t to t plus outer(v).",
+]
+
+def check_shared_writes() -> bool:
+    """Whether both backends reject every program in SHARED_WRITES."""
+    ok = True
+    for program in SHARED_WRITES:
+        for backend in (NLangToPython().convert, NLangToPython().compile):
+            try:
+                backend(program)
+                ok = False
+            except ParallelLoopError:
+                pass
+    print(f"{'✓' if ok else '✗'} Loops calling procedures that set globals are rejected")
+    return ok
+
+def main():
+    """Run the benchmark."""
+    records = 400
+    cores = os.cpu_count() or 1
+    print(f"{records} records through a 5000-step procedure, on {cores} core(s)")
+    print("=" * 64)
+    plain, plain_output, plain_seconds = run("", records)
+    parallel, parallel_output, parallel_seconds = run(" in parallel", records)
+    # Chunks are summed separately, so float totals may differ in the last bits
+    same_total = abs(plain - parallel) <= 1e-9 * abs(plain)
+    same_output = plain_output == parallel_output
+    print(f"sequential: {plain_seconds * 1000:8.1f} ms")
+    print(f"parallel:   {parallel_seconds * 1000:8.1f} ms ({plain_seconds / parallel_seconds:.1f}x faster)")
+    print(f"{'✓' if same_total else '✗'} Same total")
+    print(f"{'✓' if same_output else '✗'} Same output, in the same order")
+    rejected = check_shared_writes()
+    return 0 if same_total and same_output and rejected else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
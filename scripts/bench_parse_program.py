@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_parse_program.py
+
+Benchmark whole-program parsing against the old one-parse-call-per-line loop.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.nlang_parser import NLangParser
+
+STATEMENTS = [
+    "let x{i} be {i}.",
+    "define y{i} as x{i} plus 2 times 3.",
+    "print \"value \" plus y{i}.",
+    "import module{i}.",
+]
+
+def generate_program(n: int, broken_every: int = 0) -> str:
+    """Generate a program of n statements, optionally with every k-th one broken."""
+    lines = []
+    for i in range(n):
+        if broken_every and i % broken_every == 0:
+            lines.append(f"let x{i} be be {i}.")
+        else:
+            lines.append(STATEMENTS[i % len(STATEMENTS)].format(i=i))
+    return "\n".join(lines)
+
+def parse_per_line(parser: NLangParser, text: str) -> int:
+    """The previous strategy: one full parser entry per line."""
+    count = 0
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            try:
+                parser.parse(line)
+                count += 1
+            except Exception:
+                pass
+    return count
+
+def timed(func, *args):
+    """Return (result, seconds) for one call."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    """Run the benchmark."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    parser = NLangParser()
+
+    print("Whole-program parsing benchmark")
+    print("=" * 72)
+    print(f"{'statements':>10} {'errors':>8} {'per-line s':>12} {'program s':>11} {'stmts/s':>12} {'us/stmt':>9}")
+    for n in sizes:
+        for broken_every in (0, 100):
+            text = generate_program(n, broken_every)
+            _, per_line = timed(parse_per_line, parser, text)
+            errors = []
+            statements, whole = timed(parser.parse_program, text, errors)
+            print(f"{n:>10} {len(errors):>8} {per_line:>12.3f} {whole:>11.3f} "
+                  f"{len(statements) / whole:>12.0f} {whole / n * 1e6:>9.2f}")
+
+if __name__ == "__main__":
+    main()
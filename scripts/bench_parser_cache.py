@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_parser_cache.py
+
+Benchmark NLangParser construction: cold start, warm start from the
+on-disk table cache, and warm start from the in-process parser cache.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Runs in a fresh interpreter so each measurement starts from an empty process
+CHILD = """
+import sys, time
+sys.path.insert(0, %r)
+import lark
+from parser.nlang_parser import NLangParser
+start = time.perf_counter()
+NLangParser()
+first = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(100):
+    NLangParser()
+again = (time.perf_counter() - start) / 100
+print(first, again)
+""" % SRC_DIR
+
+def run_child(cache_dir: str):
+    """Construct parsers in a new process and return (first, repeated) timings."""
+    env = dict(os.environ, NLANG_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    first, again = output.split()
+    return float(first), float(again)
+
+def main():
+    """Run the benchmark."""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("NLangParser construction benchmark")
+    print("=" * 50)
+
+    cold, warm_disk, warm_process = [], [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first, again = run_child(cache_dir)
+            cold.append(first)
+            warm_process.append(again)
+            first, again = run_child(cache_dir)
+            warm_disk.append(first)
+            warm_process.append(again)
+
+    def report(label, samples):
+        best = min(samples) * 1000
+        mean = sum(samples) / len(samples) * 1000
+        print(f"{label:<32} best {best:9.3f} ms   mean {mean:9.3f} ms")
+
+    report("cold (build LALR tables)", cold)
+    report("warm (load tables from disk)", warm_disk)
+    report("warm (shared in-process parser)", warm_process)
+    print(f"speedup disk vs cold: {min(cold) / min(warm_disk):.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_preprocess.py
+
+Benchmark the single-pass natural language preprocessor against the
+previous one-re.sub-per-pattern implementation.
+"""
+
+import os
+import re
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.nlang_parser import preprocess_natural_language
+
+LEGACY_PATTERNS = [
+    (r'\bcreate\b', 'define'),
+    (r'\bmake\b', 'define'),
+    (r'\bassign\b', 'set'),
+    (r'\bput\b', 'set'),
+    (r'\bshow\b', 'print'),
+    (r'\bdisplay\b', 'print'),
+    (r'\bsay\b', 'print'),
+    (r'\bannounce\b', 'print'),
+    (r'\bmultiplied by\b', '*'),
+    (r'\bdivided by\b', '/'),
+    (r'\bplus\b', '+'),
+    (r'\bminus\b', '-'),
+    (r'\btimes\b', '*'),
+    (r'\bexceeds\b', '>'),
+    (r'\bis at least\b', '>='),
+    (r'\bis less than\b', '<'),
+    (r'\bequals\b', '=='),
+    (r'\bis\b', '=='),
+]
+
+def legacy_preprocess(text: str) -> str:
+    """The previous implementation, kept here as the baseline."""
+    processed = text.lower()
+    for pattern, replacement in LEGACY_PATTERNS:
+        processed = re.sub(pattern, replacement, processed)
+    return processed
+
+SENTENCES = [
+    'Create total_{i} as {i} multiplied by rate.',
+    'Show "Result is " plus total_{i}.',
+    'If total_{i} is at least limit, announce "Limit exceeds budget".',
+    'Let ratio_{i} be total_{i} divided by count minus 1.  # show the ratio',
+    'Display "Nothing to say here" plus name_{i}.',
+]
+
+def generate_text(size_bytes: int) -> str:
+    """Generate roughly size_bytes of AI-style NLang text."""
+    lines = []
+    total = 0
+    i = 0
+    while total < size_bytes:
+        line = SENTENCES[i % len(SENTENCES)].format(i=i)
+        lines.append(line)
+        total += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+def best_of(func, text, repeat=3):
+    """Best wall time of several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    """Run the benchmark."""
+    sizes_mb = [float(arg) for arg in sys.argv[1:]] or [1, 4, 16]
+    print("Preprocessor benchmark")
+    print("=" * 64)
+    print(f"{'size MB':>8} {'legacy s':>10} {'single-pass s':>14} {'MB/s':>8} {'speedup':>8}")
+    for size in sizes_mb:
+        text = generate_text(int(size * 1024 * 1024))
+        legacy = best_of(legacy_preprocess, text)
+        current = best_of(preprocess_natural_language, text)
+        print(f"{size:>8.1f} {legacy:>10.3f} {current:>14.3f} {size / current:>8.1f} {legacy / current:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
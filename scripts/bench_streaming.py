@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_streaming.py
+
+Compare peak memory of whole-file convert() with the streaming
+convert_file() pipeline on generated programs of growing size.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.transpiler import NLangToPython
+
+STATEMENTS = [
+    "let x{i} be {i}.",
+    "define y{i} as x{i} plus 2 times 3.",
+    "print \"value \" plus y{i}.",
+    "import module{m}.",
+]
+
+def write_program(path: str, n: int):
+    """Write a program of n mixed statements, one per line."""
+    with open(path, 'w') as f:
+        for i in range(n):
+            f.write(STATEMENTS[i % len(STATEMENTS)].format(i=i, m=i % 10) + "\n")
+
+def measure(run):
+    """Return (peak bytes, seconds) for one conversion."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+def main():
+    """Run the benchmark."""
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 300000]
+    converter = NLangToPython()
+    converter.convert("let warmup be 1.")
+
+    print("Peak memory: convert() vs convert_file()")
+    print("=" * 64)
+    print(f"{'statements':>10} {'convert MB':>11} {'s':>7} {'stream MB':>10} {'s':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "program.nlang")
+        target = os.path.join(tmp, "program.py")
+        for n in sizes:
+            write_program(source, n)
+
+            def whole():
+                with open(source) as f:
+                    python_code = converter.convert(f.read())
+                with open(target, 'w') as f:
+                    f.write(python_code + "\n")
+
+            whole_peak, whole_s = measure(whole)
+            stream_peak, stream_s = measure(lambda: converter.convert_file(source, target))
+            print(f"{n:>10} {whole_peak / 1e6:>11.1f} {whole_s:>7.2f} {stream_peak / 1e6:>10.1f} {stream_s:>7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_suite.py
+
+Benchmark every compiler stage and the REPL round trip on synthetic
+programs, writing the results as JSON so runs can be compared across
+versions.
+
+    python scripts/bench_suite.py --sizes 1k,10k,100k,1m -o bench.json
+    python scripts/bench_suite.py --compare bench.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Add src to path
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import lark
+
+from parser.nlang_parser import NLangParser, NLangASTBuilder, preprocess_natural_language, _gc_paused
+from parser.build_info import TRANSPILER_VERSION
+from parser.transpiler import NLangTranspiler
+from nlang_repl import NLangREPL
+
+# Modules imported by generated programs; real ones, so the REPL stage can run them
+MODULES = ["math", "os", "json", "re", "sys"]
+
+# Single-statement stages (parse, REPL) run on at most this many statements
+SAMPLE_LIMIT = 2000
+
+def generate_program(n: int, seed: int = 0, chain_every: int = 50, chain_length: int = 100) -> List[str]:
+    """Generate n statements of mixed let/define/print/import.
+
+    Every ``chain_every``-th statement is a chain of ``chain_length``
+    "plus" terms. Statements only read variables defined before them, so
+    the program runs. The same seed always gives the same program.
+    """
+    rng = random.Random(seed)
+    defined: List[str] = []
+    statements = []
+    for i in range(n):
+        if chain_every and i % chain_every == chain_every - 1 and defined:
+            terms = [rng.choice(defined) if rng.random() < 0.5 else str(rng.randint(1, 9)) for _ in range(chain_length)]
+            statements.append(f"let chain{i} be {' plus '.join(terms)}.")
+            defined.append(f"chain{i}")
+            continue
+        kind = rng.random()
+        if kind < 0.05:
+            statements.append(f"import {rng.choice(MODULES)}.")
+        elif kind < 0.35 or not defined:
+            statements.append(f"let x{i} be {rng.randint(0, 1000)}.")
+            defined.append(f"x{i}")
+        elif kind < 0.55:
+            statements.append(f"define y{i} as {rng.choice(defined)} times {rng.randint(1, 9)} plus {rng.choice(defined)}.")
+            defined.append(f"y{i}")
+        elif kind < 0.7:
+            statements.append(f"create z{i} as \"item {i}\".")
+        elif kind < 0.85:
+            statements.append(f"print {rng.choice(defined)} minus {rng.randint(1, 9)}.")
+        else:
+            statements.append(f"say \"step {i}\".")
+    return statements
+
+def parse_size(text: str) -> int:
+    """Parse a size like 1000, 10k or 1m."""
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def timed(func: Callable[[], Any], repeat: int):
+    """Return (result of the last call, best seconds over ``repeat`` calls)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def run_size(n: int, repeat: int, seed: int, chain_length: int) -> List[Dict[str, Any]]:
+    """Time every stage on a program of n statements."""
+    statements = generate_program(n, seed, chain_length=chain_length)
+    text = "\n".join(statements)
+    sample = statements[:SAMPLE_LIMIT]
+    parser = NLangParser()
+    results = []
+
+    def record(stage: str, count: int, seconds: float):
+        results.append({
+            "stage": stage,
+            "size": n,
+            "statements": count,
+            "seconds": round(seconds, 6),
+            "us_per_statement": round(seconds / count * 1e6, 3) if count else None,
+        })
+        print(f"{n:>9} {stage:<18} {count:>9} {seconds:>10.4f} {results[-1]['us_per_statement']:>11}")
+
+    processed, seconds = timed(lambda: preprocess_natural_language(text), repeat)
+    record("preprocess", n, seconds)
+
+    processed_sample = [preprocess_natural_language(statement) for statement in sample]
+    _, seconds = timed(lambda: [parser.parse(statement) for statement in processed_sample], repeat)
+    record("parse", len(sample), seconds)
+
+    def parse_tree():
+        with _gc_paused():
+            return parser.program_parser.parse(processed)
+    tree, seconds = timed(parse_tree, repeat)
+    record("parse_tree", n, seconds)
+
+    def transform():
+        with _gc_paused():
+            return NLangASTBuilder().transform(tree)
+    _, seconds = timed(transform, repeat)
+    record("ast_builder", n, seconds)
+    del tree
+
+    errors = []
+    program, seconds = timed(lambda: parser.parse_program(processed, errors), repeat)
+    record("parse_program", n, seconds)
+
+    _, seconds = timed(lambda: NLangTranspiler().transpile_program(program), repeat)
+    record("transpile_program", n, seconds)
+    del program
+
+    # The REPL prints every step; its output is discarded
+    def repl():
+        session = NLangREPL()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for statement in sample:
+                session._process_input(statement)
+    _, seconds = timed(repl, repeat)
+    record("repl_process_input", len(sample), seconds)
+    return results
+
+def environment() -> Dict[str, Any]:
+    """Versions and machine details stored with the results."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=SRC_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "transpiler_version": TRANSPILER_VERSION,
+        "lark_version": lark.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """Print per-stage ratios against a baseline run; return how many regressed."""
+    before = {(r["stage"], r["size"]): r for r in baseline["results"]}
+    regressions = 0
+    print()
+    print(f"Compared with {baseline['environment'].get('git_commit') or 'baseline'}")
+    print(f"{'size':>9} {'stage':<18} {'before s':>10} {'after s':>10} {'ratio':>7}")
+    for result in current["results"]:
+        old = before.get((result["stage"], result["size"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{result['size']:>9} {result['stage']:<18} {old['seconds']:>10.4f} {result['seconds']:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark every NLang compiler stage.")
+    parser.add_argument("--sizes", default="1k,10k,100k", help="comma-separated program sizes, e.g. 1k,10k,100k,1m")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, best is kept (1 for sizes of 100k and up)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the program generator")
+    parser.add_argument("--chain-length", type=int, default=100, help="terms in each deep plus chain")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    print("NLang benchmark suite")
+    print("=" * 64)
+    print(f"{'size':>9} {'stage':<18} {'stmts':>9} {'seconds':>10} {'us/stmt':>11}")
+    results = []
+    for n in (parse_size(size) for size in args.sizes.split(",")):
+        repeat = 1 if n >= 100000 else args.repeat
+        results.extend(run_size(n, repeat, args.seed, args.chain_length))
+
+    report = {
+        "environment": environment(),
+        "config": {"seed": args.seed, "chain_length": args.chain_length, "repeat": args.repeat,
+                   "sample_limit": SAMPLE_LIMIT},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, report, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_symbols.py
+
+Time "did you mean" lookups in symbol tables of growing size against a
+linear edit-distance scan of every name, check that both find the same
+names, and check the messages a program with a misspelled name gets.
+"""
+
+import os
+import random
+import subprocess
+import sys
+import time
+
+# Add src to path
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from parser.symbols import SymbolTable, _distance, _max_distance
+
+SIZES = [1000, 10000, 100000, 300000]
+QUERIES = 50
+
+WORDS = ["loss", "rate", "model", "train", "test", "score", "batch", "epoch", "weight", "layer",
+         "count", "total", "value", "index", "label", "feature", "sample", "error", "step", "size"]
+
+def identifiers(count: int, rng: random.Random):
+    """Distinct names made of two or three words and a number, like generated code has."""
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.choice((2, 3)))
+        names.add("_".join(words) + str(rng.randrange(1000)))
+    return sorted(names)
+
+def misspell(name: str, rng: random.Random) -> str:
+    position = rng.randrange(len(name))
+    edit = rng.choice(("drop", "swap", "replace"))
+    if edit == "drop":
+        return name[:position] + name[position + 1:]
+    if edit == "swap" and position < len(name) - 1:
+        return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+    return name[:position] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[position + 1:]
+
+def linear(names, query: str):
+    """The closest names within the typo budget, by comparing with every one."""
+    budget = _max_distance(query)
+    scored = [(_distance(query, name, budget), name) for name in names if name != query]
+    best = min((distance for distance, _ in scored), default=budget + 1)
+    return {name for distance, name in scored if distance == best} if best <= budget else set()
+
+def check(name: str, passed: bool) -> bool:
+    print(f"{'✓' if passed else '✗'} {name}")
+    return passed
+
+def bench() -> bool:
+    rng = random.Random(7)
+    ok = True
+    print(f"{'names':>8} {'build':>10} {'indexed':>12} {'linear scan':>14} {'same best':>10}")
+    for size in SIZES:
+        names = identifiers(size, rng)
+        start = time.perf_counter()
+        table = SymbolTable(names)
+        build = time.perf_counter() - start
+        queries = [misspell(rng.choice(names), rng) for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        found = [table.suggest(query) for query in queries]
+        indexed = (time.perf_counter() - start) / QUERIES
+
+        # The scan is slow enough at the larger sizes that a few queries tell the story
+        sample = queries[:QUERIES if size <= 10000 else 3]
+        start = time.perf_counter()
+        expected = [linear(names, query) for query in sample]
+        scanned = (time.perf_counter() - start) / len(sample)
+
+        agree = sum(1 for suggestion, best in zip(found, expected)
+                    if (suggestion[0] if suggestion else None) in best or not (suggestion or best))
+        print(f"{size:>8} {build * 1000:7.0f} ms {indexed * 1000:9.2f} ms {scanned * 1000:11.1f} ms "
+              f"{agree:>6}/{len(sample)}")
+        ok &= agree >= len(sample) * 0.9
+    return check("indexed lookups match the linear scan's best name (90%+)", ok)
+
+def check_messages() -> bool:
+    cases = [
+        ("let total be 0.\nfor i from 1 to 3, set total to total plus i.\nprint totl.",
+         'line 3: I couldn\'t find a variable called "totl". Did you mean "total"?'),
+        ("let learning_rate be 0.1.\nprint lr times 2.",
+         'line 2: I couldn\'t find a variable called "lr". Did you mean "learning_rate"?'),
+        ("print len(rnage(3)).", 'Did you mean "range"?'),
+        ("let x be 1.\nprint nothing_like_it.", 'I couldn\'t find a variable called "nothing_like_it".'),
+    ]
+    env = dict(os.environ, NLANG_NO_CACHE="1")
+    ok = True
+    for program, expected in cases:
+        result = subprocess.run([sys.executable, "-m", "nlang", "-c", program], cwd=SRC_DIR, env=env,
+                                capture_output=True, text=True)
+        message = result.stderr.strip()
+        ok &= check(f"{message}", expected in message and "Traceback" not in message)
+    return ok
+
+def main():
+    print("Symbol table lookups (per misspelled name)")
+    ok = bench()
+    print()
+    ok &= check_messages()
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
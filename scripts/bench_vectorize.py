@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_vectorize.py
+
+Time "for each" reductions over NumPy arrays with loop vectorization off
+and on, and check that both compute the same totals. Needs numpy.
+"""
+
+import math
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.optimizer import NLangOptimizer
+from parser.transpiler import NLangToPython
+
+# A sum, a filtered count and a filtered sum of an element-wise expression
+PROGRAM = """
+let total be 0.
+let count be 0.
+let spread be 0.
+for each x in values, set total to total + x * x.
+for each y in values, if y > 0.5, set count to count + 1.
+for each z in values, if z < 0.25 do begin set spread to spread + z. end.
+for each w in values, if w >= 0.9, set spread to spread + (w - 0.9) * 10.
+"""
+
+def run(converter: NLangToPython, values, repeat: int):
+    """Return (namespace after one run, best seconds)."""
+    code = converter.compile(PROGRAM)
+    best = float("inf")
+    namespace = None
+    for _ in range(repeat):
+        namespace = {"values": values}
+        start = time.perf_counter()
+        exec(code, namespace)
+        best = min(best, time.perf_counter() - start)
+    return namespace, best
+
+def main():
+    """Run the benchmark."""
+    try:
+        import numpy
+    except ImportError:
+        print("numpy is not installed; nothing to benchmark.")
+        return 0
+
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 100000, 1000000]
+    loop = NLangToPython(optimize=True)
+    loop.optimizer = NLangOptimizer(vectorize_loops=False)
+    vector = NLangToPython(optimize=True)
+
+    print("Vectorized reductions over float64 arrays")
+    print("=" * 64)
+    print(f"{'elements':>9} {'loop ms':>10} {'vector ms':>10} {'speedup':>8}  same")
+    failures = 0
+    for size in sizes:
+        values = numpy.random.default_rng(0).random(size)
+        repeat = 3 if size >= 100000 else 20
+        expected, loop_seconds = run(loop, values, repeat)
+        actual, vector_seconds = run(vector, values, repeat)
+        # NumPy sums floats pairwise, so the last bits may differ
+        same = all(math.isclose(expected[name], actual[name], rel_tol=1e-9)
+                   for name in ("total", "count", "spread"))
+        failures += not same
+        print(f"{size:>9} {loop_seconds * 1000:>10.2f} {vector_seconds * 1000:>10.2f} "
+              f"{loop_seconds / vector_seconds:>7.1f}x  {'✓' if same else '✗'}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+scripts/test_artifact_cache.py
+
+Check the on-disk artifact cache: compiled programs come back for the
+same source, filename and variant only, a damaged artifact is a miss,
+the least recently used artifacts are evicted once the cache grows past
+max_bytes, and a disabled cache (or NLANG_NO_CACHE) reads and writes
+nothing.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.artifact_cache import ArtifactCache
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def artifact(index: int):
+    """(source, python, code) of a small program."""
+    python = f"x = {index}\n"
+    return f"let x be {index}.", python, compile(python, "<test>", "exec")
+
+def cache_bytes(directory: str) -> int:
+    """Total size of the artifacts in a cache directory."""
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+def test_round_trip():
+    """A stored program is returned for its source, filename and variant only."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArtifactCache(directory, enabled=True)
+        source, python, code = artifact(1)
+        check("an empty cache misses", cache.get(source, "a.nlang") is None)
+        cache.put(source, python, code, "a.nlang")
+        found = cache.get(source, "a.nlang")
+        namespace = {}
+        exec(found[1], namespace)
+        check("the stored Python and code come back", found[0] == python and namespace["x"] == 1)
+        check("another filename misses", cache.get(source, "b.nlang") is None)
+        check("another source misses", cache.get(source + " ", "a.nlang") is None)
+        check("another variant misses",
+              ArtifactCache(directory, enabled=True, variant="concurrent").get(source, "a.nlang") is None)
+        check(f"hits and misses are counted ({cache.hits}, {cache.misses})", (cache.hits, cache.misses) == (1, 3))
+
+def test_corrupt_artifact():
+    """A damaged artifact is a miss, not an error."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArtifactCache(directory, enabled=True)
+        source, python, code = artifact(1)
+        cache.put(source, python, code, "a.nlang")
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(b"NLC1 not an artifact")
+        check("a damaged artifact misses", cache.get(source, "a.nlang") is None)
+        check("and counts as a miss", cache.misses == 1)
+
+def test_eviction():
+    """Past max_bytes, the least recently used artifacts are deleted."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ArtifactCache(directory, enabled=True)
+        for index in range(2):
+            cache.put(*artifact(index), "a.nlang")
+        size = cache_bytes(directory)
+        # Age both artifacts, then read the first: it becomes the most recent
+        for name in os.listdir(directory):
+            os.utime(os.path.join(directory, name), (1000, 1000))
+        source = artifact(0)[0]
+        check("the first artifact is found", cache.get(source, "a.nlang") is not None)
+        cache.max_bytes = size
+        cache.put(*artifact(2), "a.nlang")
+        check("the cache stays within max_bytes", cache_bytes(directory) <= size)
+        check("the artifact just read is kept", cache.get(source, "a.nlang") is not None)
+        check("the least recently used artifact is evicted", cache.get(artifact(1)[0], "a.nlang") is None)
+        check("the new artifact is kept", cache.get(artifact(2)[0], "a.nlang") is not None)
+
+def test_bypass():
+    """A disabled cache neither reads nor writes artifacts."""
+    with tempfile.TemporaryDirectory() as directory:
+        source, python, code = artifact(1)
+        ArtifactCache(directory, enabled=True).put(source, python, code, "a.nlang")
+        disabled = ArtifactCache(directory, enabled=False)
+        check("a disabled cache misses", disabled.get(source, "a.nlang") is None)
+        disabled.put(*artifact(2), "a.nlang")
+        check("a disabled cache writes nothing", len(os.listdir(directory)) == 1)
+        check("and counts nothing", (disabled.hits, disabled.misses) == (0, 0))
+        previous = os.environ.get("NLANG_NO_CACHE")
+        os.environ["NLANG_NO_CACHE"] = "1"
+        try:
+            check("NLANG_NO_CACHE disables the cache", ArtifactCache(directory).get(source, "a.nlang") is None)
+        finally:
+            if previous is None:
+                del os.environ["NLANG_NO_CACHE"]
+            else:
+                os.environ["NLANG_NO_CACHE"] = previous
+
+def main():
+    print("Testing the artifact cache...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_round_trip, test_corrupt_artifact, test_eviction, test_bypass):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All artifact cache checks passed." if not failed else "Some artifact cache checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+scripts/test_codegen.py
+
+Check the direct Python-AST backend against the text backend: compile()
+must run every program exactly as exec() of convert() does, cache its
+code objects, point tracebacks at NLang lines and compile expressions
+nested deeper than the recursion limit.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import traceback
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.transpiler import NLangToPython
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+PROGRAMS = [
+    'let x be 2 times 3 plus 1. print x.',
+    'let s be "a" plus "b". print s plus "c".',
+    'let n be 0. while n < 3, set n to n plus 1. print n.',
+    'for i from 1 to 3, if i > 1, print i, otherwise print 0.',
+    'to square a number n: return n times n. print square(7).',
+    'to fib with n, remembering results: if n < 2, return n, otherwise return fib(n minus 1) plus fib(n minus 2). print fib(30).',
+    'let total be 0. for each x in range(5), set total to total plus x. print total.',
+    'let x be 1 divided by 0.',
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def run(code) -> str:
+    """What running compiled code or Python source prints, or how it fails."""
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, {"__name__": "__test__"})
+    except Exception as e:
+        output.write(f"{type(e).__name__}: {e}")
+    return output.getvalue()
+
+def test_same_output():
+    """compile() and convert() run every program the same way."""
+    converter = NLangToPython()
+    programs = PROGRAMS + [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.nlang')))]
+    for program in programs:
+        first_line = program.strip().splitlines()[0]
+        check(f"same output: {first_line[:60]}", run(converter.compile(program)) == run(converter.convert(program)))
+
+def test_code_cache():
+    """Code objects are reused for the same source and filename only."""
+    converter = NLangToPython()
+    program = PROGRAMS[0]
+    code = converter.compile(program, "a.nlang")
+    check("the same program compiles to the same code object", converter.compile(program, "a.nlang") is code)
+    check("another filename gets its own code object", converter.compile(program, "b.nlang") is not code)
+    check("an edited program is compiled again", converter.compile(program + " print 2.", "a.nlang") is not code)
+    converter = NLangToPython()
+    converter.CODE_CACHE_SIZE = 2
+    for index in range(5):
+        converter.compile(f"print {index}.")
+    check("the code cache keeps at most CODE_CACHE_SIZE programs", len(converter._code_cache) == 2)
+
+def test_traceback_lines():
+    """A run-time error is reported at its NLang file and line."""
+    program = "let a be 1.\nlet b be 2.\n\nprint a divided by (b minus 2)."
+    try:
+        exec(NLangToPython().compile(program, "divide.nlang"), {})
+    except ZeroDivisionError as e:
+        frame = traceback.extract_tb(e.__traceback__)[-1]
+        check(f"error at divide.nlang line 4 (got {frame.filename} line {frame.lineno})",
+              (frame.filename, frame.lineno) == ("divide.nlang", 4))
+    else:
+        check("dividing by zero fails", False)
+
+def test_deep_expressions():
+    """Expressions deeper than the recursion limit compile, and the limit is restored."""
+    limit = sys.getrecursionlimit()
+    terms = limit * 2
+    program = "let x be " + " plus ".join(["1"] * terms) + ". print x."
+    output = run(NLangToPython(optimize=False).compile(program))
+    check(f"a sum of {terms} terms compiles and runs", output == f"{terms}\n")
+    check("the recursion limit is restored", sys.getrecursionlimit() == limit)
+
+def main():
+    print("Testing the Python-AST backend...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_same_output, test_code_cache, test_traceback_lines, test_deep_expressions):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All code generation checks passed." if not failed else "Some code generation checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+scripts/test_compile_server.py
+
+Check the compile server end to end: a program sent over TCP or a Unix
+socket comes back as NLangToPython.convert() would write it, many
+programs on one connection and from many clients at once; statements that
+do not parse and programs that are rejected are reported as errors;
+malformed requests are refused; and /stats counts what was served.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_server import CompileService, connect, make_server, request_compile
+from parser.transpiler import NLangToPython
+
+# Programs differ in their names and imports, so outputs can be told apart, as in bench_compile_server.py
+PROGRAM = """
+import {module}.
+let value{seed} be {seed}.
+to twice a number n: return n times 2.
+for i from 1 to {seed}, set value{seed} to value{seed} plus twice(i).
+if value{seed} > 10, print value{seed}.
+"""
+
+MODULES = ["math", "json", "random", "os"]
+
+SOURCES = [PROGRAM.format(module=MODULES[seed % len(MODULES)], seed=seed) for seed in range(24)]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+class Server:
+    """A compile server on a thread, on a free localhost port or a Unix socket."""
+
+    def __init__(self, unix: bool):
+        self.directory = tempfile.TemporaryDirectory()
+        self.unix = os.path.join(self.directory.name, "nlang.sock") if unix else None
+        self.service = CompileService(converters=2)
+        self.server = make_server(self.service, port=0, unix=self.unix)
+        self.port = None if unix else self.server.server_address[1]
+        # Polled often, so shutdown() returns quickly
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def connect(self):
+        """A new connection to the server."""
+        return connect(port=self.port, unix=self.unix, timeout=30)
+
+    def __enter__(self) -> "Server":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+def test_round_trip():
+    """Programs come back as convert() writes them, over either transport."""
+    expected = [NLangToPython().convert(source) for source in SOURCES]
+    for unix in (False, True):
+        transport = "a Unix socket" if unix else "TCP"
+        with Server(unix) as server:
+            connection = server.connect()
+            results = [request_compile(connection, source) for source in SOURCES]
+            connection.close()
+            check(f"{len(SOURCES)} programs on one connection over {transport} match convert()",
+                  [result["python"] for result in results] == expected)
+            check("and report no errors", all(result["errors"] == [] for result in results))
+
+            def one(source):
+                connection = server.connect()
+                try:
+                    return request_compile(connection, source)["python"]
+                finally:
+                    connection.close()
+
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                concurrent = list(pool.map(one, SOURCES))
+            check(f"6 clients at once over {transport} get the same output", concurrent == expected)
+
+def test_errors():
+    """Parse errors are reported with their lines; rejected programs get no Python."""
+    with Server(unix=True) as server:
+        connection = server.connect()
+        result = request_compile(connection, "let a be 1.\nprint a b c.\nprint a.")
+        check(f"a statement that does not parse is reported at its line ({result['errors'][0]['line']})",
+              [error["line"] for error in result["errors"]] == [2])
+        check("the other statements are compiled", "print(1)" in result["python"])
+        result = request_compile(connection, "let last be 0.\nfor each v in range(9) in parallel, set last to v.")
+        check("a rejected program gets no Python", result["python"] is None and "cannot set 'last'"
+              in result["errors"][0]["message"])
+        for body, status in ((json.dumps({"text": "print 1."}), 400), ("not json", 400),
+                             (json.dumps({"source": 1}), 400)):
+            connection.request("POST", "/compile", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            check(f"a malformed request is refused ({body!r} -> {response.status})", response.status == status)
+        connection.request("GET", "/nowhere")
+        response = connection.getresponse()
+        response.read()
+        check("an unknown endpoint is not found", response.status == 404)
+        connection.request("GET", "/stats")
+        stats = json.loads(connection.getresponse().read())
+        check(f"/stats counts requests and failures ({stats})",
+              (stats["requests"], stats["failed"], stats["converters"]) == (2, 2, 2))
+        connection.close()
+
+def main():
+    print("Testing the compile server...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_round_trip, test_errors):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All compile server checks passed." if not failed else "Some compile server checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
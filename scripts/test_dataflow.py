@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+scripts/test_dataflow.py
+
+Check concurrent execution of top-level statements: a step starts only
+after the steps it waits for, ready steps start in source order, no more
+than max_workers run at once, and after a failure no later step starts
+while earlier ones still run. A program compiled with --concurrent prints
+what the plain program prints, in the same order.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.dataflow import run
+from parser.transpiler import NLangToPython
+
+class Recorder:
+    """Makes steps that log when they start and finish, and tracks how many overlap."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.active = 0
+        self.most_active = 0
+
+    def step(self, index: int, seconds: float = 0.0, error: Optional[Exception] = None):
+        """A step that sleeps for ``seconds``, then raises ``error`` if given."""
+        def function():
+            with self.lock:
+                self.events.append(("start", index))
+                self.active += 1
+                self.most_active = max(self.most_active, self.active)
+            time.sleep(seconds)
+            with self.lock:
+                self.active -= 1
+                self.events.append(("end", index))
+            if error is not None:
+                raise error
+        return function
+
+    def started(self):
+        """The steps that started, in order."""
+        return [index for event, index in self.events if event == "start"]
+
+    def position(self, event: str, index: int) -> int:
+        """Where a step's start or end falls among all events."""
+        return self.events.index((event, index))
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def test_order():
+    """Steps wait for their dependencies; steps on the calling thread run in source order."""
+    recorder = Recorder()
+    run([(recorder.step(0, 0.05), (), True),
+         (recorder.step(1), (), False),
+         (recorder.step(2), (0,), False),
+         (recorder.step(3), (1,), False)])
+    check("every step ran once", sorted(recorder.started()) == [0, 1, 2, 3])
+    check("a step starts after what it waits for ends", recorder.position("end", 0) < recorder.position("start", 2))
+    check("a ready step does not wait for a slow, unrelated one",
+          recorder.position("end", 3) < recorder.position("end", 0))
+    recorder = Recorder()
+    run([(recorder.step(index), (), False) for index in range(5)])
+    check("independent steps on the calling thread run in source order", recorder.started() == list(range(5)))
+
+def test_workers():
+    """Offloaded steps overlap, up to max_workers at once."""
+    recorder = Recorder()
+    run([(recorder.step(index, 0.02), (), True) for index in range(6)], max_workers=2)
+    check(f"at most two steps ran at once ({recorder.most_active})", recorder.most_active == 2)
+    check("offloaded steps still start in source order", recorder.started() == list(range(6)))
+
+def test_failure():
+    """After a failure, later steps never start, earlier ones still run, and the earliest error is raised."""
+    recorder = Recorder()
+    steps = [(recorder.step(0, 0.05), (), True),
+             (recorder.step(1), (0,), False),
+             (recorder.step(2, error=ValueError("step 2")), (), True),
+             (recorder.step(3, 0.01, error=KeyError("step 3")), (), False),
+             (recorder.step(4), (), False)]
+    try:
+        run(steps)
+        check("a failing step fails the run", False)
+    except ValueError as e:
+        check("the earliest failure is raised", str(e) == "step 2")
+    check("an earlier step waiting on a slow one still runs", 1 in recorder.started())
+    check(f"no later step starts ({recorder.started()})", 4 not in recorder.started())
+    recorder = Recorder()
+    steps = [(recorder.step(0, 0.05, error=ValueError("step 0")), (), True),
+             (recorder.step(1, error=KeyError("step 1")), (), False)]
+    try:
+        run(steps)
+    except ValueError as e:
+        check("an earlier step failing later wins over a later step failing first", str(e) == "step 0")
+    else:
+        check("an earlier step failing later wins over a later step failing first", False)
+
+def test_program():
+    """A --concurrent program prints what the plain program prints, and stops where it fails."""
+    recorder = Recorder()
+
+    def fetch(n):
+        recorder.step(n, 0.02)()
+        return n
+
+    loads = "\n".join(f"let part{i} be fetch({i}).\nprint part{i}." for i in range(6))
+    program = loads + "\nlet total be 0.\n" + "\n".join(f"set total to total plus part{i}." for i in range(6)) + \
+        "\nprint total."
+    outputs = []
+    for concurrent in (False, True):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            exec(NLangToPython(concurrent=concurrent).compile(program), {"__name__": "__main__", "fetch": fetch})
+        outputs.append(output.getvalue())
+    check("the same lines are printed, in the same order", outputs[0] == outputs[1])
+    check("independent calls overlap", recorder.most_active > 1)
+
+    failing = 'print "first".\nlet x be 1 divided by 0.\nprint "never".'
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(NLangToPython(concurrent=True, optimize=False).compile(failing), {"__name__": "__main__"})
+        check("a failing statement fails the program", False)
+    except ZeroDivisionError:
+        check("statements after a failure do not run", output.getvalue() == "first\n")
+
+def main():
+    print("Testing concurrent statements...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_order, test_workers, test_failure, test_program):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All dataflow checks passed." if not failed else "Some dataflow checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+scripts/test_dataset.py
+
+Check the lazy dataset engine: a fused, chunked pass finds the same rows
+as reading the whole file and splitting, filtering and selecting in
+separate passes, whatever the chunk size; splits are disjoint; fields
+convert to numbers where they can; and a program using the load, split,
+filter and select verbs runs on it.
+"""
+
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.dataset import load_csv, _parse_value, _unit
+from parser.transpiler import NLangToPython
+
+COLUMNS = ["id", "length", "width", "species"]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def write_csv(path: str, rows: int = 200):
+    """Write an iris-like CSV file with ``rows`` data rows."""
+    rng = random.Random(0)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for n in range(rows):
+            writer.writerow([n, round(rng.uniform(4, 8), 1), round(rng.uniform(2, 4.5), 1),
+                             rng.choice(("setosa", "versicolor", "virginica"))])
+
+def eager(path: str) -> list:
+    """Read every row, then split, filter and select in separate passes."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [dict(zip(header, map(_parse_value, row))) for row in reader]
+    train = [row for n, row in enumerate(rows) if _unit(n, 1) < 0.8]
+    big = [row for row in train if row["length"] > 6 and row["species"] == "setosa"]
+    return [(row["species"], row["length"]) for row in big]
+
+def test_matches_eager():
+    """The fused pass finds the rows of separate passes, for any chunk size."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "iris.csv")
+        write_csv(path)
+        expected = eager(path)
+        for chunk_rows in (1, 7, 8192):
+            train, _ = load_csv(path, chunk_rows=chunk_rows).split(80, 20)
+            limit = 6
+            big = train.where(lambda length, species, limit: length > limit and species == "setosa", locals())
+            rows = [row for chunk in big.select("species", "length").iter_chunks() for row in chunk]
+            check(f"chunks of {chunk_rows} rows find the same {len(expected)} rows", rows == expected)
+
+def test_plan():
+    """Steps are fused into one pass that reads only the columns it uses."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "iris.csv")
+        write_csv(path)
+        data = load_csv(path)
+        picked = data.where(lambda width: width > 3).select("species")
+        check("a plan's columns are known before any row is read", picked.columns == ("species",))
+        check(f"only used columns are read: {picked.explain().splitlines()[1].strip()}",
+              "reads width, species," in picked.explain())
+        check("a filter reads variables of the caller", len(data.where(lambda id, n: id < n, {"n": 10})) == 10)
+        try:
+            data.where(lambda nowhere: nowhere)
+            check("an unknown name in a filter is an error", False)
+        except NameError:
+            check("an unknown name in a filter is an error", True)
+        try:
+            data.select("colour")
+            check("selecting a missing column is an error", False)
+        except KeyError:
+            check("selecting a missing column is an error", True)
+
+def test_split():
+    """Split parts are disjoint, reproducible and cover the rows they ask for."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "iris.csv")
+        write_csv(path)
+        data = load_csv(path)
+        first, second = data.split(50, 50)
+        ids = [set(part.column("id")) for part in (first, second)]
+        check("the parts are disjoint", not ids[0] & ids[1])
+        check("together they hold every row", ids[0] | ids[1] == set(range(200)))
+        check("a split is reproducible", set(data.split(50, 50)[0].column("id")) == ids[0])
+        inner, _ = first.split(50, 50)
+        check("splitting a part again keeps a subset of it", set(inner.column("id")) < ids[0])
+        try:
+            data.split(60, 50)
+            check("percentages over 100 are an error", False)
+        except ValueError:
+            check("percentages over 100 are an error", True)
+
+def test_values():
+    """Fields become ints or floats where they can; blank lines are skipped and short rows padded."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mixed.csv")
+        with open(path, "w") as f:
+            f.write("a,b,c\n1,2.5,x\n\n2,,y\n3,4\n")
+        rows = load_csv(path, chunk_rows=2).to_list()
+        check(f"rows are converted ({rows})", rows == [{"a": 1, "b": 2.5, "c": "x"}, {"a": 2, "b": None, "c": "y"},
+                                                      {"a": 3, "b": 4, "c": None}])
+        empty = os.path.join(directory, "empty.csv")
+        open(empty, "w").close()
+        check("an empty file has no rows", len(load_csv(empty)) == 0)
+
+def test_program():
+    """The load, split, filter and select verbs run on datasets."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "iris.csv")
+        write_csv(path)
+        program = (f'load dataset iris from csv "{path}".\n'
+                   'split iris into train as 80 percent and test as 20 percent.\n'
+                   'let limit be 6.\n'
+                   'filter train where length > limit and species == "setosa" into big.\n'
+                   'select species, length from big into result.\n')
+        namespace = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(NLangToPython().compile(program), namespace)
+        rows = [tuple(row.values()) for row in namespace["result"]]
+        check("the program finds the rows of separate passes", rows == eager(path))
+
+def main():
+    print("Testing the dataset engine...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_matches_eager, test_plan, test_split, test_values, test_program):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All dataset checks passed." if not failed else "Some dataset checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
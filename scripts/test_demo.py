@@ -63,7 +63,7 @@ def test_transpilation():
     transpiler = NLangToPython()
     test_cases = [
         ("let x be 5.", "x = 5"),
-        ("print \"Hello\".", "print(\"Hello\")"),
+        ("print \"Hello\".", "print('Hello')"),
         ("define y as 10.", "y = 10"),
     ]
     
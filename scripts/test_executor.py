@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+scripts/test_executor.py
+
+Check the executor pool: programs run and report their output and
+errors, a program that runs too long is killed at the timeout, each
+resource limit stops a program that breaks it, workers are replaced
+after their job quota or a kill, and a full queue refuses more jobs.
+"""
+
+import os
+import queue
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.executor import ExecutorPool, Limits
+
+SLEEP = 'import time.\nlet nap be getattr(time, "sleep").\ncall nap({seconds}).'
+
+# Programs breaking one limit each: (name, program, expected status, part of the error)
+HOSTILE = [
+    ("CPU limit", "let x be 0.\nwhile true, set x to x plus 1.", "crashed", "SIGXCPU"),
+    ("memory limit", 'let s be "x".\nprint len(s times 4000000000).', "error", "MemoryError"),
+    ("open file limit", 'import itertools.\nlet repeat be getattr(itertools, "repeat").\n'
+     'let files be list(map(open, repeat("/dev/null", 200))).', "error", "Too many open files"),
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def test_results():
+    """Output, compile errors and run-time errors come back with their status."""
+    with ExecutorPool(workers=1) as pool:
+        result = pool.run("let x be 6.\nprint x times 7.")
+        check(f"a program runs ({result.status}, {result.output!r})", (result.status, result.output) == ("ok", "42\n"))
+        result = pool.run("print 1.\nprint 1 divided by 0.")
+        check(f"a run-time error is reported ({result.error})",
+              result.status == "error" and result.output == "1\n" and "ZeroDivisionError" in result.error)
+        result = pool.run("print 1 2 3.")
+        check("a compile error is reported", result.status == "error" and "Line 1" in result.error)
+        result = pool.run("let total be 1.\nprint totl.")
+        check(f"an undefined name is explained ({result.error})",
+              result.status == "error" and result.error.startswith("Line 2") and '"total"' in result.error)
+        results = list(pool.map(f"print {n}." for n in range(5)))
+        check("map() returns results in order", [result.output for result in results] == [f"{n}\n" for n in range(5)])
+        stats = pool.stats()
+    check(f"jobs are counted ({stats})", (stats["submitted"], stats["ok"], stats["error"]) == (9, 6, 3))
+
+def test_timeout():
+    """A program is killed at the timeout, and its worker replaced."""
+    with ExecutorPool(workers=1, timeout=0.5) as pool:
+        start = time.perf_counter()
+        result = pool.run(SLEEP.format(seconds=60))
+        check(f"a sleeping program times out ({result.error})",
+              result.status == "timeout" and time.perf_counter() - start < 5)
+        after = pool.run("print 1.")
+        check("the next program runs on a new worker", after.status == "ok" and after.worker != result.worker)
+        check("two workers were started", pool.stats()["started"] == 2)
+
+def test_limits():
+    """Each resource limit stops a program that breaks it; the pool keeps running."""
+    limits = Limits(cpu_seconds=1, memory_bytes=1024 * 1024 * 1024, open_files=64)
+    with ExecutorPool(workers=1, limits=limits, timeout=30) as pool:
+        for name, program, status, error in HOSTILE:
+            result = pool.run(program)
+            check(f"{name}: {result.status} ({result.error})", result.status == status and error in result.error)
+        check("the pool keeps running programs afterwards", pool.run("print 1.").status == "ok")
+
+def test_recycling():
+    """Workers are replaced after max_jobs_per_worker jobs."""
+    with ExecutorPool(workers=1, max_jobs_per_worker=2) as pool:
+        results = [pool.run(f"print {n}.") for n in range(5)]
+        check("every program runs", all(result.status == "ok" for result in results))
+        check(f"a worker runs at most two jobs ({[result.worker for result in results]})",
+              len({result.worker for result in results}) == 3 and pool.stats()["started"] == 3)
+
+def test_full_queue():
+    """submit() refuses a job without blocking once the queue is full."""
+    with ExecutorPool(workers=1, max_queue=1) as pool:
+        running = pool.submit(SLEEP.format(seconds=0.5))
+        while not running.running():
+            time.sleep(0.01)
+        queued = pool.submit("print 1.")
+        try:
+            pool.submit("print 2.", block=False)
+            check("a full queue refuses a job", False)
+        except queue.Full:
+            check("a full queue refuses a job", True)
+        check("queued jobs still run", running.result().status == "ok" and queued.result().output == "1\n")
+
+def main():
+    print("Testing the executor pool...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_results, test_timeout, test_limits, test_recycling, test_full_queue):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All executor checks passed." if not failed else "Some executor checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
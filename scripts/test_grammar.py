@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+scripts/test_grammar.py
+
+Check that the full NLang grammar is LALR(1) without conflicts and that
+programs using every construct parse in linear time.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lark import Lark
+from lark.common import ParserConf
+from lark.exceptions import GrammarError
+from lark.parsers.lalr_analysis import LALR_Analyzer
+
+from parser.build_info import DEFAULT_GRAMMAR
+from parser.nlang_parser import NLangParser, preprocess_natural_language
+
+# One statement per construct, in natural-language form
+SAMPLES = [
+    "let x be 5 plus 3 times 2.",
+    "define y as (x minus 1) divided by 2.",
+    "set x to -x.",
+    "print \"Hello world\".",
+    "import math.",
+    "return.",
+    "return x.",
+    "call greet.",
+    "call greet with \"Ada\".",
+    "call greet(\"Ada\", 3).",
+    "print max(x, y, 1).",
+    "if x is 10, print \"ten\".",
+    "if x is at least 10, print \"big\", otherwise print \"small\".",
+    "if x exceeds 1 and not x equals 3 or false do begin print x. set x to 1. end.",
+    "if true begin end otherwise begin print 1. end.",
+    "for each item in items, print item.",
+    "for each item in items, if item exceeds 3, print item, otherwise print 0.",
+    "for i from 1 to 10 do begin print i. end.",
+    "while x is less than 10 do begin set x to x plus 1. if x is 5, print x. end.",
+    "for i from 1 to 3 do begin for each c in word do begin print c. end. end.",
+    "for each record in records in parallel, set total to total plus score(record).",
+    "for each record in records using 8 workers in chunks of 100, print score(record).",
+    "for each url in urls in parallel using n threads do begin let page be fetch(url). print page. end.",
+    "load dataset iris from csv \"iris.csv\".",
+    "load rows from path.",
+    "split iris into train as 80 percent and test as 20 percent.",
+    "filter train where sepal_length exceeds limit and species is \"setosa\" into big.",
+    "select species, sepal_length from big into narrow.",
+    "to greet: print \"hi\".",
+    "to square a number n, remembering 500 results: return n times n.",
+    "to scale a value v by a factor f and an offset o, deterministic: return v times f plus o.",
+    "to sign of x: if x is less than 0, return -1, otherwise return 1.",
+    "to count with a limit n: begin for i from 1 to n, print i. end.",
+]
+
+# Must not parse: comparisons do not chain, an if's inline body is not an if
+REJECTED = [
+    "print 1 < 2 < 3.",
+    "if a, if b, print 1.",
+    "let x be.",
+]
+
+def check_conflicts(grammar_path: str, start: str) -> bool:
+    """Build the LALR tables in strict mode, which raises on any conflict."""
+    parser = Lark.open(grammar_path, parser='lalr', lexer='basic', start=start)
+    try:
+        analyzer = LALR_Analyzer(ParserConf(parser.rules, {}, [start]), strict=True)
+        analyzer.compute_lalr()
+    except GrammarError as e:
+        print(f"✗ '{start}' has conflicts:")
+        print(f"  {e}")
+        return False
+    print(f"✓ '{start}' is LALR(1) without conflicts ({len(analyzer.parse_table.states)} states)")
+    return True
+
+def check_samples(parser: NLangParser) -> bool:
+    """Parse every sample on its own and all of them as one program."""
+    ok = True
+    for sample in SAMPLES:
+        try:
+            parser.parse(preprocess_natural_language(sample))
+            print(f"✓ Parsed: {sample}")
+        except Exception as e:
+            print(f"✗ Failed to parse: {sample}")
+            print(f"  Error: {e}")
+            ok = False
+    for sample in REJECTED:
+        try:
+            parser.parse(preprocess_natural_language(sample))
+            print(f"✗ Accepted: {sample}")
+            ok = False
+        except Exception:
+            print(f"✓ Rejected: {sample}")
+
+    errors = []
+    program = parser.parse_program(preprocess_natural_language("\n".join(SAMPLES)), errors)
+    if errors or len(program) != len(SAMPLES):
+        print(f"✗ Program parse: {len(program)} statements, {len(errors)} errors")
+        ok = False
+    else:
+        print(f"✓ Parsed all {len(SAMPLES)} samples as one program")
+    return ok
+
+def check_linear(parser: NLangParser) -> bool:
+    """Parsing four times the text should take about four times as long."""
+    text = preprocess_natural_language("\n".join(SAMPLES))
+    timings = []
+    for copies in (50, 200):
+        source = "\n".join([text] * copies)
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            parser.parse_program(source, [])
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    ratio = timings[1] / timings[0]
+    ok = ratio < 6
+    print(f"{'✓' if ok else '✗'} 4x the input took {ratio:.1f}x as long")
+    return ok
+
+def main():
+    print("Testing the full grammar...")
+    print("=" * 50)
+    results = [check_conflicts(DEFAULT_GRAMMAR, start) for start in ("start", "program")]
+    parser = NLangParser()
+    results.append(check_samples(parser))
+    results.append(check_linear(parser))
+    print()
+    print("All grammar checks passed." if all(results) else "Some grammar checks failed.")
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+scripts/test_incremental.py
+
+Check incremental compilation: statements split the same whether the
+source arrives whole or in chunks, only edited statements are compiled
+again, moved statements report their new lines, and the result matches
+NLangToPython.convert().
+"""
+
+import contextlib
+import io
+import os
+import sys
+import traceback
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.incremental import IncrementalCompiler, iter_statements, split_statements
+from parser.transpiler import NLangToPython
+
+PROGRAM = """let rate be 0.5.
+let total be 10 times 3.
+if total > 10 do begin
+  print "big".
+  set total to total divided by (rate minus 0.5).
+end.
+# a comment. with periods.
+print "done. really".
+"""
+
+# Programs whose convert() output the optimizer changes, as in test_optimizer.py
+OPTIMIZED = [
+    "let n be 6. print n times 2.",
+    "let r be 1. let r be 2. print r.",
+    "import math. import os. print math.",
+    "to bump: set x to 5. let x be 1. let y be bump(). print x.",
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def error_line(code, filename: str) -> int:
+    """The line in ``filename`` where running the code fails."""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(code, {"__name__": "__test__"})
+    except Exception as e:
+        return [frame for frame in traceback.extract_tb(e.__traceback__) if frame.filename == filename][-1].lineno
+    return 0
+
+def test_split():
+    """Statements, with their lines, are the same however the source is chunked."""
+    statements = split_statements(PROGRAM)
+    # A comment is part of the statement after it
+    check("four statements, at their first lines", [line for _, line in statements] == [1, 2, 3, 7])
+    check("a block is one statement", statements[2][0].startswith("if") and statements[2][0].endswith("end."))
+    for size in (1, 2, 3, 7, 64):
+        chunks = [PROGRAM[start:start + size] for start in range(0, len(PROGRAM), size)]
+        check(f"chunks of {size} characters split the same", list(iter_statements(chunks)) == statements)
+
+def test_hits_and_misses():
+    """Only new or edited statements are compiled."""
+    compiler = IncrementalCompiler()
+    result = compiler.compile(PROGRAM, "<test>", [])
+    check("a new program is all misses", (result.hits, result.misses) == (0, 4))
+    result = compiler.compile(PROGRAM, "<test>", [])
+    check("an unchanged program is all hits", (result.hits, result.misses) == (4, 0))
+    edited = PROGRAM.replace("0.5.", "0.25.", 1)
+    result = compiler.compile(edited, "<test>", [])
+    check("an edited statement is the only miss", (result.hits, result.misses) == (3, 1))
+    stats = compiler.stats()
+    check(f"stats add up ({stats})", (stats["hits"], stats["misses"], stats["entries"]) == (7, 5, 5))
+
+def test_moved_lines():
+    """Statements moved by an edit above them report their new lines."""
+    compiler = IncrementalCompiler()
+    compiler.compile(PROGRAM, "moved.nlang", [])
+    check("the block fails on line 5", error_line(compiler.compile(PROGRAM, "moved.nlang", []).code, "moved.nlang") == 5)
+    shifted = "print 1.\n\n" + PROGRAM
+    result = compiler.compile(shifted, "moved.nlang", [])
+    check("no statement is compiled again but the new one", result.misses == 1)
+    check("the block now fails on line 7", error_line(result.code, "moved.nlang") == 7)
+    repeated = "let x be 2.\nprint 1 divided by (x minus 1).\nlet x be 1.\nprint 1 divided by (x minus 1)."
+    for optimize in (True, False):
+        result = IncrementalCompiler(optimize=optimize).compile(repeated, "repeat.nlang", [])
+        check(f"a repeated statement fails at its own line (optimize={optimize})",
+              error_line(result.code, "repeat.nlang") == 4)
+
+def test_matches_convert():
+    """The Python of an incremental compile is that of convert(), optimizations included."""
+    compiler = IncrementalCompiler()
+    converter = NLangToPython()
+    for program in [PROGRAM] + OPTIMIZED:
+        for attempt in ("compiled", "cached"):
+            python = compiler.compile(program, "<test>", []).python
+            check(f"{attempt} output matches convert(): {program.splitlines()[0]}", python == converter.convert(program))
+
+def main():
+    print("Testing incremental compilation...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_split, test_hits_and_misses, test_moved_lines, test_matches_convert):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All incremental compilation checks passed." if not failed else "Some incremental compilation checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
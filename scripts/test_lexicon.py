@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+scripts/test_lexicon.py
+
+Check domain packs: phrases are rewritten (longest first, across case and
+whitespace, never inside strings or comments), a lexicon is compiled
+again exactly when its packs' contents change, bad phrases are rejected,
+and warm converters, incremental compilers and the artifact cache see a
+pack edit at once after reload_packs() and otherwise within
+CHECK_INTERVAL, but not before.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser import lexicon
+from parser.artifact_cache import ArtifactCache
+from parser.incremental import IncrementalCompiler
+from parser.lexicon import PackError, compile_packs, reload_packs, use_packs
+from parser.nlang_parser import preprocess_natural_language
+from parser.transpiler import NLangToPython
+
+PACK = {
+    "nouns": {"learning rate": "lr", "learning rate schedule": "lr_schedule", "feature 2": "m2"},
+    "verbs": {"report": "print"},
+}
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def write_pack(path: str, pack: dict):
+    """Write a JSON pack, creating its directory."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(pack, f)
+
+@contextlib.contextmanager
+def packs(*paths: str):
+    """Use the given packs, with lexicons compiled into a temporary cache directory."""
+    previous = os.environ.get("NLANG_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["NLANG_CACHE_DIR"] = cache
+        use_packs(list(paths))
+        try:
+            yield
+        finally:
+            use_packs(None)
+            if previous is None:
+                del os.environ["NLANG_CACHE_DIR"]
+            else:
+                os.environ["NLANG_CACHE_DIR"] = previous
+
+def test_rewriting():
+    """Phrases are replaced by their text, before the built-in phrases."""
+    with tempfile.TemporaryDirectory() as root:
+        directory = os.path.join(root, "packs")
+        write_pack(os.path.join(directory, "ml.json"), PACK)
+        with packs(directory):
+            check("the longest phrase wins",
+                  preprocess_natural_language("let a be learning rate schedule.") == "let a be lr_schedule.")
+            check("phrases match across case and whitespace",
+                  preprocess_natural_language("Report Learning\n  Rate.") == "print lr.")
+            check("strings and comments are left alone",
+                  preprocess_natural_language('say "learning rate". # learning rate')
+                  == 'print "learning rate". # learning rate')
+            check("replacements go through the built-in phrases",
+                  preprocess_natural_language("if feature 2 is at least 1, report 1.") == "if m2 >= 1, print 1.")
+        check("without packs nothing is rewritten",
+              preprocess_natural_language("let a be learning rate.") == "let a be learning rate.")
+
+def test_invalidation():
+    """A lexicon is compiled again when its packs' contents change, and only then."""
+    with tempfile.TemporaryDirectory() as root:
+        directory = os.path.join(root, "packs")
+        cache = os.path.join(root, "cache")
+        pack = os.path.join(directory, "ml.json")
+        write_pack(pack, PACK)
+        first = compile_packs([directory], cache)
+        check("a pack is compiled into a lexicon file", any(name.endswith(".nlx") for name in os.listdir(cache)))
+        os.utime(pack, ns=(0, 0))
+        touched = compile_packs([directory], cache)
+        check("a touched but unchanged pack reuses its lexicon", touched.digest == first.digest)
+        write_pack(pack, dict(PACK, nouns={"learning rate": "eta"}))
+        changed = compile_packs([directory], cache)
+        check("an edited pack gets a new lexicon",
+              changed.digest != first.digest and changed.get("learning rate") == "eta")
+        write_pack(pack, PACK)
+        restored = compile_packs([directory], cache)
+        check("editing a pack back finds the earlier lexicon", restored.digest == first.digest)
+        write_pack(os.path.join(directory, "override.json"), {"nouns": {"learning rate": "alpha"}})
+        later = compile_packs([directory], cache)
+        check("a pack later in name order wins", later.get("learning rate") == "alpha")
+        write_pack(pack, {"nouns": {"learning-rate": "lr"}})
+        try:
+            compile_packs([directory], cache)
+            check("a bad phrase is rejected", False)
+        except PackError as e:
+            check(f"a bad phrase is rejected ({e.message})", e.path == pack)
+        for opened in (first, touched, changed, restored, later):
+            opened.close()
+
+def test_live_edits():
+    """Warm compilers see a pack edit after reload_packs(), or once CHECK_INTERVAL has passed."""
+    interval = lexicon.CHECK_INTERVAL
+    with tempfile.TemporaryDirectory() as root:
+        pack = os.path.join(root, "packs", "ml.json")
+        write_pack(pack, {"nouns": {"learning rate": "lr"}})
+        program = "let learning rate be 1."
+        with packs(os.path.dirname(pack)):
+            converter = NLangToPython(optimize=False)
+            compiler = IncrementalCompiler()
+            cache = ArtifactCache(os.path.join(root, "artifacts"), enabled=True)
+            before = (converter.convert(program), compiler.compile(program, errors=[]).python,
+                      converter.compile(program).co_names, cache.key(program, "a.nlang"))
+            write_pack(pack, {"nouns": {"learning rate": "eta"}})
+            reload_packs()
+            after = (converter.convert(program), compiler.compile(program, errors=[]).python,
+                     converter.compile(program).co_names, cache.key(program, "a.nlang"))
+            try:
+                lexicon.CHECK_INTERVAL = 60
+                write_pack(pack, {"nouns": {"learning rate": "mu_rate"}})
+                unchecked = converter.convert(program)
+                lexicon.CHECK_INTERVAL = 0.05
+                time.sleep(0.05)
+                checked = converter.convert(program)
+            finally:
+                lexicon.CHECK_INTERVAL = interval
+    check("a warm converter sees a reloaded pack", "lr = 1" in before[0] and "eta = 1" in after[0])
+    check("the incremental compiler compiles statements again", "lr = 1" in before[1] and "eta = 1" in after[1])
+    check("cached code objects are not reused", "lr" in before[2] and "eta" in after[2])
+    check("artifacts of the old packs are not found", before[3] != after[3])
+    check("an edit is not seen within CHECK_INTERVAL", "eta = 1" in unchecked)
+    check("an edit is seen once CHECK_INTERVAL has passed", "mu_rate = 1" in checked)
+
+def main():
+    print("Testing domain packs...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_rewriting, test_invalidation, test_live_edits):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All domain pack checks passed." if not failed else "Some domain pack checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+scripts/test_optimizer.py
+
+Check each pass of the optimizer on small programs: constant folding,
+constant propagation, dead-store elimination and unused-import removal.
+Every program must print the same optimized or not, and the optimized
+Python for a configuration-heavy program must be smaller and faster.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.transpiler import NLangToPython
+
+# Program, a line the optimized Python must contain, a line it must not
+PASSES = [
+    ("folding", "let x be 2 times 3 plus 1. print x.", "x = 7", "x = 2 * 3 + 1"),
+    ("string folding", 'let s be "a" plus "b". print s.', "s = 'ab'", "s = 'a' + 'b'"),
+    ("propagation", "let n be 6. print n times 2.", "print(12)", "print(n * 2)"),
+    ("propagation of strings", 'let s be "ab". print s plus "c".', "print('abc')", "print(s + 'c')"),
+    ("dead stores", "let r be 1. let r be 2. print r.", "r = 2", "r = 1"),
+    ("dead stores through their own value", "let x be 2. let x be x plus 1. print x.", "x = 3", "x = 2"),
+    ("unused imports", "import math. import os. print math.", "import math", "import os"),
+]
+
+# Programs that must be left as they are, or print the same when changed
+UNCHANGED = [
+    # Division by zero has to fail at run time, where the program wrote it
+    "let x be 1 divided by 0. print x.",
+    # A loop ends propagation: n is read inside it and set after it
+    "let n be 5. for i from 1 to 3, print i times n. set n to n plus 1. print n.",
+    # The last assignment is kept, the variable outlives the program in the REPL
+    "let unused be 3 times 4.",
+    # Procedures read and set the variables around them
+    "to bump: set x to 5. let x be 1. let y be bump(). print x.",
+    "to report: return x. let x be 1. print report(). let x be 2.",
+    "to bump: set x to 5. to outer: return bump(). let x be 1. let y be outer(). print x plus 1.",
+]
+
+# Literal-heavy statements with values redefined before use, as in examples/
+STATEMENTS = [
+    "let rate{i} be 0.01.",
+    "let rate{i} be 1 divided by 100 times 2.",
+    "define size{i} as 60 times 60 times 24.",
+    "define label{i} as \"run\" plus \" \" plus \"number\".",
+    "let total{i} be size{i} times rate{i} plus 10 minus 4.",
+    "print label{i} plus \": done\".",
+    "print total{i}.",
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def body(python_code: str) -> str:
+    """The generated statements, without the header."""
+    return python_code.split('"""\n', 2)[-1]
+
+def run(python_code: str, repeat: int = 1):
+    """Return (stdout, best seconds) for executing the generated code."""
+    code = compile(python_code, "<test>", "exec")
+    best = float("inf")
+    output = io.StringIO()
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                exec(code, {"__name__": "__test__"})
+        except Exception as e:
+            output.write(f"{type(e).__name__}: {e}")
+        best = min(best, time.perf_counter() - start)
+    return output.getvalue(), best
+
+def same_output(program: str) -> bool:
+    """Whether the program prints the same, or fails the same, optimized or not."""
+    outputs = [run(NLangToPython(optimize=optimize).convert(program))[0] for optimize in (False, True)]
+    return outputs[0] == outputs[1]
+
+def test_passes():
+    """Each pass changes what it should and keeps the output."""
+    for name, program, expected, removed in PASSES:
+        lines = body(NLangToPython().convert(program)).splitlines()
+        check(f"{name}: {expected!r} instead of {removed!r}", expected in lines and removed not in lines)
+        check(f"{name}: same output", same_output(program))
+
+def test_unchanged():
+    """Programs the optimizer must not break print the same either way."""
+    for program in UNCHANGED:
+        check(f"same output: {program}", same_output(program))
+    lines = body(NLangToPython().convert(UNCHANGED[0])).splitlines()
+    check("division by zero is not folded", "x = 1 / 0" in lines)
+
+def test_smaller_and_faster():
+    """The optimized Python of a configuration-heavy program is smaller and runs faster."""
+    text = "\n".join(STATEMENTS[i % len(STATEMENTS)].format(i=i // len(STATEMENTS)) for i in range(2000))
+    plain = NLangToPython(optimize=False).convert(text)
+    optimized = NLangToPython(optimize=True).convert(text)
+    # Timed in turns, so a burst of other load slows both alike
+    plain_seconds = optimized_seconds = float("inf")
+    for _ in range(5):
+        plain_output, seconds = run(plain, 5)
+        plain_seconds = min(plain_seconds, seconds)
+        optimized_output, seconds = run(optimized, 5)
+        optimized_seconds = min(optimized_seconds, seconds)
+    check(f"optimized code is smaller ({len(optimized)} bytes, not {len(plain)})", len(optimized) < len(plain))
+    check(f"optimized code runs faster ({optimized_seconds * 1000:.2f} ms, not {plain_seconds * 1000:.2f} ms)",
+          optimized_seconds < plain_seconds)
+    check("optimized code prints the same", optimized_output == plain_output)
+
+def main():
+    print("Testing the optimizer...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_passes, test_unchanged, test_smaller_and_faster):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All optimizer checks passed." if not failed else "Some optimizer checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
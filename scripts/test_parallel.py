@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+scripts/test_parallel.py
+
+Check "for each ... in parallel" loops: sums and printed lines are those
+of the sequential loop, on processes and threads and for any chunking;
+loops whose iterations would share a variable, directly or through a
+procedure they call, are rejected; and sys.stdout is restored after a
+loop, even when loops run at once or a chunk fails.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import threading
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.parallel import each, sum_each
+from parser.incremental import IncrementalCompiler
+from parser.parallel import ParallelLoopError
+from parser.transpiler import NLangToPython
+
+# Loop qualifiers, sequential first
+QUALIFIERS = ["", " in parallel using 2 workers", " in parallel using 3 threads",
+              " in parallel using 2 workers in chunks of 1"]
+
+PROGRAM = """
+to square a number n: return n times n.
+let total be 0.
+for each v in range(50){qualifier}, set total to total plus square(v).
+let count be 0.
+for each v in range(50){qualifier}, if v > 20, set count to count plus 1.
+for each v in range(0, 50, 7){qualifier}, print square(v).
+"""
+
+# (program, part of the message, line of the error)
+REJECTED = [
+    ("let hits be 0.\nto record with x: set hits to hits plus x.\n"
+     "for each v in range(10) in parallel using 4 workers, call record(v).", "cannot call 'record'", 3),
+    ("let hits be 0.\nto record with x: set hits to hits plus x.\nto outer with x: return record(x).\n"
+     "let t be 0.\nfor each v in range(10) in parallel using 2 threads, set t to t plus outer(v).",
+     "cannot call 'outer', which sets the global variable 'hits'", 5),
+    ("let last be 0.\nfor each v in range(10) in parallel, set last to v.", "cannot set 'last'", 2),
+    ("let t be 0.\nfor each v in range(10) in parallel, set t to t plus t.", "cannot set 't'", 2),
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def run(program: str):
+    """(total, count, printed output) of running a program."""
+    namespace = {"__name__": "__main__"}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exec(NLangToPython().compile(program), namespace)
+    return namespace["total"], namespace["count"], output.getvalue()
+
+def test_same_results():
+    """Parallel loops sum and print exactly what the sequential loop does."""
+    expected = run(PROGRAM.format(qualifier=""))
+    for qualifier in QUALIFIERS[1:]:
+        check(f"same sums and output:{qualifier}", run(PROGRAM.format(qualifier=qualifier)) == expected)
+    for threads in (False, True):
+        check(f"a generator is summed in chunks (threads={threads})",
+              sum_each(0, lambda x: x, (x for x in range(1000)), workers=2, chunk_size=64, threads=threads)
+              == sum(range(1000)))
+    check("strings are summed in order",
+          sum_each("", str, range(20), workers=3, chunk_size=2, threads=True) == "".join(map(str, range(20))))
+
+def test_rejected():
+    """Loops whose iterations would share a variable are rejected, by every compiler."""
+    for program, message, line in REJECTED:
+        for backend in ("convert", "compile"):
+            try:
+                getattr(NLangToPython(), backend)(program)
+                check(f"{backend} rejects: {message}", False)
+            except ParallelLoopError as e:
+                check(f"{backend} rejects at line {line}: {message}", message in e.message and e.line == line)
+        errors = []
+        IncrementalCompiler().compile(program, "<test>", errors)
+        check(f"incremental compile rejects at line {line}: {message}",
+              [(error.line, message in str(error)) for error in errors] == [(line, True)])
+
+def test_stdout():
+    """sys.stdout is restored after loops run at once, and after a failing chunk."""
+    stdout = sys.stdout
+    captured = io.StringIO()
+    sys.stdout = captured
+    try:
+        barrier = threading.Barrier(2)
+
+        def loop(name: str):
+            barrier.wait()
+            each(range(40), workers=2, chunk_size=3, threads=True)(lambda x: print(f"{name}{x}"))
+
+        runners = [threading.Thread(target=loop, args=(name,)) for name in "ab"]
+        for runner in runners:
+            runner.start()
+        for runner in runners:
+            runner.join()
+        restored = sys.stdout is captured
+        lines = captured.getvalue().split()
+
+        def fail(x):
+            if x == 5:
+                raise ValueError(x)
+            print(x)
+
+        try:
+            each(range(10), workers=2, chunk_size=1, threads=True)(fail)
+            failed = False
+        except ValueError:
+            failed = True
+        restored_after_failure = sys.stdout is captured
+    finally:
+        sys.stdout = stdout
+    check("stdout is restored after loops running at once", restored)
+    for name in "ab":
+        check(f"loop {name} printed every line, in order", [line for line in lines if line[0] == name] ==
+              [f"{name}{x}" for x in range(40)])
+    check("a failing chunk fails the loop", failed)
+    check("stdout is restored after a failure", restored_after_failure)
+
+def main():
+    print("Testing parallel loops...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_same_results, test_rejected, test_stdout):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All parallel loop checks passed." if not failed else "Some parallel loop checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
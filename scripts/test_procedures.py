@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+scripts/test_procedures.py
+
+Check procedures that remember their results: one that prints, calls a
+function for its effects, sets a global or calls a procedure that does
+(directly or through others) is rejected at the line at fault by every
+compiler, pure ones are accepted, and the remembered results are bounded
+as the program asks.
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.incremental import IncrementalCompiler
+from parser.procedures import ProcedureError
+from parser.transpiler import NLangToPython
+
+# (program, part of the message, line of the error)
+REJECTED = [
+    ("to f with n, remembering results: begin\n  let m be n.\n  print m.\n  return m.\nend.",
+     "cannot print", 3),
+    ("to f with n, deterministic: begin\n  if n > 1 do begin\n    call input().\n  end.\n  return n.\nend.",
+     "cannot call 'input' for its effects", 3),
+    ("let g be 0.\nto f with n, remembering results: begin\n  set g to n.\n  return n.\nend.",
+     "cannot set the global variable 'g'", 2),
+    ("to k with n: print n.\nto h with n: return k(n).\nto f with n, remembering results: return h(n).",
+     "cannot call 'h', which has output", 3),
+    ("to bump: set x to 5.\nto f with n, remembering results: return bump() plus n.",
+     "cannot call 'bump', which sets the global variable 'x'", 2),
+    ("to f with n, remembering 0 results: return n.",
+     "must remember a whole, positive number of results", 1),
+]
+
+# (program, what it prints)
+ACCEPTED = [
+    # A local may share a global's name
+    ("let g be 0.\nto f with n, remembering results: begin\n  let g be n.\n  return g.\nend.\nprint f(3).", "3\n"),
+    ("to fib with n, remembering results: if n < 2, return n, otherwise return fib(n minus 1) plus fib(n minus 2).\n"
+     "print fib(60).", "1548008755920\n"),
+    ("to sq with n: return n times n.\nto f with n, remembering 2 results: return sq(n) plus 1.\nprint f(2).", "5\n"),
+    # A nested procedure is its own scope, and is never called here
+    ("to f with n, remembering results: begin\n  to g with m: print m.\n  return n.\nend.\nprint f(1).", "1\n"),
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def run(code) -> str:
+    """What running compiled code prints."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exec(code, {"__name__": "__test__"})
+    return output.getvalue()
+
+def test_rejected():
+    """Remembering procedures with effects are rejected, at the line at fault."""
+    for program, message, line in REJECTED:
+        for backend in ("convert", "compile"):
+            try:
+                getattr(NLangToPython(), backend)(program)
+                check(f"{backend} rejects: {message}", False)
+            except ProcedureError as e:
+                check(f"{backend} rejects at line {line}: {message}", message in e.message and e.line == line)
+        errors = []
+        IncrementalCompiler().compile(program, "<test>", errors)
+        check(f"incremental compile rejects at line {line}: {message}",
+              [(error.line, message in str(error)) for error in errors] == [(line, True)])
+
+def test_accepted():
+    """Pure remembering procedures compile and run."""
+    for program, output in ACCEPTED:
+        check(f"accepted: {program.splitlines()[0]}", run(NLangToPython().compile(program)) == output)
+        errors = []
+        result = IncrementalCompiler().compile(program, "<test>", errors)
+        check("and by the incremental compiler", not errors and run(result.code) == output)
+
+def test_remembered_results():
+    """Results are remembered up to the number asked for; unhashable arguments just run."""
+    namespace = {}
+    exec(NLangToPython().compile("to f with n, remembering 2 results: return n times 2."), namespace)
+    f = namespace["f"]
+    check("the cache holds as many results as asked", f.cache_info().maxsize == 2)
+    for n in (1, 2, 1, 3, 1):
+        f(n)
+    info = f.cache_info()
+    check(f"repeated calls are hits ({info.hits} hits, {info.misses} misses)", (info.hits, info.misses) == (2, 3))
+    check("an unhashable argument runs the procedure", f([1]) == [1, 1] and f.cache_info().misses == 3)
+
+def main():
+    print("Testing remembering procedures...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_rejected, test_accepted, test_remembered_results):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All procedure checks passed." if not failed else "Some procedure checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
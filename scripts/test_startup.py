@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+scripts/test_startup.py
+
+Startup-time budget check for ``python -m nlang``.
+
+Runs the entry point under ``-X importtime`` and compares the time spent
+importing modules against ``python -m`` on an empty module, i.e. plain
+Python. ``--version`` must cost next to nothing on top of that, and a
+one-shot ``-c`` program found in the artifact cache must not load lark
+or the parser.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Extra import time allowed on top of plain Python, in milliseconds
+BUDGETS_MS = {
+    "--version": 2.0,
+    "-c (cached)": 10.0,
+}
+
+# Modules that must never be imported on these paths
+FORBIDDEN = ("lark", "parser.nlang_parser", "parser.incremental", "argparse", "tempfile")
+
+# Runs per measurement; the fastest is kept, as noise only ever adds time
+RUNS = 11
+
+def import_profile(args, env):
+    """Run Python with -X importtime; return (total self import time in ms, module names)."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, env=env,
+                            capture_output=True, text=True, check=True)
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+def best_profile(args, env):
+    """Fastest import time over several runs, and the modules of the last run."""
+    times = []
+    for _ in range(RUNS):
+        total, modules = import_profile(args, env)
+        times.append(total)
+    return min(times), modules
+
+def main():
+    """Run the startup checks."""
+    print("Startup time budget")
+    print("=" * 64)
+    failures = 0
+    # Measure imports, not compiling sources to bytecode on a first run
+    subprocess.run([sys.executable, "-m", "compileall", "-q", SRC_DIR], check=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        # An empty module run with -m is the baseline: the interpreter plus runpy
+        with open(os.path.join(tmp, "nlang_empty_module.py"), "w"):
+            pass
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC_DIR, tmp]),
+                   NLANG_CACHE_DIR=os.path.join(tmp, "cache"))
+        env.pop("NLANG_NO_CACHE", None)
+        env.pop("NLANG_TRACE", None)
+
+        baseline, baseline_modules = best_profile(["-m", "nlang_empty_module"], env)
+        print(f"{'plain python -m':<20} {baseline:>8.2f} ms")
+
+        # Populate the artifact cache, so the timed runs take the cached path
+        subprocess.run([sys.executable, "-m", "nlang", "-c", "print 1."], env=env,
+                       capture_output=True, check=True)
+
+        for label, args in (("--version", ["-m", "nlang", "--version"]),
+                            ("-c (cached)", ["-m", "nlang", "-c", "print 1."])):
+            elapsed, modules = best_profile(args, env)
+            extra = elapsed - baseline
+            loaded = sorted(name for name in modules - baseline_modules
+                            if name.split(".")[0] in FORBIDDEN or name in FORBIDDEN)
+            ok = extra <= BUDGETS_MS[label] and not loaded
+            failures += not ok
+            print(f"{'✓' if ok else '✗'} {label:<18} {elapsed:>8.2f} ms  "
+                  f"({extra:+.2f} ms, budget {BUDGETS_MS[label]:.1f} ms)")
+            if loaded:
+                print(f"  loaded {', '.join(loaded)}")
+            if not ok:
+                extra_modules = sorted(modules - baseline_modules)
+                print(f"  imported beyond plain Python: {', '.join(extra_modules)}")
+
+    print()
+    print("All startup budgets met." if not failures else f"{failures} startup budget(s) exceeded.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
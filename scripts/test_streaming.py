@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+scripts/test_streaming.py
+
+Check the streaming pipeline against whole-program conversion:
+convert_stream() must produce convert()'s Python however the source is
+chunked and batched, hoist imports into the header when asked, report
+parse errors at their lines, and convert_file() must write what it
+streams.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parser.transpiler import NLangToPython
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+PROGRAMS = [
+    'let x be 2 times 3 plus 1.\nprint x.',
+    'let n be 0.\nwhile n < 3, set n to n plus 1.\nprint n.',
+    'to square a number n: return n times n.\nprint square(7).',
+    'for i from 1 to 3 do begin\n  if i > 1, print i, otherwise print 0.\nend.\nprint "done. really".',
+    'import math.\nlet y be 2.\nprint y.\nimport os.\nprint y times 3.',
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def run(python: str) -> str:
+    """What running Python source prints."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        exec(python, {"__name__": "__test__"})
+    return output.getvalue()
+
+def programs():
+    """The test programs, then every example."""
+    return PROGRAMS + [open(path).read() for path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.nlang')))]
+
+def test_matches_convert():
+    """Without hoisting, the streamed lines are convert()'s output."""
+    converter = NLangToPython(optimize=False)
+    for program in programs():
+        expected = converter.convert(program)
+        first_line = program.strip().splitlines()[0][:50]
+        for size in (1, 7, len(program)):
+            chunks = [program[start:start + size] for start in range(0, len(program), size)]
+            for batch_size in (1, 2, 1000):
+                streamed = "\n".join(converter.convert_stream(chunks, batch_size=batch_size))
+                check(f"chunks of {size}, batches of {batch_size}: {first_line}", streamed == expected)
+
+def test_optimized_output():
+    """With the optimizer, a streamed program still runs as the converted one."""
+    converter = NLangToPython()
+    for program in PROGRAMS:
+        for batch_size in (1, 1000):
+            streamed = "\n".join(converter.convert_stream([program], batch_size=batch_size))
+            check(f"same output in batches of {batch_size}: {program.splitlines()[0]}",
+                  run(streamed) == run(converter.convert(program)))
+
+def test_hoisted_imports():
+    """scan_imports() finds every import, and convert_stream() moves them to the header."""
+    converter = NLangToPython(optimize=False)
+    program = PROGRAMS[-1]
+    imports = converter.scan_imports([program])
+    check(f"imports are found ({imports})", imports == ["math", "os"])
+    lines = list(converter.convert_stream([program], imports=imports))
+    body = lines[lines.index("import os") + 1:]
+    check("the header imports both modules", "import math" in lines[:lines.index("import os")])
+    check("the body has no imports", not any(line.startswith("import ") for line in body))
+    check("the program runs the same", run("\n".join(lines)) == run(converter.convert(program)))
+
+def test_error_lines():
+    """A statement that does not parse is reported at its line, whatever the batch."""
+    converter = NLangToPython(optimize=False)
+    program = "let a be 1.\nprint a.\n\nprint a b c.\nprint 2."
+    for batch_size in (1, 2, 1000):
+        errors = []
+        lines = list(converter.convert_stream([program], errors=errors, batch_size=batch_size))
+        check(f"batches of {batch_size}: one error, at line 4", [error.line for error in errors] == [4])
+        check(f"batches of {batch_size}: the other statements are kept", run("\n".join(lines)) == "1\n2\n")
+
+def test_convert_file():
+    """convert_file() writes the streamed, hoisted program."""
+    converter = NLangToPython(optimize=False)
+    program = PROGRAMS[-1]
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "program.nlang")
+        target = os.path.join(directory, "program.py")
+        with open(source, "w") as f:
+            f.write(program)
+        converter.convert_file(source, target)
+        with open(target) as f:
+            written = f.read()
+    streamed = converter.convert_stream([program], imports=converter.scan_imports([program]))
+    check("the file holds the streamed lines", written == "".join(line + "\n" for line in streamed))
+
+def main():
+    print("Testing the streaming pipeline...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_matches_convert, test_optimized_output, test_hoisted_imports, test_error_lines,
+                 test_convert_file):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All streaming checks passed." if not failed else "Some streaming checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+scripts/test_symbols.py
+
+Check "did you mean" suggestions: misspelled names find the name they
+were meant as (typos, swapped letters, initials, builtins), the trigram
+index finds what a scan of every name finds, syncing and discarding keep
+a long-lived table exact, and a program run from the command line, from
+source or from the artifact cache, explains an undefined name at its line.
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang.__main__ import run_source
+from parser.symbols import SymbolTable, _distance, _max_distance, symbol_table
+
+NAMES = ["total", "count", "learning_rate", "batch_size", "model", "train_loss", "_hidden", "score_total"]
+
+# Misspelled name -> the suggestion expected
+SUGGESTIONS = {
+    "totl": "total",
+    "cuont": "count",
+    "learnin_rate": "learning_rate",
+    "batchsize": "batch_size",
+    "mdoel": "model",
+    "lr": "learning_rate",
+    "tl": "train_loss",
+    "rnage": "range",
+    "lenn": "len",
+}
+
+WORDS = ["loss", "rate", "model", "train", "test", "score", "batch", "epoch", "weight", "layer",
+         "count", "total", "value", "index", "label", "feature", "sample", "error", "step", "size"]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def misspell(name: str, rng: random.Random) -> str:
+    """The name with one character dropped, swapped with the next or replaced."""
+    position = rng.randrange(len(name))
+    edit = rng.choice(("drop", "swap", "replace"))
+    if edit == "drop":
+        return name[:position] + name[position + 1:]
+    if edit == "swap" and position < len(name) - 1:
+        return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+    return name[:position] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[position + 1:]
+
+def test_suggestions():
+    """Misspelled names, initials and builtins find the name meant; unrelated names find nothing."""
+    table = symbol_table(NAMES)
+    for name, expected in SUGGESTIONS.items():
+        found = table.suggest(name)
+        check(f"{name} -> {found}", found[:1] == [expected])
+    check("an unrelated name finds nothing", table.suggest("zebra_crossing") == [])
+    check("private names are not suggested", "_hidden" not in table and table.suggest("_hiden") == [])
+    check("a table with lr suggests it for learning_rate",
+          symbol_table(["lr"]).suggest("learning_rate") == ["lr"])
+    for query, expected in (("learnng_rates", ["learning_rates", "learning_rate"]),
+                            ("learnng_rate", ["learning_rate", "learning_rates"])):
+        check(f"the closest names come first: {query} -> {expected}",
+              symbol_table(["learning_rate", "learning_rates"]).suggest(query, limit=2) == expected)
+
+def test_matches_scan():
+    """The trigram index finds the best names a scan of every name finds."""
+    rng = random.Random(7)
+    names = set()
+    while len(names) < 1000:
+        names.add("_".join(rng.sample(WORDS, rng.choice((2, 3)))) + str(rng.randrange(1000)))
+    names = sorted(names)
+    table = SymbolTable(names)
+    agree = 0
+    queries = [misspell(rng.choice(names), rng) for _ in range(20)]
+    for query in queries:
+        budget = _max_distance(query)
+        scored = [(_distance(query, name, budget), name) for name in names if name != query]
+        best = min(distance for distance, _ in scored)
+        expected = {name for distance, name in scored if distance == best} if best <= budget else set()
+        found = table.suggest(query)
+        agree += (found[0] in expected) if found else not expected
+    check(f"the index agrees with a full scan ({agree}/{len(queries)})", agree >= len(queries) * 0.9)
+
+def test_sync_and_discard():
+    """A table synced with each compile's names suggests exactly those."""
+    table = symbol_table(["total", "count"])
+    table.sync(["totals", "amount"])
+    check("synced names are suggested",
+          table.suggest("amout") == ["amount"] and table.suggest("totls") == ["totals"])
+    check("names gone from the program are forgotten", "count" not in table and table.suggest("cuont") == [])
+    table.discard("totals")
+    check("a discarded name is not suggested", table.suggest("totls") == [])
+    table.update(["learning_rate"])
+    table.discard("learning_rate")
+    check("a discarded name's initials are forgotten", table.suggest("lr") == [])
+    check("builtins are still suggested", table.suggest("rnage") == ["range"])
+    # Enough discards to reindex the table
+    table.sync(f"name{index}" for index in range(200))
+    table.sync(["total"])
+    check("after a reindex only the synced names remain", len(table) == 1 and table.suggest("totl") == ["total"])
+    check("the builtins are left alone", "range" in table and "name5" not in table)
+
+def run(program: str, use_cache: bool = False) -> str:
+    """What running a program from the command line writes to stderr."""
+    errors = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+        run_source(program, "program.nlang", use_cache)
+    return errors.getvalue().strip()
+
+def test_messages():
+    """A program with an undefined name is told which name it probably meant, at its line."""
+    program = "let total be 0.\nfor i from 1 to 3, set total to total plus i.\nprint totl."
+    expected = 'program.nlang, line 3: I couldn\'t find a variable called "totl". Did you mean "total"?'
+    check("a misspelled variable is explained", run(program) == expected)
+    check("initials are explained", run("let learning_rate be 0.1.\nprint lr times 2.").endswith(
+        'Did you mean "learning_rate"?'))
+    check("a misspelled builtin is explained", run("print len(rnage(3)).").endswith('Did you mean "range"?'))
+    check("an unknown name gets no suggestion", run("let x be 1.\nprint nothing_like_it.") ==
+          'program.nlang, line 2: I couldn\'t find a variable called "nothing_like_it".')
+    previous = os.environ.get("NLANG_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["NLANG_CACHE_DIR"] = cache
+        try:
+            messages = [run(program, use_cache=True) for _ in range(2)]
+        finally:
+            if previous is None:
+                del os.environ["NLANG_CACHE_DIR"]
+            else:
+                os.environ["NLANG_CACHE_DIR"] = previous
+    check("a program run from the artifact cache is explained the same", messages == [expected, expected])
+
+def main():
+    print("Testing name suggestions...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_suggestions, test_matches_scan, test_sync_and_discard, test_messages):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All name suggestion checks passed." if not failed else "Some name suggestion checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+scripts/test_vectorize.py
+
+Check loop vectorization: only "for each" loops that just sum element-wise
+expressions are lowered, and a lowered loop computes what the loop does,
+for NumPy arrays (bulk), lists (the loop itself) and integer sums that
+could overflow. The bulk checks need numpy and are skipped without it.
+"""
+
+import math
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nlang_runtime.vectorize import accumulate, is_numeric_array
+from parser.optimizer import NLangOptimizer
+from parser.transpiler import NLangToPython
+
+# A sum, a filtered count and filtered sums of element-wise expressions, as in bench_vectorize.py
+PROGRAM = """
+let total be 0.
+let count be 0.
+let spread be 0.
+for each x in values, set total to total + x * x.
+for each y in values, if y > 0.5, set count to count + 1.
+for each z in values, if z < 0.25 do begin set spread to spread + z. end.
+for each w in values, if w >= 0.9, set spread to spread + (w - 0.9) * 10.
+"""
+
+# Loops that must stay loops
+NOT_LOWERED = [
+    "let t be 0. for each x in values, print x.",
+    "let t be 0. for each x in values, set t to t + f(x).",
+    "let t be 0. for each x in values, set t to t + x. print x.",
+    "let t be 0. for each x in values, set t to t + x divided by 0.",
+    "let t be 0. for each x in values, set t to t + t times x.",
+]
+
+def check(name: str, passed: bool):
+    print(f"{'✓' if passed else '✗'} {name}")
+    assert passed, name
+
+def converters():
+    """(loop, vector) converters: vectorization off and on."""
+    loop = NLangToPython()
+    loop.optimizer = NLangOptimizer(vectorize_loops=False)
+    return loop, NLangToPython()
+
+def run(converter: NLangToPython, values) -> dict:
+    """The totals after running PROGRAM over ``values``."""
+    namespace = {"values": values}
+    exec(converter.compile(PROGRAM), namespace)
+    return {name: namespace[name] for name in ("total", "count", "spread")}
+
+def test_lowering():
+    """Reductions are lowered; loops with effects or other readers of the variable are not."""
+    _, vector = converters()
+    python = vector.convert(PROGRAM)
+    check("every reduction is lowered", python.count("accumulate(") == 4)
+    check("the runtime is imported once", python.count("import nlang_runtime.vectorize") == 1)
+    for program in NOT_LOWERED:
+        check(f"not lowered: {program[12:]}", "accumulate(" not in vector.convert(program))
+
+def test_lists():
+    """A list is not an array: the original loop runs."""
+    values = [0.1, 0.6, 0.2, 0.95, 0.3]
+    loop, vector = converters()
+    check("a list is not a numeric array", not is_numeric_array(values))
+    check("a list gives the loop's totals", run(vector, values) == run(loop, values))
+    check("accumulate() loops over anything else",
+          accumulate(1, range(4), lambda x: x * 2, lambda x: x > 1) == 1 + 4 + 6)
+
+def test_arrays():
+    """Bulk sums of arrays match the loop: exactly for ints, to the last bits for floats."""
+    try:
+        import numpy
+    except ImportError:
+        print("numpy is not installed; skipping the bulk checks.")
+        return
+    loop, vector = converters()
+    values = numpy.random.default_rng(0).random(1000)
+    expected, actual = run(loop, values), run(vector, values)
+    check("float arrays give the loop's totals",
+          all(math.isclose(expected[name], actual[name], rel_tol=1e-9) for name in expected))
+    check("counts are exact", actual["count"] == expected["count"])
+    integers = numpy.arange(-50, 50)
+    check("int arrays are summed exactly",
+          accumulate(0, integers, lambda x: x * 3, lambda x: x > 0) == sum(x * 3 for x in range(1, 50)))
+    check("bool arrays are summed", accumulate(0, numpy.array([True, False, True]), lambda x: x) == 2)
+    check("2-D arrays are not lowered", not is_numeric_array(numpy.ones((2, 2))))
+    check("string arrays are not lowered", not is_numeric_array(numpy.array(["a", "b"])))
+    large = numpy.full(4, 2 ** 62, dtype=numpy.int64)
+    with numpy.errstate(over="ignore"):
+        wrapped = 0
+        for value in large:
+            wrapped = wrapped + value
+        check("an int64 sum that could overflow matches the loop", accumulate(0, large, lambda x: x) == wrapped)
+
+def main():
+    print("Testing loop vectorization...")
+    print("=" * 50)
+    failed = 0
+    for test in (test_lowering, test_lists, test_arrays):
+        try:
+            test()
+        except AssertionError:
+            failed += 1
+    print()
+    print("All vectorization checks passed." if not failed else "Some vectorization checks failed.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+src/nlang/__init__.py
+
+Command-line front end for NLang (``python -m nlang``).
+"""
+
+__version__ = "0.1.0"
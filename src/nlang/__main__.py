@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+src/nlang/__main__.py
+
+Command-line entry point, with ``src`` on the path:
+
+    python -m nlang                  start the REPL
+    python -m nlang FILE             run a NLang file
+    python -m nlang -c PROGRAM       run a program passed as a string
+    python -m nlang --version
+
+Nothing heavy is imported up front: --version imports nothing else, and a
+program found in the artifact cache runs without loading lark or building
+a parser.
+"""
+
+import sys
+
+USAGE = """usage: nlang [--no-cache] [--concurrent] [-c PROGRAM | FILE]
+       nlang --version
+
+With no arguments, start the interactive REPL.
+
+  -c PROGRAM   run the NLang program given as a string
+  FILE         run a NLang file
+  --no-cache   compile even if a cached build exists
+  --concurrent run independent statements at the same time, on threads
+  --version    print the version and exit
+"""
+
+def run_source(source: str, filename: str, use_cache: bool = True, concurrent: bool = False) -> int:
+    """Compile (or load from the artifact cache) and run a program; return the exit status."""
+    from parser.artifact_cache import ArtifactCache
+
+    cache = ArtifactCache(enabled=None if use_cache else False, variant="concurrent" if concurrent else "")
+    cached = cache.get(source, filename)
+    result = None
+    if cached is not None:
+        code = cached[1]
+    else:
+        from parser.incremental import IncrementalCompiler
+
+        errors = []
+        result = IncrementalCompiler(concurrent=concurrent).compile(source, filename, errors)
+        if errors:
+            for error in errors:
+                print(f"{filename}: {error}", file=sys.stderr)
+            return 1
+        code = result.code
+        cache.put(source, result.python, code, filename)
+
+    # Run like a script; the traceback starts at the program, with NLang line numbers
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    try:
+        exec(code, namespace)
+    except Exception as e:
+        message = _explain_name_error(e, source, filename, result, namespace)
+        if message is not None:
+            print(message, file=sys.stderr)
+            return 1
+        import traceback
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        return 1
+    return 0
+
+def _explain_name_error(error: Exception, source: str, filename: str, result, namespace) -> "str | None":
+    """A "did you mean" message for a name the program never defined, or None.
+
+    A program run from the artifact cache is compiled again here, as only
+    the compiler knows every name it binds.
+    """
+    from parser.symbols import error_line, explain_name_error, symbol_table, undefined_name
+
+    name = undefined_name(error)
+    line = error_line(error, filename)
+    # Names missing inside imported Python code are that code's business
+    if name is None or line is None:
+        return None
+    if result is None:
+        from parser.incremental import IncrementalCompiler
+
+        result = IncrementalCompiler().compile(source, filename, [])
+    return f"{filename}, line {line}: {explain_name_error(name, symbol_table(result.names, namespace))}"
+
+def main(argv=None) -> int:
+    """Main entry point."""
+    # Arguments are few and fixed; argparse (or even typing) would add measurably to startup
+    args = sys.argv[1:] if argv is None else list(argv)
+
+    if args and args[0] in ("--version", "-V"):
+        from . import __version__
+        print(f"nlang {__version__}")
+        return 0
+    if args and args[0] in ("--help", "-h"):
+        print(USAGE, end="")
+        return 0
+
+    use_cache = True
+    concurrent = False
+    while args and args[0] in ("--no-cache", "--concurrent"):
+        if args.pop(0) == "--no-cache":
+            use_cache = False
+        else:
+            concurrent = True
+
+    if args and args[0] == "-c":
+        if len(args) != 2:
+            print(USAGE, end="", file=sys.stderr)
+            return 2
+        return run_source(args[1], "<string>", use_cache, concurrent)
+    if len(args) == 1 and not args[0].startswith("-"):
+        try:
+            with open(args[0], "r") as f:
+                source = f.read()
+        except OSError as e:
+            print(f"nlang: cannot open {args[0]}: {e.strerror}", file=sys.stderr)
+            return 2
+        return run_source(source, args[0], use_cache, concurrent)
+    if args:
+        print(USAGE, end="", file=sys.stderr)
+        return 2
+
+    from nlang_repl import NLangREPL
+    NLangREPL().run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
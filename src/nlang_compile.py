@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+src/nlang_compile.py
+
+Batch compiler: transpile directories or globs of .nlang files in parallel.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from parser.nlang_parser import NLangParser, preprocess_natural_language
+from parser.transpiler import NLangTranspiler
+from parser.optimizer import NLangOptimizer
+
+# Warm parser, optimizer and transpiler owned by each worker process, built once by _init_worker
+_PARSER: Optional[NLangParser] = None
+_OPTIMIZER: Optional[NLangOptimizer] = None
+_TRANSPILER: Optional[NLangTranspiler] = None
+# Whether outputs run independent statements concurrently (see parser/dataflow.py)
+_CONCURRENT = False
+
+def _init_worker(optimize: bool = True, concurrent: bool = False):
+    """Build the worker's parser before it receives any files."""
+    global _PARSER, _OPTIMIZER, _TRANSPILER, _CONCURRENT
+    _PARSER = NLangParser()
+    _OPTIMIZER = NLangOptimizer() if optimize else None
+    _TRANSPILER = NLangTranspiler()
+    _CONCURRENT = concurrent
+
+def compile_file(task: Tuple[str, str]) -> Tuple[str, int, List[str]]:
+    """Transpile one file; return (source path, statement count, errors).
+
+    Output is only written when the whole file parsed.
+    """
+    source, target = task
+    if _PARSER is None:
+        _init_worker()
+    try:
+        with open(source, 'r') as f:
+            content = f.read()
+        errors = []
+        statements = _PARSER.parse_program(preprocess_natural_language(content), errors)
+        if errors:
+            return source, len(statements), [str(error) for error in errors]
+        count = len(statements)
+        if _OPTIMIZER is not None:
+            statements = _OPTIMIZER.optimize(statements)
+
+        # The transpiler keeps no state between programs, so one serves every file
+        python_code = _TRANSPILER.transpile_program(statements, _CONCURRENT)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'w') as f:
+            f.write(python_code + "\n")
+        return source, count, []
+    except Exception as e:
+        return source, 0, [f"{type(e).__name__}: {e}"]
+
+def find_sources(inputs: List[str]) -> List[str]:
+    """Expand directories (recursively) and glob patterns into .nlang files."""
+    sources = []
+    for item in inputs:
+        if os.path.isdir(item):
+            sources.extend(glob.glob(os.path.join(item, '**', '*.nlang'), recursive=True))
+        else:
+            matches = glob.glob(item, recursive=True)
+            sources.extend(matches if matches else [item])
+    return sorted(set(sources))
+
+def plan_outputs(sources: List[str], output_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """Pair each source with its .py target: next to it, or mirrored under output_dir."""
+    if not output_dir:
+        return [(source, os.path.splitext(source)[0] + '.py') for source in sources]
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source in sources])
+    return [
+        (source, os.path.join(output_dir, os.path.splitext(os.path.relpath(os.path.abspath(source), root))[0] + '.py'))
+        for source in sources
+    ]
+
+def compile_all(tasks: List[Tuple[str, str]], jobs: int, chunksize: int, optimize: bool = True,
+                concurrent: bool = False):
+    """Yield compile_file results, in a process pool when jobs > 1."""
+    if jobs <= 1:
+        _init_worker(optimize, concurrent)
+        for task in tasks:
+            yield compile_file(task)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(optimize, concurrent)) as pool:
+        yield from pool.map(compile_file, tasks, chunksize=chunksize)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Compile .nlang files to Python in parallel.")
+    parser.add_argument("inputs", nargs="+", help="directories, files or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="write outputs into this tree instead of next to the sources")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunksize", type=int, default=16, help="files handed to a worker at a time")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--no-optimize", action="store_true", help="skip constant folding and dead code removal")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="generate programs that run independent statements concurrently")
+    args = parser.parse_args(argv)
+
+    sources = find_sources(args.inputs)
+    if not sources:
+        print("No .nlang files found.", file=sys.stderr)
+        return 1
+    tasks = plan_outputs(sources, args.output_dir)
+
+    start = time.perf_counter()
+    failed = 0
+    total_statements = 0
+    for source, statements, errors in compile_all(tasks, args.jobs, args.chunksize, not args.no_optimize, args.concurrent):
+        total_statements += statements
+        if errors:
+            failed += 1
+            print(f"FAILED {source}", file=sys.stderr)
+            for error in errors:
+                print(f"  {error.splitlines()[0]}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"ok     {source}")
+    elapsed = time.perf_counter() - start
+
+    print(f"Compiled {len(sources) - failed}/{len(sources)} files, {total_statements} statements "
+          f"in {elapsed:.2f}s ({len(sources) / elapsed:.1f} files/s, "
+          f"{total_statements / elapsed:.0f} statements/s) using {args.jobs} workers")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
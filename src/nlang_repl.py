@@ -7,25 +7,49 @@ Enhanced NLang REPL with execution capabilities.
 
 import sys
 import os
-import tempfile
-import subprocess
 from typing import Dict, Any, Optional
 
-# Add the src directory to the path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
-
-from parser.nlang_parser import NLangParser, preprocess_natural_language
+# The parser modules (and lark) are imported on first use, so the banner
+# shows up before any of them load
 from parser.transpiler import NLangToPython
+from parser.optimizer import NLangOptimizer
+from parser.artifact_cache import ArtifactCache
+from parser.tracing import TRACER, TimingRecorder
+from nlang_runtime.session import ExecutionSession
 
 class NLangREPL:
     """Interactive REPL for NLang."""
     
     def __init__(self):
-        self.parser = NLangParser()
+        self._compiler = None
+        self._symbols = None
         self.transpiler = NLangToPython()
-        self.variables = {}
+        # Each input is compiled on its own, but later inputs may use its imports and loop variables
+        self.transpiler.optimizer = NLangOptimizer(remove_unused_imports=False, vectorize_loops=False)
+        self.session = ExecutionSession()
+        self.artifacts = ArtifactCache()
+        # Stage timings of the last input, shown by 'timings'
+        self.tracer = TRACER
+        self.timings = TimingRecorder()
+        self.tracer.subscribe(self.timings)
         self.history = []
         
+    @property
+    def compiler(self):
+        """Incremental compiler for 'run' and 'watch', created on first use."""
+        if self._compiler is None:
+            from parser.incremental import IncrementalCompiler
+            self._compiler = IncrementalCompiler()
+        return self._compiler
+    
+    @property
+    def symbols(self):
+        """Names of the session for "did you mean" messages, created on first use."""
+        if self._symbols is None:
+            from parser.symbols import symbol_table
+            self._symbols = symbol_table()
+        return self._symbols
+    
     def run(self):
         """Start the REPL."""
         print("NLang REPL - Natural Language Programming")
@@ -53,7 +77,7 @@ class NLangREPL:
                     self._show_help()
                     continue
                 elif text.lower() == "clear":
-                    self.variables.clear()
+                    self.session.clear()
                     print("Variables cleared.")
                     continue
                 elif text.lower() == "vars":
@@ -61,7 +85,17 @@ class NLangREPL:
                     continue
                 elif text.lower().startswith("run "):
                     filename = text[4:].strip()
-                    self._run_file(filename)
+                    use_cache = not filename.startswith("--no-cache ")
+                    if not use_cache:
+                        filename = filename[len("--no-cache "):].strip()
+                    self._run_file(filename, use_cache)
+                    continue
+                elif text.lower().startswith("watch "):
+                    filename = text[6:].strip()
+                    self._watch_file(filename)
+                    continue
+                elif text.lower().split()[0] == "timings":
+                    self._timings_command(text.lower().split()[1:])
                     continue
                 
                 # Process NLang code
@@ -72,80 +106,140 @@ class NLangREPL:
     
     def _process_input(self, text: str):
         """Process a single line of NLang input."""
+        from parser.nlang_parser import preprocess_natural_language
+        
+        self.timings.clear()
         try:
-            # Preprocess natural language
-            processed = preprocess_natural_language(text)
-            print(f"Processed: {processed}")
-            
-            # Parse to AST
-            ast = self.parser.parse(processed)
-            print(f"AST: {ast}")
-            
-            # Transpile to Python
-            python_code = self.transpiler.convert(text)
-            print(f"Python: {python_code}")
-            
-            # Execute the Python code
-            result = self._execute_python(python_code)
+            with self.tracer.stage("input"):
+                # Preprocess natural language
+                with self.tracer.stage("preprocess"):
+                    processed = preprocess_natural_language(text)
+                print(f"Processed: {processed}")
+                
+                # Parse to AST, once for both the source shown and the code run
+                errors = []
+                statements = self.transpiler.parse_processed(processed, errors)
+                if errors:
+                    raise errors[0]
+                for statement in statements:
+                    try:
+                        print(f"AST: {statement}")
+                    except RecursionError:
+                        # Printing recurses once per level; compiling does not
+                        print(f"AST: <{statement.get('type')} nested too deeply to print>")
+                
+                # Transpile to Python
+                python_code = self.transpiler.transpile_statements(statements)
+                print(f"Python: {python_code}")
+                
+                # Execute the compiled code object, generated from the same statements
+                code = self.transpiler.compile_statements(statements)
+                names = self.transpiler.transpiler.variables | self.transpiler.transpiler.imports
+                with self.tracer.stage("execute"):
+                    result = self._execute_python(code, lambda: names)
             if result is not None:
                 print(f"Result: {result}")
                 
         except Exception as e:
             print(f"Processing error: {e}")
     
-    def _execute_python(self, python_code: str) -> Optional[Any]:
-        """Execute Python code and return the result."""
+    def _execute_python(self, python_code, names=None) -> Optional[Any]:
+        """Execute Python source or a code object in the REPL session and return its output.
+        
+        ``names`` returns the names the program binds, for suggesting one
+        when the program uses a name it never defined.
+        """
         try:
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(python_code)
-                temp_file = f.name
-            
-            # Execute the Python code
-            result = subprocess.run([sys.executable, temp_file], 
-                                  capture_output=True, text=True, timeout=10)
-            
-            # Clean up
-            os.unlink(temp_file)
-            
-            # Return output
-            if result.stdout:
-                return result.stdout.strip()
-            elif result.stderr:
-                return f"Error: {result.stderr.strip()}"
-            else:
-                return None
-                
-        except subprocess.TimeoutExpired:
-            return "Error: Execution timed out"
+            output = self.session.execute(python_code)
+            return output.strip() if output else None
         except Exception as e:
-            return f"Execution error: {e}"
+            error = self._explain_name_error(e, python_code, names) or f"Error: {type(e).__name__}: {e}"
+            output = self.session.last_output.strip()
+            return f"{output}\n{error}" if output else error
+    
+    def _explain_name_error(self, error: Exception, python_code, names) -> Optional[str]:
+        """A "did you mean" message for a name the program never defined, or None."""
+        from parser.symbols import error_line, explain_name_error, undefined_name
+        
+        name = undefined_name(error)
+        filename = getattr(python_code, "co_filename", "<string>")
+        if name is None or error_line(error, filename) is None:
+            return None
+        # Only names new since the last error are indexed
+        known = set(self.session.namespace)
+        if names is not None:
+            known.update(names())
+        self.symbols.sync(known)
+        return explain_name_error(name, self.symbols)
     
-    def _run_file(self, filename: str):
+    def _run_file(self, filename: str, use_cache: bool = True):
         """Run a NLang file."""
         try:
             with open(filename, 'r') as f:
                 content = f.read()
-            
-            print(f"Running {filename}...")
-            print("=" * 30)
-            
-            # Process the file
-            python_code = self.transpiler.convert(content)
-            print("Generated Python:")
-            print(python_code)
-            print("=" * 30)
-            
-            # Execute
-            result = self._execute_python(python_code)
-            if result:
-                print(f"Output: {result}")
-                
+            self._run_source(filename, content, use_cache)
         except FileNotFoundError:
             print(f"File not found: {filename}")
         except Exception as e:
             print(f"Error running file: {e}")
     
+    def _run_source(self, filename: str, content: str, use_cache: bool = True):
+        """Compile and run the contents of a NLang file."""
+        self.timings.clear()
+        with self.tracer.stage("run"):
+            self._compile_and_run(filename, content, use_cache)
+    
+    def _compile_and_run(self, filename: str, content: str, use_cache: bool):
+        print(f"Running {filename}...")
+        print("=" * 30)
+        
+        # Unchanged files skip the front end entirely
+        with self.tracer.stage("artifact_cache") as info:
+            cached = self.artifacts.get(content, filename) if use_cache else None
+            info["hit"] = cached is not None
+        if cached is not None:
+            python_code, code = cached
+            summary = "Loaded compiled program from cache"
+            # Only needed for an error message, so compiled only then
+            names = lambda: self.compiler.compile(content, filename, []).names
+        else:
+            # Otherwise only statements that changed since the last run are recompiled
+            errors = []
+            result = self.compiler.compile(content, filename, errors)
+            for error in errors:
+                print(f"Warning: Could not parse statement: {error}")
+            python_code, code = result.python, result.code
+            names = lambda: result.names
+            summary = (f"Compiled {result.statements} statements "
+                       f"({result.hits} cached, {result.misses} recompiled)")
+            # Programs with errors are not cached, so their warnings show on every run
+            if use_cache and not errors:
+                self.artifacts.put(content, python_code, code, filename)
+        
+        print("Generated Python:")
+        print(python_code)
+        print("=" * 30)
+        print(summary)
+        
+        # Execute, with tracebacks pointing at the NLang file
+        with self.tracer.stage("execute"):
+            output = self._execute_python(code, names)
+        if output:
+            print(f"Output: {output}")
+    
+    def _watch_file(self, filename: str):
+        """Re-run a NLang file every time it changes, until interrupted."""
+        from parser.incremental import watch
+        
+        if not os.path.exists(filename):
+            print(f"File not found: {filename}")
+            return
+        print(f"Watching {filename} (Ctrl-C to stop)")
+        try:
+            watch(filename, lambda content: self._run_source(filename, content))
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+    
     def _show_help(self):
         """Show help information."""
         help_text = """
@@ -154,7 +248,10 @@ Available commands:
   exit/quit     - Exit the REPL
   clear         - Clear all variables
   vars          - Show current variables
-  run <file>    - Run a NLang file
+  run <file>    - Run a NLang file (run --no-cache <file> to bypass the cache)
+  watch <file>  - Re-run a NLang file whenever it changes
+  timings       - Show where the time went for the last input
+                  (timings on/off to toggle; NLANG_TRACE=1 enables at startup)
 
 NLang examples:
   let x be 5.
@@ -162,15 +259,31 @@ NLang examples:
   print "Hello world".
   set z to x plus y.
   if x is 5, print "x equals 5".
+  for i from 1 to 3, print i.
+  for each n in range(10) in parallel, print n times n.
+  to square a number n, remembering results: return n times n.
         """
         print(help_text)
     
+    def _timings_command(self, args):
+        """Show the stage timings of the last input, or turn timing on or off."""
+        if args and args[0] in ("on", "off"):
+            self.tracer.enabled = args[0] == "on"
+            print(f"Stage timing {'enabled' if self.tracer.enabled else 'disabled'}.")
+        elif not self.tracer.enabled:
+            print("Stage timing is off; enable it with 'timings on' or NLANG_TRACE=1.")
+        elif not self.timings.events:
+            print("No timings recorded yet.")
+        else:
+            print(self.timings.format())
+    
     def _show_variables(self):
         """Show current variables."""
-        if self.variables:
+        variables = self.session.variables()
+        if variables:
             print("Current variables:")
-            for name, value in self.variables.items():
-                print(f"  {name} = {value}")
+            for name, value in variables.items():
+                print(f"  {name} = {value!r}")
         else:
             print("No variables defined.")
 
@@ -0,0 +1,5 @@
+"""
+src/nlang_runtime/__init__.py
+
+Runtime support for executing transpiled NLang programs.
+"""
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/dataflow.py
+
+Runs a program's top-level statements as a dependency graph, for programs
+compiled with ``--concurrent`` (see parser/dataflow.py).
+
+Each statement is a step: a function, the earlier steps it waits for, and
+whether it is worth a worker thread. A step starts as soon as everything
+it waits for has finished; steps that only compute something cheap run
+on the calling thread, between the others. Ready steps always start in
+source order, so a program with no overlap runs exactly as written.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import heapq
+import os
+
+# (function, indexes of the steps it waits for, run on a worker thread)
+StepEntry = Tuple[Callable[[], None], Tuple[int, ...], bool]
+
+def run(steps: Sequence[StepEntry], max_workers: Optional[int] = None):
+    """Run the steps, each once all of its dependencies have finished.
+
+    A step is only handed to a worker thread once one is free, so none
+    sits queued in the pool. If a step raises, steps after it in source
+    order no longer start, while steps before it still run, as they would
+    have in order; only a step already running when the failure happened
+    can still finish past it. Once the running steps are done, the
+    exception of the earliest failed step (in source order) is raised.
+    """
+    if max_workers is None:
+        # ThreadPoolExecutor's default
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    waiting = [len(set(dependencies)) for _, dependencies, _ in steps]
+    dependents: List[List[int]] = [[] for _ in steps]
+    for index, (_, dependencies, _) in enumerate(steps):
+        for dependency in set(dependencies):
+            dependents[dependency].append(index)
+    ready = [index for index, count in enumerate(waiting) if count == 0]
+    heapq.heapify(ready)
+    failures: Dict[int, BaseException] = {}
+    # Steps from this index on no longer start
+    stop = len(steps)
+
+    def finish(index: int):
+        for dependent in dependents[index]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, dependent)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nlang-step") as pool:
+        running: Dict[Future, int] = {}
+
+        def fail(index: int, error: BaseException):
+            nonlocal stop
+            failures[index] = error
+            stop = min(stop, index)
+
+        while (ready and ready[0] < stop) or running:
+            while ready and ready[0] < stop:
+                function, _, offload = steps[ready[0]]
+                if offload and len(running) >= max_workers:
+                    # Steps start in order: this one waits for a free worker
+                    break
+                index = heapq.heappop(ready)
+                if offload:
+                    running[pool.submit(function)] = index
+                    continue
+                try:
+                    function()
+                except BaseException as e:
+                    fail(index, e)
+                else:
+                    finish(index)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    fail(index, error)
+                else:
+                    finish(index)
+    if failures:
+        raise failures[min(failures)]
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/dataset.py
+
+Lazy, chunked datasets behind the ``load``, ``split``, ``filter`` and
+``select`` verbs.
+
+A Dataset is a query plan over a CSV file, not the data itself: every verb
+returns a new Dataset with one more step, and nothing is read until rows
+are asked for (iteration, len(), head()). The plan then runs as a single
+pass over the memory-mapped file, a fixed number of rows at a time, with
+all of its steps fused: every filter and split is checked and the final
+column selection applied in one loop per chunk, and only the columns the
+plan uses are converted from text.
+"""
+
+from itertools import compress, islice, repeat
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+import builtins
+import csv
+import mmap
+import os
+
+# Rows read, converted and filtered at a time
+DEFAULT_CHUNK_ROWS = 8192
+
+# First characters of the fields _parse_value() tries to read as numbers
+_NUMBER_START = frozenset("0123456789+-. ")
+
+class _Where(NamedTuple):
+    """Keep the rows for which ``predicate`` holds.
+
+    ``arguments`` gives, per predicate parameter, the column it reads (by
+    name) or, for a parameter that is not a column, the value bound to it.
+    """
+    predicate: Callable[..., Any]
+    arguments: Tuple[Tuple[Optional[str], Any], ...]
+
+class _Select(NamedTuple):
+    """Keep only these columns, in this order."""
+    columns: Tuple[str, ...]
+
+class _Split(NamedTuple):
+    """One part of a split: the rows whose hashed row number falls in [low, high)."""
+    low: float
+    high: float
+    salt: int
+
+class _CsvSource:
+    """A CSV file with a header row, read through a memory map."""
+
+    def __init__(self, path: str, delimiter: str = ",", encoding: str = "utf-8"):
+        self.path = os.fspath(path)
+        self.delimiter = delimiter
+        self.encoding = encoding
+        # Only the header is read up front, so plans can be checked against it
+        with open(self.path, newline="", encoding=encoding) as f:
+            header = next(csv.reader(f, delimiter=delimiter), [])
+        self.columns = tuple(name.strip() for name in header)
+
+    def chunks(self, chunk_rows: int, used: Sequence[int]) -> Iterator[Tuple[int, int, Dict[int, list]]]:
+        """Yield (number of the first row, row count, columns) per ``chunk_rows`` rows.
+
+        Only the columns at the ``used`` positions are returned, by
+        position, each converted in bulk (see _convert_column).
+        """
+        width = len(self.columns)
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                lines = (line.decode(self.encoding) for line in iter(mapped.readline, b""))
+                # Blank lines are skipped, as csv.DictReader does
+                reader = filter(None, csv.reader(lines, delimiter=self.delimiter))
+                next(reader, None)
+                start = 0
+                while True:
+                    rows = list(islice(reader, chunk_rows))
+                    if not rows:
+                        return
+                    columns = {}
+                    if used:
+                        fields = itemgetter(*used)
+                        try:
+                            picked = list(map(fields, rows))
+                        except IndexError:
+                            # Short rows are padded with missing values
+                            picked = [fields(row + [""] * (width - len(row))) for row in rows]
+                        if len(used) == 1:
+                            picked = [picked]
+                        else:
+                            picked = zip(*picked)
+                        columns = {position: _convert_column(values) for position, values in zip(used, picked)}
+                    yield start, len(rows), columns
+                    start += len(rows)
+
+    def __repr__(self) -> str:
+        return os.path.basename(self.path)
+
+class _Plan(NamedTuple):
+    """A dataset's steps fused into what one pass over the source needs."""
+    columns: Tuple[str, ...]
+    # Source position of each output column
+    projection: Tuple[int, ...]
+    # (predicate, per parameter: source position or None, bound value)
+    filters: Tuple[Tuple[Callable[..., Any], Tuple[Tuple[Optional[int], Any], ...]], ...]
+    splits: Tuple[_Split, ...]
+    # Source positions read by the plan, converted from text
+    used: Tuple[int, ...]
+
+class Dataset:
+    """A lazily evaluated table: a CSV source plus a chain of steps."""
+
+    def __init__(self, source: _CsvSource, steps: Tuple[Any, ...] = (), chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self._source = source
+        self._steps = steps
+        self.chunk_rows = chunk_rows
+        self._plan: Optional[_Plan] = None
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Column names of the rows this dataset yields."""
+        return self._compile().columns
+
+    def _derive(self, step: Any) -> "Dataset":
+        return Dataset(self._source, self._steps + (step,), self.chunk_rows)
+
+    # Verbs; each returns a new lazy dataset
+
+    def where(self, predicate: Callable[..., Any], variables: Optional[Mapping[str, Any]] = None) -> "Dataset":
+        """Keep the rows for which ``predicate`` is true.
+
+        Each parameter of ``predicate`` is bound by name: to the row's value
+        if it names a column, otherwise to the variable of that name as it
+        is now, looked up in ``variables`` (the caller's ``locals()``, so a
+        filter in a procedure sees its parameters), then in the
+        predicate's module.
+        """
+        code = predicate.__code__
+        columns = self.columns
+        arguments = []
+        for name in code.co_varnames[:code.co_argcount]:
+            if name in columns:
+                arguments.append((name, None))
+            elif variables is not None and name in variables:
+                arguments.append((None, variables[name]))
+            elif name in predicate.__globals__:
+                arguments.append((None, predicate.__globals__[name]))
+            elif hasattr(builtins, name):
+                arguments.append((None, getattr(builtins, name)))
+            else:
+                raise NameError(f"name '{name}' is neither a column of the dataset nor a variable")
+        return self._derive(_Where(predicate, tuple(arguments)))
+
+    def select(self, *columns: str) -> "Dataset":
+        """Keep only the given columns, in that order."""
+        missing = [name for name in columns if name not in self.columns]
+        if missing:
+            raise KeyError(f"no column named {missing[0]!r}; the dataset has {', '.join(self.columns)}")
+        return self._derive(_Select(tuple(columns)))
+
+    def split(self, *percents: float) -> Tuple["Dataset", ...]:
+        """Split into datasets holding the given percentages of the rows.
+
+        Rows are assigned by a hash of their position in the file, so the
+        parts are disjoint, reproducible and need no pass over the data.
+        Percentages adding up to less than 100 leave the remaining rows out.
+        """
+        if any(percent < 0 for percent in percents) or sum(percents) > 100:
+            raise ValueError("split percentages must be non-negative and add up to at most 100")
+        # Each split hashes differently, so splitting a part again stays random
+        salt = sum(isinstance(step, _Split) for step in self._steps) + 1
+        parts = []
+        low = 0.0
+        for percent in percents:
+            high = low + percent / 100
+            parts.append(self._derive(_Split(low, high, salt)))
+            low = high
+        return tuple(parts)
+
+    # Evaluation
+
+    def _compile(self) -> _Plan:
+        """Fuse the steps into a single-pass plan over the source."""
+        if self._plan is not None:
+            return self._plan
+        columns = self._source.columns
+        positions = tuple(range(len(columns)))
+        filters = []
+        splits = []
+        for step in self._steps:
+            if isinstance(step, _Select):
+                positions = tuple(positions[columns.index(name)] for name in step.columns)
+                columns = step.columns
+            elif isinstance(step, _Where):
+                # Selections only drop columns, so filters can read source positions
+                arguments = tuple((positions[columns.index(name)], None) if name is not None else (None, value)
+                                  for name, value in step.arguments)
+                filters.append((step.predicate, arguments))
+            else:
+                splits.append(step)
+        used = set(positions)
+        for _, arguments in filters:
+            used.update(position for position, _ in arguments if position is not None)
+        self._plan = _Plan(columns, positions, tuple(filters), tuple(splits), tuple(sorted(used)))
+        return self._plan
+
+    def iter_chunks(self, chunk_rows: Optional[int] = None) -> Iterator[List[tuple]]:
+        """Yield the rows as lists of tuples, one chunk at a time."""
+        plan = self._compile()
+        for start, count, columns in self._source.chunks(chunk_rows or self.chunk_rows, plan.used):
+            # Row numbers within the chunk that are still kept, or None for all of them
+            kept = None
+            if plan.splits:
+                kept = [n for n in range(count)
+                        if all(part.low <= _unit(start + n, part.salt) < part.high for part in plan.splits)]
+            for predicate, arguments in plan.filters:
+                values = [repeat(value) if position is None
+                          else columns[position] if kept is None
+                          else [columns[position][n] for n in kept]
+                          for position, value in arguments]
+                rows = range(count) if kept is None else kept
+                # A condition without names is still evaluated once per row
+                flags = map(predicate, *values) if values else (predicate() for _ in rows)
+                kept = list(compress(rows, flags))
+            if kept is not None and not kept:
+                continue
+            output = [columns[position] if kept is None else [columns[position][n] for n in kept]
+                      for position in plan.projection]
+            yield list(zip(*output)) if output else [()] * (count if kept is None else len(kept))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the rows as dicts of column name to value."""
+        columns = self.columns
+        for chunk in self.iter_chunks():
+            for row in chunk:
+                yield dict(zip(columns, row))
+
+    def __len__(self) -> int:
+        """Count the rows; streams through the data without keeping it."""
+        return sum(len(chunk) for chunk in self.iter_chunks())
+
+    def head(self, n: int = 5) -> List[Dict[str, Any]]:
+        """The first ``n`` rows; reading stops as soon as they are found."""
+        return list(islice(iter(self), n))
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materialize every row."""
+        return list(self)
+
+    def column(self, name: str) -> List[Any]:
+        """Materialize the values of one column."""
+        return [row[0] for chunk in self.select(name).iter_chunks() for row in chunk]
+
+    def explain(self) -> str:
+        """Describe the plan and what the fused pass over the file does."""
+        plan = self._compile()
+        steps = ["load " + repr(self._source)] + [type(step).__name__.lstrip("_").lower() for step in self._steps]
+        used = ", ".join(self._source.columns[position] for position in plan.used)
+        return (f"{' -> '.join(steps)}\n"
+                f"  one pass: {len(plan.splits)} split(s), {len(plan.filters)} filter(s), "
+                f"reads {used or 'no columns'}, yields {', '.join(plan.columns)}")
+
+    def __repr__(self) -> str:
+        steps = "".join(f" -> {type(step).__name__.lstrip('_').lower()}" for step in self._steps)
+        return f"<Dataset {self._source!r}{steps}: {', '.join(self.columns)}>"
+
+def load_csv(path: str, delimiter: str = ",", encoding: str = "utf-8",
+             chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dataset:
+    """A lazy dataset over a CSV file whose first row names the columns."""
+    return Dataset(_CsvSource(path, delimiter, encoding), chunk_rows=chunk_rows)
+
+def _convert_column(values: Sequence[str]) -> list:
+    """A column of CSV fields as ints if they all are, else floats if they all
+    are, else field by field with _parse_value()."""
+    try:
+        return list(map(int, values))
+    except ValueError:
+        pass
+    try:
+        return list(map(float, values))
+    except ValueError:
+        return list(map(_parse_value, values))
+
+def _parse_value(text: str) -> Any:
+    """A CSV field as an int or float if it is one, None if empty, else the text."""
+    if not text:
+        return None
+    if text[0] not in _NUMBER_START:
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def _unit(number: int, salt: int) -> float:
+    """Map a row number to [0, 1), evenly and reproducibly."""
+    mixed = ((number + 1) * 0x9E3779B1 + salt * 0x85EBCA6B) & 0xFFFFFFFF
+    mixed = ((mixed ^ (mixed >> 15)) * 0x2C1B3C6D) & 0xFFFFFFFF
+    return (mixed ^ (mixed >> 12)) / 4294967296.0
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/executor.py
+
+A pool of pre-forked worker processes for running many NLang programs,
+possibly untrusted, concurrently.
+
+Workers are forked from a parent that has already loaded the parser and
+built its tables, so a job starts compiling at once instead of paying
+for a fresh interpreter. Replacement workers are needed while the
+pool's threads run, and forking a threaded process can hand the child a
+lock another thread holds, so they come from a single-threaded fork
+server instead. When the server can import this package (it is
+installed or on PYTHONPATH), it builds the same compiler once for all of
+them (see warm_compiler.py); otherwise each builds its own before its
+first job. Each worker runs one job at a time, under resource limits:
+
+* memory (address space) and open files, as hard rlimits set when the
+  worker starts, which the program cannot raise;
+* CPU seconds per job, as a soft rlimit raised by that much before each
+  job (the worker dies of SIGXCPU if a job exceeds it), under a hard
+  limit covering every job the worker will run;
+* wall-clock seconds per job, enforced by the parent, which kills the
+  worker on expiry.
+
+A worker is replaced after a fixed number of jobs, and whenever it dies
+or is killed, so no job sees what an earlier one left behind for long.
+Jobs wait in a bounded queue: submit() blocks (or raises queue.Full)
+while it is full, instead of buffering an unbounded backlog.
+
+Resource limits need the POSIX ``resource`` module; elsewhere only the
+timeout applies. Programs run with full builtins: the limits bound what
+a program can consume, not what it can access.
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from contextlib import redirect_stdout
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import io
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Extra CPU seconds in a worker's hard limit, for compiling and bookkeeping
+_CPU_SLACK = 5
+
+class Limits(NamedTuple):
+    """Resource limits of a job; None leaves a resource unlimited."""
+    cpu_seconds: Optional[int] = 10
+    memory_bytes: Optional[int] = 1024 * 1024 * 1024
+    open_files: Optional[int] = 64
+
+class JobResult(NamedTuple):
+    """Outcome of one program."""
+    # "ok", "error" (compile or run-time), "timeout" or "crashed" (the worker died)
+    status: str
+    output: str
+    error: Optional[str]
+    # Seconds spent waiting in the queue, then running
+    queued: float
+    seconds: float
+    worker: int
+
+    @property
+    def latency(self) -> float:
+        """Seconds from submission to result."""
+        return self.queued + self.seconds
+
+class _Worker:
+    """The parent's handle on one worker process."""
+
+    def __init__(self, context, compiler, limits: Limits, max_jobs: int):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, compiler, limits, max_jobs),
+                                       name="nlang-executor", daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+        self.process.join()
+        self.connection.close()
+
+class ExecutorPool:
+    """Run NLang programs on pre-forked, resource-limited worker processes.
+
+    Usage::
+
+        with ExecutorPool(workers=8, timeout=5) as pool:
+            futures = [pool.submit(source) for source in sources]
+            results = [future.result() for future in futures]
+    """
+
+    def __init__(self, workers: Optional[int] = None, limits: Limits = Limits(), timeout: float = 10.0,
+                 max_jobs_per_worker: int = 100, max_queue: Optional[int] = None, warm: bool = True):
+        self.workers = workers or os.cpu_count() or 1
+        self.limits = limits
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue or self.workers * 4)
+        methods = multiprocessing.get_all_start_methods()
+        fork = "fork" in methods
+        self._context = multiprocessing.get_context("fork" if fork else "spawn")
+        self._replacement_context = self._context
+        if fork and "forkserver" in methods:
+            from multiprocessing import forkserver
+
+            self._replacement_context = multiprocessing.get_context("forkserver")
+            if warm:
+                self._replacement_context.set_forkserver_preload(["nlang_runtime.warm_compiler"])
+            # Started now, so the first replacement does not wait for it
+            forkserver.ensure_running()
+        # Workers forked from here start with the parser loaded and its tables built
+        self._compiler = _new_compiler() if warm and fork else None
+        self._lock = threading.Lock()
+        self._counts = {"submitted": 0, "ok": 0, "error": 0, "timeout": 0, "crashed": 0, "started": 0}
+        self._closed = False
+        # Each slot thread owns one worker process and feeds it jobs from the
+        # queue; the first workers are forked before any of the threads exist
+        self._workers: List[Optional[_Worker]] = [self._start_worker(self._context) for _ in range(self.workers)]
+        self._threads = [threading.Thread(target=self._serve, args=(slot,), name=f"nlang-executor-{slot}", daemon=True)
+                         for slot in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, source: str, filename: str = "<nlang>", block: bool = True,
+               timeout: Optional[float] = None) -> "Future[JobResult]":
+        """Queue a program; the future's result is its JobResult.
+
+        Waits for room in the queue, for up to ``timeout`` seconds, unless
+        ``block`` is false; raises queue.Full if there is none.
+        """
+        if self._closed:
+            raise RuntimeError("cannot submit to a pool that has been shut down")
+        future: "Future[JobResult]" = Future()
+        self._queue.put((future, source, filename, time.perf_counter()), block, timeout)
+        with self._lock:
+            self._counts["submitted"] += 1
+        return future
+
+    def run(self, source: str, filename: str = "<nlang>") -> JobResult:
+        """Run one program and wait for its result."""
+        return self.submit(source, filename).result()
+
+    def map(self, sources: Iterable[str]) -> Iterator[JobResult]:
+        """Run many programs, yielding results in order; the queue bounds how far submission runs ahead."""
+        futures: deque = deque()
+        for source in sources:
+            futures.append(self.submit(source))
+            while futures and futures[0].done():
+                yield futures.popleft().result()
+        for future in futures:
+            yield future.result()
+
+    def stats(self) -> Dict[str, int]:
+        """Jobs submitted, finished by status, and worker processes started."""
+        with self._lock:
+            return dict(self._counts, queued=self._queue.qsize())
+
+    def shutdown(self):
+        """Finish the queued jobs, then stop every worker."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "ExecutorPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _start_worker(self, context) -> _Worker:
+        with self._lock:
+            self._counts["started"] += 1
+        # Only a forked worker shares the parent's compiler
+        compiler = self._compiler if context is self._context else None
+        return _Worker(context, compiler, self.limits, self.max_jobs_per_worker)
+
+    def _serve(self, slot: int):
+        """Run queued jobs on this slot's worker, replacing it as needed."""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            future, source, filename, submitted = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            worker = self._workers[slot]
+            if worker is None or worker.jobs >= self.max_jobs_per_worker:
+                if worker is not None:
+                    worker.stop()
+                worker = self._workers[slot] = self._start_worker(self._replacement_context)
+            result = self._run_job(worker, source, filename, submitted)
+            if result.status in ("timeout", "crashed"):
+                worker.stop(kill=True)
+                self._workers[slot] = None
+            with self._lock:
+                self._counts[result.status] += 1
+            future.set_result(result)
+        worker = self._workers[slot]
+        if worker is not None:
+            worker.stop()
+            self._workers[slot] = None
+
+    def _run_job(self, worker: _Worker, source: str, filename: str, submitted: float) -> JobResult:
+        start = time.perf_counter()
+        queued = start - submitted
+        pid = worker.process.pid
+        worker.jobs += 1
+        try:
+            worker.connection.send((source, filename))
+            if not worker.connection.poll(self.timeout):
+                return JobResult("timeout", "", f"Timed out after {self.timeout:g} seconds",
+                                 queued, time.perf_counter() - start, pid)
+            status, output, error = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.process.join()
+            return JobResult("crashed", "", _exit_reason(worker.process.exitcode),
+                             queued, time.perf_counter() - start, pid)
+        return JobResult(status, output, error, queued, time.perf_counter() - start, pid)
+
+def _new_compiler():
+    """An incremental compiler with the parser loaded and its tables built."""
+    from parser.incremental import IncrementalCompiler
+
+    compiler = IncrementalCompiler()
+    compiler.compile("let x be 1.", errors=[])
+    return compiler
+
+def _exit_reason(exitcode: Optional[int]) -> str:
+    if exitcode is not None and exitcode < 0:
+        import signal
+        try:
+            return f"Worker killed by {signal.Signals(-exitcode).name}"
+        except ValueError:
+            pass
+    return f"Worker exited with status {exitcode}"
+
+def _worker_main(connection, compiler, limits: Limits, max_jobs: int):
+    """Body of a worker process: run jobs from the parent until told to stop."""
+    if compiler is None:
+        warm = sys.modules.get("nlang_runtime.warm_compiler")
+        compiler = warm.COMPILER if warm is not None else _new_compiler()
+    if resource is not None:
+        if limits.memory_bytes is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes))
+        if limits.open_files is not None:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limits.open_files, limits.open_files))
+        if limits.cpu_seconds is not None:
+            # The hard limit covers every job this worker will run
+            used = int(time.process_time()) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (used + limits.cpu_seconds,
+                                                     used + (limits.cpu_seconds + _CPU_SLACK) * max_jobs))
+    # Names of each program run here, for "did you mean" messages; a worker
+    # is replaced after max_jobs jobs, which bounds how many it keeps
+    symbols: Dict[str, Any] = {}
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        source, filename = job
+        if resource is not None and limits.cpu_seconds is not None:
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            soft = min(int(time.process_time()) + 1 + limits.cpu_seconds, hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+        connection.send(_run(compiler, source, filename, symbols))
+
+def _run(compiler, source: str, filename: str, symbols: Dict[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """Compile and run one program; return (status, output, error).
+
+    ``symbols`` maps file names to the symbol table kept for each.
+    """
+    from parser.symbols import error_line, explain_name_error, symbol_table, undefined_name
+
+    output = io.StringIO()
+    errors: List[Any] = []
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    result = None
+    try:
+        with redirect_stdout(output):
+            result = compiler.compile(source, filename, errors)
+            if errors:
+                return "error", output.getvalue(), "\n".join(str(error) for error in errors)
+            exec(result.code, namespace)
+    except BaseException as e:
+        name = undefined_name(e)
+        line = error_line(e, filename)
+        if name is not None and line is not None and result is not None:
+            table = symbols.get(filename)
+            if table is None:
+                table = symbols[filename] = symbol_table()
+            # Only names new since the file's last error are indexed
+            table.sync(result.names | namespace.keys())
+            message = explain_name_error(name, table)
+            return "error", output.getvalue(), f"Line {line}: {message}"
+        return "error", output.getvalue(), f"{type(e).__name__}: {e}"
+    return "ok", output.getvalue(), None
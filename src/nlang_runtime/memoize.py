@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/memoize.py
+
+Result caching for procedures qualified with "remembering results" or
+"deterministic".
+
+The cache is functools.lru_cache, bounded to the size given in the
+program: once full, the least recently used result is evicted. Calls
+with an unhashable argument (a list, a dict) cannot be looked up and
+simply run the procedure.
+"""
+
+from typing import Any, Callable
+import functools
+
+def remembering(maxsize: int = 128) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a procedure to remember its last ``maxsize`` distinct results.
+
+    The wrapper exposes cache_info() and cache_clear() like lru_cache.
+    """
+    def decorate(function: Callable[..., Any]) -> Callable[..., Any]:
+        cached = functools.lru_cache(maxsize=maxsize)(function)
+
+        @functools.wraps(function)
+        def call(*args):
+            try:
+                hash(args)
+            except TypeError:
+                return function(*args)
+            return cached(*args)
+
+        call.cache_info = cached.cache_info
+        call.cache_clear = cached.cache_clear
+        return call
+    return decorate
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/parallel.py
+
+Chunked execution of "for each ... in parallel" loops.
+
+The collection is cut into chunks of consecutive elements, and each chunk
+is run by a worker: a forked process by default ("using N workers"), so
+CPU-bound bodies use every core, or a thread ("using N threads"). At most
+two chunks per worker are in flight, so a long collection (a lazy dataset,
+a generator) is never held in memory at once.
+
+Results are collected in the order of the collection, whatever order the
+chunks finish in: what a chunk prints is captured and written out once
+every chunk before it has been, and the partial sums of a summing loop are
+added to the total chunk by chunk. A loop's output is therefore the same
+as when run sequentially. Where fork is not available, processes are
+replaced by threads.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, count, islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import io
+import math
+import multiprocessing
+import os
+import sys
+import threading
+
+# Chunks per worker when the collection's length is known, for load balancing
+DEFAULT_CHUNKS_PER_WORKER = 4
+
+# Elements per chunk for collections without a length
+DEFAULT_CHUNK_SIZE = 256
+
+# Chunks queued per worker beyond the one it is running
+_QUEUED_PER_WORKER = 1
+
+# The running worker's capture buffer; set in worker threads and forked processes
+_state = threading.local()
+
+# The stdout proxy while any loop runs, and how many loops use it: loops
+# started from several threads at once (a concurrent program) share one,
+# so none of them restores sys.stdout while another still needs it
+_output_lock = threading.Lock()
+_output: Optional["_ChunkOutput"] = None
+_output_users = 0
+
+# Chunk functions of the loops running in processes, by key: forked workers
+# inherit them, so loop bodies (closures, lambdas) are never pickled
+_TASKS = {}
+_TASK_KEYS = count()
+
+class _ChunkOutput(io.TextIOBase):
+    """Stands in for sys.stdout while a loop runs: each worker's writes go
+    to its chunk's buffer, anything else to the real stdout."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        buffer = getattr(_state, "buffer", None)
+        return (self.stream if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(_state, "buffer", None) is None:
+            self.stream.flush()
+
+def each(collection: Iterable[Any], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+         threads: bool = False) -> Callable[[Callable[[Any], Any]], Callable[[Any], Any]]:
+    """Decorate a loop body to run it at once for every element of ``collection``.
+
+    The body is returned unchanged, so the decorated definition just
+    leaves it behind as a function.
+    """
+    def run(body: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        for _ in _run_chunks(partial(_run_body, body), collection, workers, chunk_size, threads):
+            pass
+        return body
+    return run
+
+def sum_each(total: Any, element: Callable[[Any], Any], collection: Iterable[Any],
+             condition: Optional[Callable[[Any], Any]] = None, workers: Optional[int] = None,
+             chunk_size: Optional[int] = None, threads: bool = False) -> Any:
+    """Return ``total`` plus ``element(x)`` for every ``x`` in ``collection``
+    for which ``condition(x)`` holds, i.e. the result of the loop::
+
+        for x in collection:
+            if condition(x):
+                total = total + element(x)
+
+    Each chunk adds up its own elements left to right, and the chunk sums
+    are added to ``total`` in order: exact for ints, strings and lists,
+    while a float sum can differ from the loop's in the last bits.
+    """
+    task = partial(_sum_chunk, element, condition)
+    for found, subtotal in _run_chunks(task, collection, workers, chunk_size, threads):
+        if found:
+            total = total + subtotal
+    return total
+
+def _run_body(body: Callable[[Any], Any], chunk: List[Any]):
+    for item in chunk:
+        body(item)
+
+def _sum_chunk(element: Callable[[Any], Any], condition: Optional[Callable[[Any], Any]],
+               chunk: List[Any]) -> Tuple[bool, Any]:
+    """(whether any element was kept, their sum) for one chunk."""
+    found = False
+    subtotal = None
+    for item in chunk:
+        if condition is None or condition(item):
+            value = element(item)
+            subtotal = subtotal + value if found else value
+            found = True
+    return found, subtotal
+
+def _run_chunks(task: Callable[[List[Any]], Any], collection: Iterable[Any], workers: Optional[int],
+                chunk_size: Optional[int], threads: bool) -> Iterator[Any]:
+    """Yield ``task(chunk)`` for every chunk of the collection, in order,
+    writing out each chunk's printed output before its result."""
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("a parallel loop needs at least one worker")
+    if chunk_size is None:
+        chunk_size = _default_chunk_size(collection, workers)
+    elif chunk_size < 1:
+        raise ValueError("chunks of a parallel loop must hold at least one element")
+    chunks = _chunks(collection, chunk_size)
+
+    # A loop inside a worker, a single worker or a single chunk runs right here
+    first = next(chunks, None)
+    second = next(chunks, None) if first is not None else None
+    if getattr(_state, "inside", False) or workers == 1 or second is None:
+        for chunk in chain(() if first is None else (first,), () if second is None else (second,), chunks):
+            yield task(chunk)
+        return
+
+    processes = not threads and "fork" in multiprocessing.get_all_start_methods()
+    key = None
+    with _captured_output() as stdout:
+        if processes:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            # Workers are forked on the first submit, with the task registered
+            key = next(_TASK_KEYS)
+            _TASKS[key] = task
+            submit = partial(pool.submit, _call_registered, key)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nlang-loop")
+            submit = partial(pool.submit, _call, task)
+        pending: deque = deque()
+        try:
+            for chunk in chain((first, second), chunks):
+                pending.append(submit(chunk))
+                if len(pending) > workers * (1 + _QUEUED_PER_WORKER):
+                    yield _collect(pending.popleft(), stdout)
+            while pending:
+                yield _collect(pending.popleft(), stdout)
+        finally:
+            # After a failure, chunks not started yet never run
+            pool.shutdown(wait=True, cancel_futures=True)
+            if key is not None:
+                del _TASKS[key]
+
+@contextmanager
+def _captured_output():
+    """Route each worker's writes to its chunk's buffer while a loop runs;
+    yield the stream everything else goes to."""
+    global _output, _output_users
+    with _output_lock:
+        if _output_users == 0:
+            _output = _ChunkOutput(sys.stdout)
+            sys.stdout = _output
+        _output_users += 1
+        stdout = _output.stream
+    try:
+        yield stdout
+    finally:
+        with _output_lock:
+            _output_users -= 1
+            if _output_users == 0:
+                if sys.stdout is _output:
+                    sys.stdout = _output.stream
+                _output = None
+
+def _collect(future: Future, stdout) -> Any:
+    """A chunk's result, after writing out what it printed."""
+    output, result = future.result()
+    if output:
+        stdout.write(output)
+    return result
+
+def _call(task: Callable[[List[Any]], Any], chunk: List[Any]) -> Tuple[str, Any]:
+    """Run a chunk in a worker; return (printed output, result)."""
+    _state.buffer = buffer = io.StringIO()
+    _state.inside = True
+    try:
+        result = task(chunk)
+        return buffer.getvalue(), result
+    finally:
+        _state.buffer = None
+        _state.inside = False
+
+def _call_registered(key: int, chunk: List[Any]) -> Tuple[str, Any]:
+    """Run a chunk in a forked worker process."""
+    return _call(_TASKS[key], chunk)
+
+def _chunks(collection: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(collection)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _default_chunk_size(collection: Iterable[Any], workers: int) -> int:
+    """A few chunks per worker for sequences; a fixed size for anything else.
+
+    Only indexable collections are asked for their length: a lazy dataset
+    would have to read its whole file to answer.
+    """
+    if hasattr(collection, "__len__") and hasattr(collection, "__getitem__"):
+        return max(1, math.ceil(len(collection) / (workers * DEFAULT_CHUNKS_PER_WORKER)))
+    return DEFAULT_CHUNK_SIZE
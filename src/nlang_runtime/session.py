@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/session.py
+
+Long-lived execution session that keeps program state between inputs.
+"""
+
+import io
+import types
+from contextlib import redirect_stdout
+from typing import Dict, Any, Optional, Union
+
+class ExecutionSession:
+    """Execute generated Python in one persistent, isolated namespace."""
+    
+    def __init__(self, name: str = "__nlang__"):
+        self.name = name
+        self.namespace = self._new_namespace()
+        self.last_output = ""
+    
+    def _new_namespace(self) -> Dict[str, Any]:
+        """Create a fresh module-like namespace, separate from the REPL's own globals."""
+        return {"__name__": self.name, "__builtins__": __builtins__}
+    
+    def execute(self, python_code: Union[str, types.CodeType], filename: str = "<nlang>") -> Optional[str]:
+        """Run Python source or a compiled code object and return anything it printed.
+        
+        Exceptions raised by the program propagate to the caller; the
+        namespace keeps whatever was assigned before the failure.
+        """
+        if isinstance(python_code, types.CodeType):
+            code = python_code
+        else:
+            code = compile(python_code, filename, "exec")
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                exec(code, self.namespace)
+        finally:
+            # Kept even when the program fails part-way through
+            self.last_output = output.getvalue()
+        return self.last_output or None
+    
+    def variables(self) -> Dict[str, Any]:
+        """Return the user-visible variables defined so far."""
+        return {
+            name: value for name, value in self.namespace.items()
+            if not name.startswith("_") and not isinstance(value, types.ModuleType)
+        }
+    
+    def clear(self):
+        """Forget all state."""
+        self.namespace = self._new_namespace()
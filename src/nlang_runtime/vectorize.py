@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/vectorize.py
+
+Bulk NumPy evaluation of the reduction loops lowered by the optimizer.
+
+Generated code calls is_numeric_array() first and only takes the
+accumulate() path for one-dimensional numeric NumPy arrays and pandas
+Series; anything else runs the original loop. NumPy and pandas are never
+imported here: a collection can only be one of their types if the
+program has imported them already.
+"""
+
+from typing import Any, Callable, Optional
+import sys
+
+# Integer results are only trusted while the float64 shadow computation is exact
+_EXACT_FLOAT_LIMIT = 2.0 ** 53
+
+def _as_array(collection: Any) -> Optional[Any]:
+    """The collection as a 1-D numeric ndarray, or None if it is not one."""
+    numpy = sys.modules.get("numpy")
+    if numpy is None:
+        return None
+    if isinstance(collection, numpy.ndarray):
+        values = collection
+    else:
+        pandas = sys.modules.get("pandas")
+        if pandas is None or not isinstance(collection, pandas.Series):
+            return None
+        # Extension dtypes (nullable ints, categoricals) iterate differently
+        if not isinstance(collection.dtype, numpy.dtype):
+            return None
+        values = collection.to_numpy()
+        if values.dtype.kind == "b":
+            # A Series iterates as Python bools, which add up like ints;
+            # an ndarray iterates as NumPy bools, which keep array semantics
+            values = values.astype(numpy.int64)
+    if values.ndim != 1 or values.dtype.kind not in "biuf":
+        return None
+    return values
+
+def is_numeric_array(collection: Any) -> bool:
+    """Whether accumulate() can handle ``collection`` in bulk."""
+    return _as_array(collection) is not None
+
+def accumulate(total: Any, collection: Any, element: Callable[[Any], Any],
+               condition: Optional[Callable[[Any], Any]] = None) -> Any:
+    """Return ``total`` plus ``element(x)`` for every ``x`` in ``collection``
+    for which ``condition(x)`` holds, i.e. the result of the loop::
+
+        for x in collection:
+            if condition(x):
+                total = total + element(x)
+
+    ``element`` and ``condition`` are built from arithmetic and comparison
+    operators only, so calling them once on the whole array computes every
+    element at once. Floats are summed pairwise by NumPy, which can differ
+    from the loop's left-to-right sum in the last bits. Integer sums that
+    could have overflowed int64 are recomputed with the loop, which is
+    exact for a Series (its items are Python ints) and wraps the same way
+    for an ndarray.
+    """
+    numpy = sys.modules.get("numpy")
+    values = _as_array(collection)
+    if values is None:
+        return _accumulate_loop(total, collection, element, condition)
+
+    with numpy.errstate(all="ignore"):
+        terms = numpy.broadcast_to(numpy.asarray(element(values)), values.shape)
+        if condition is not None:
+            mask = numpy.broadcast_to(numpy.asarray(condition(values), dtype=bool), values.shape)
+            terms = terms[mask]
+        if terms.dtype.kind not in "biuf":
+            return _accumulate_loop(total, collection, element, condition)
+        if terms.dtype.kind in "iu":
+            # int64 wraps silently; the same sum in float64 shows whether it could have
+            shadow = numpy.broadcast_to(numpy.asarray(element(values.astype(numpy.float64))), values.shape)
+            if condition is not None:
+                shadow = shadow[mask]
+            if not numpy.abs(shadow).sum() < _EXACT_FLOAT_LIMIT:
+                return _accumulate_loop(total, collection, element, condition)
+        return total + terms.sum().item()
+
+def _accumulate_loop(total: Any, collection: Any, element: Callable[[Any], Any],
+                     condition: Optional[Callable[[Any], Any]]) -> Any:
+    """The loop accumulate() stands for, one element at a time."""
+    for item in collection:
+        if condition is None or condition(item):
+            total = total + element(item)
+    return total
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+src/nlang_runtime/warm_compiler.py
+
+Preloaded by the executor pool's fork server (see executor.py): importing
+this module builds the compiler replacement workers start with, so they
+are forked with the parser's tables built, like the first workers.
+"""
+
+from .executor import _new_compiler
+
+COMPILER = _new_compiler()
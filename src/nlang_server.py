@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+src/nlang_server.py
+
+Local compile server: a long-running process that keeps warm parsers and
+turns NLang into Python for editors, linters and build tools, which then
+pay neither interpreter startup nor parser construction per compile.
+
+    python src/nlang_server.py [--port 8765 | --unix PATH] [-j N] [--concurrent] [--no-optimize]
+
+It speaks JSON over HTTP, on localhost or on a Unix socket:
+
+    POST /compile  {"source": "let x be 1. print x."}
+               ->  {"python": "...", "errors": [{"line": 1, "message": "..."}], "seconds": 0.0004}
+    GET  /stats    requests served, failures and pool size
+
+Statements that fail to parse are left out of "python" and reported in
+"errors", as by the batch compiler. Requests are handled on threads, each
+borrowing one of a pool of converters for its compile; the pool bounds
+how many compiles run at once, and requests beyond it wait their turn.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from parser.transpiler import NLangToPython
+
+DEFAULT_PORT = 8765
+
+# Largest request body accepted, in bytes
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+class CompileService:
+    """A pool of warm converters shared by the server's request threads."""
+
+    def __init__(self, converters: int = 4, optimize: bool = True, concurrent: bool = False):
+        self.converters = converters
+        self._pool: "queue.Queue[NLangToPython]" = queue.Queue()
+        for _ in range(converters):
+            converter = NLangToPython(optimize=optimize, concurrent=concurrent)
+            # Load lark and build the parser tables before the first request
+            converter.convert("let x be 1.", errors=[])
+            self._pool.put(converter)
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "failed": 0}
+
+    def compile(self, source: str) -> Dict[str, Any]:
+        """Convert one program; return the response for it."""
+        start = time.perf_counter()
+        errors: List[Any] = []
+        converter = self._pool.get()
+        try:
+            python = converter.convert(source, errors)
+        except Exception as e:
+            # Semantic errors (a parallel loop setting a shared variable, ...) reject the whole program
+            python = None
+            errors.append(e)
+        finally:
+            self._pool.put(converter)
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["failed"] += bool(errors)
+        return {
+            "python": python,
+            "errors": [{"line": getattr(error, "line", None), "message": str(error)} for error in errors],
+            "seconds": time.perf_counter() - start,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Requests served, those with errors, and the pool size."""
+        with self._lock:
+            return dict(self._counts, converters=self.converters)
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON endpoints; ``self.server.service`` does the work."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/compile":
+            return self._reply(404, {"error": f"no such endpoint: {self.path}"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            return self._reply(413, {"error": f"request larger than {MAX_REQUEST_BYTES} bytes"})
+        try:
+            request = json.loads(self.rfile.read(length))
+            source = request["source"]
+            if not isinstance(source, str):
+                raise TypeError("source must be a string")
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {"error": f"expected {{\"source\": \"...\"}}: {e}"})
+        self._reply(200, self.server.service.compile(source))
+
+    def do_GET(self):
+        if self.path != "/stats":
+            return self._reply(404, {"error": f"no such endpoint: {self.path}"})
+        self._reply(200, self.server.service.stats())
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format: str, *args):
+        # A line per request would drown the startup message and any tracebacks
+        pass
+
+# Connections waiting to be accepted; bursts from parallel builds exceed the default 5
+_BACKLOG = 128
+
+class _LocalHTTPServer(ThreadingHTTPServer):
+    request_queue_size = _BACKLOG
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = _BACKLOG
+
+    def server_bind(self):
+        # A socket file left by a server that died would make bind() fail
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+def make_server(service: CompileService, port: int = DEFAULT_PORT, unix: Optional[str] = None):
+    """An HTTP server for the service on localhost or a Unix socket; call serve_forever() on it."""
+    if unix is not None:
+        server = _UnixHTTPServer(unix, _Handler)
+    else:
+        server = _LocalHTTPServer(("127.0.0.1", port), _Handler)
+    server.service = service
+    return server
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+def connect(port: int = DEFAULT_PORT, unix: Optional[str] = None,
+            timeout: Optional[float] = 60) -> http.client.HTTPConnection:
+    """A connection to a running server; reuse it for many requests."""
+    if unix is not None:
+        return _UnixHTTPConnection(unix, timeout)
+    return http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+
+def request_compile(connection: http.client.HTTPConnection, source: str) -> Dict[str, Any]:
+    """Send one program over ``connection``; return the server's response."""
+    connection.request("POST", "/compile", json.dumps({"source": source}),
+                       {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    body = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"compile server answered {response.status}: {body.get('error')}")
+    return body
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Serve NLang-to-Python compiles as JSON over HTTP.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="localhost port to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="listen on this Unix socket instead of a port")
+    parser.add_argument("-j", "--converters", type=int, default=4, help="warm converters, i.e. compiles at once")
+    parser.add_argument("--no-optimize", action="store_true", help="skip constant folding and dead code removal")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="generate programs that run independent statements concurrently")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    service = CompileService(args.converters, not args.no_optimize, args.concurrent)
+    server = make_server(service, args.port, args.unix)
+    where = args.unix or f"http://127.0.0.1:{args.port}"
+    print(f"NLang compile server on {where} ({args.converters} converters, "
+          f"ready in {time.perf_counter() - start:.2f}s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+src/parser/artifact_cache.py
+
+Content-addressed on-disk cache of transpiled programs.
+"""
+
+# Annotations are not evaluated and typing is not imported: this module is
+# on the path of a cached 'python -m nlang' run, which must start fast
+from __future__ import annotations
+
+from types import CodeType
+import hashlib
+import marshal
+import os
+import sys
+
+from .build_info import DEFAULT_GRAMMAR, TRANSPILER_VERSION, get_cache_dir, grammar_hash
+from .lexicon import current_signature
+
+class ArtifactCache:
+    """Store generated Python and code objects, ``.pyc``-style.
+    
+    Artifacts are keyed by the NLang source, the file name baked into the
+    code object, the grammar hash, the transpiler version and the Python
+    version (marshal data is version specific), the domain packs in use,
+    and ``variant``, which names the build options (such as concurrent
+    scheduling) that change the output for the same source. Writes are
+    atomic, and the directory is kept under ``max_bytes`` by evicting the
+    least recently used artifacts. Setting NLANG_NO_CACHE bypasses the
+    cache.
+    """
+    
+    MAGIC = b"NLC1"
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    
+    def __init__(self, directory: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 enabled: bool | None = None, grammar_path: str = DEFAULT_GRAMMAR, variant: str = ""):
+        self.directory = directory or os.path.join(get_cache_dir(), 'artifacts')
+        self.max_bytes = max_bytes
+        self.enabled = not os.environ.get('NLANG_NO_CACHE') if enabled is None else enabled
+        self._salt = "\0".join((grammar_hash(grammar_path), TRANSPILER_VERSION, sys.version, variant))
+        self.hits = 0
+        self.misses = 0
+    
+    def key(self, source: str, filename: str) -> str:
+        """Content address of a program's artifact."""
+        digest = hashlib.sha256()
+        # Long-running processes see pack edits (see lexicon.current_signature)
+        for part in (self._salt, current_signature(), filename, source):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".nlc")
+    
+    def get(self, source: str, filename: str = "<nlang>") -> tuple[str, CodeType] | None:
+        """Return (python source, code object) for a program, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(self.key(source, filename))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(self.MAGIC):
+                raise ValueError("bad artifact header")
+            python, code = marshal.loads(data[len(self.MAGIC):])
+            # Touch the artifact so eviction sees it as recently used
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return python, code
+    
+    def put(self, source: str, python: str, code: CodeType, filename: str = "<nlang>"):
+        """Store a program's artifact, then evict old artifacts if over budget."""
+        if not self.enabled:
+            return
+        # Only writes need tempfile, which is slow to import; reads stay light
+        import tempfile
+        
+        data = self.MAGIC + marshal.dumps((python, code))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(self.key(source, filename)))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._evict()
+        except OSError:
+            # Caching is best effort
+            pass
+    
+    def _evict(self):
+        """Delete least recently used artifacts until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.nlc'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+    
+    def clear(self):
+        """Remove every artifact."""
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.nlc', '.tmp')):
+                    os.unlink(entry.path)
+    
+    def stats(self) -> dict:
+        """Hit/miss counts for this process."""
+        return {"hits": self.hits, "misses": self.misses, "enabled": self.enabled}
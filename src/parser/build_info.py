@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+src/parser/build_info.py
+
+What compiled artifacts depend on: the grammar, the transpiler version and
+the cache location. Kept free of heavy imports so that cache lookups do
+not load the parser.
+"""
+
+import hashlib
+import os
+
+# Bump whenever the code generated for the same input changes; part of
+# the on-disk artifact cache key
+TRANSPILER_VERSION = "2"
+
+GRAMMAR_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'grammar'))
+DEFAULT_GRAMMAR = os.path.join(GRAMMAR_DIR, 'nlang.lark')
+
+def get_cache_dir() -> str:
+    """Return the directory used for on-disk NLang caches."""
+    return os.environ.get('NLANG_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'nlang')
+
+def grammar_hash(grammar_path: str = DEFAULT_GRAMMAR) -> str:
+    """Return the SHA-256 of a grammar file's contents."""
+    with open(grammar_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+src/parser/codegen.py
+
+Code generator that converts NLang AST directly to Python AST nodes.
+
+This is the only lowering of NLang constructs: compile() and the
+incremental compiler compile its nodes, and the transpiler writes the
+same nodes out as source.
+"""
+
+from types import CodeType
+from typing import Dict, List, Any, Optional
+import ast as python_ast
+import sys
+import threading
+
+from .nodes import Node
+from .dataflow import Step, check_program, plan, step_name
+from .optimizer import VECTOR_RUNTIME, DATASET_RUNTIME, MEMO_RUNTIME, PARALLEL_RUNTIME, DATAFLOW_RUNTIME, free_names
+from .parallel import LOOP_BODY, check_parallel, loop_options, reduction
+from .procedures import check_pure, global_writes, memo_size, parameter_names
+
+# Binary operator nodes: type -> Python AST operator class
+BINARY_OPERATORS = {
+    "add": python_ast.Add,
+    "subtract": python_ast.Sub,
+    "multiply": python_ast.Mult,
+    "divide": python_ast.Div,
+}
+
+# Comparison nodes: type -> Python AST comparison operator class
+COMPARISON_OPERATORS = {
+    "equal": python_ast.Eq,
+    "not_equal": python_ast.NotEq,
+    "less": python_ast.Lt,
+    "less_equal": python_ast.LtE,
+    "greater": python_ast.Gt,
+    "greater_equal": python_ast.GtE,
+}
+
+# Logical nodes: type -> Python AST boolean operator class
+BOOLEAN_OPERATORS = {
+    "and": python_ast.And,
+    "or": python_ast.Or,
+}
+
+# Unary nodes: type -> Python AST unary operator class
+UNARY_OPERATORS = {
+    "negate": python_ast.USub,
+    "not": python_ast.Not,
+}
+
+class CodeGenerationError(Exception):
+    """Raised when an AST node cannot be lowered to Python."""
+    pass
+
+# Deepest module compile_module() raises the recursion limit for; deeper
+# ones would overflow the C stack during compile()
+MAX_NESTING = 10000
+
+# compile_module() changes the interpreter-wide recursion limit
+_RECURSION_LIMIT_LOCK = threading.Lock()
+
+def compile_module(module: python_ast.Module, filename: str) -> CodeType:
+    """compile() a generated module, however deep its expressions nest.
+
+    Python turns an AST object into its internal form recursively, one
+    level of the recursion limit per nested node, so a long "plus" chain
+    fails where the same expression as source text compiles. Such modules
+    are compiled again with the limit raised for their depth.
+    """
+    try:
+        return compile(module, filename, "exec")
+    except RecursionError:
+        pass
+    depth = 0
+    stack = [(module, 1)]
+    while stack:
+        node, level = stack.pop()
+        depth = max(depth, level)
+        stack.extend((child, level + 1) for child in python_ast.iter_child_nodes(node))
+    if depth > MAX_NESTING:
+        raise CodeGenerationError(f"Expressions nest {depth} levels deep; at most {MAX_NESTING} can be compiled")
+    with _RECURSION_LIMIT_LOCK:
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(limit + depth)
+        try:
+            return compile(module, filename, "exec")
+        finally:
+            sys.setrecursionlimit(limit)
+
+class NLangCodeGenerator:
+    """Convert NLang AST to a Python ``ast.Module``.
+
+    No Python source text is produced: the module can be passed straight
+    to ``compile()``, and every generated node carries the line number of
+    the NLang statement it came from. NLangTranspiler writes the same
+    nodes out when source is wanted.
+    """
+
+    def __init__(self, locate: bool = True):
+        # Whether nodes get line numbers; only compile() needs them
+        self.locate = locate
+
+    def generate_program(self, statements: List[Dict[str, Any]], concurrent: bool = False) -> python_ast.Module:
+        """Convert a list of AST statements to a Python module.
+
+        With ``concurrent``, independent statements run concurrently when
+        the program has any (see dataflow.py).
+        """
+        unwrapped = [unwrap(statement) for statement in statements]
+        check_program(unwrapped)
+        bodies = [self.statements(statement) for statement in unwrapped]
+        steps = plan(unwrapped) if concurrent else None
+        if steps is not None:
+            return python_ast.Module(body=self.schedule(steps, bodies), type_ignores=[])
+        return python_ast.Module(body=[node for body in bodies for node in body], type_ignores=[])
+
+    def schedule(self, steps: List[Step], bodies: List[List[python_ast.stmt]]) -> List[python_ast.stmt]:
+        """Wrap each top-level statement's Python statements in a step function,
+        then hand the steps and their dependencies to the dataflow runtime."""
+        module = [python_ast.Import(names=[python_ast.alias(name=DATAFLOW_RUNTIME)])]
+        self._locate(module[0], 1)
+        entries = []
+        line = 1
+        for index, (step, body) in enumerate(zip(steps, bodies)):
+            line = getattr(body[0], "lineno", line) if body else line
+            statements = list(body) or [python_ast.Pass()]
+            if step.writes:
+                declaration = python_ast.Global(names=list(step.writes))
+                self._locate(declaration, line)
+                statements.insert(0, declaration)
+            function = python_ast.FunctionDef(
+                name=step_name(index), body=statements, decorator_list=[], returns=None,
+                args=python_ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]))
+            if "type_params" in python_ast.FunctionDef._fields:
+                function.type_params = []
+            self._locate(function, line)
+            module.append(function)
+            waits = [python_ast.Constant(value=index) for index in step.dependencies]
+            entries.append(python_ast.Tuple(elts=[python_ast.Name(id=step_name(index), ctx=python_ast.Load()),
+                                                  python_ast.Tuple(elts=waits, ctx=python_ast.Load()),
+                                                  python_ast.Constant(value=step.offload)], ctx=python_ast.Load()))
+        run = python_ast.Expr(value=python_ast.Call(func=_dotted(f"{DATAFLOW_RUNTIME}.run"), keywords=[],
+                                                    args=[python_ast.List(elts=entries, ctx=python_ast.Load())]))
+        self._locate(run, line)
+        module.append(run)
+        return module
+
+    def statements(self, ast: Dict[str, Any]) -> List[python_ast.stmt]:
+        """Convert a statement node to Python statements located at its line.
+
+        This is generate() plus the import of the runtime module the
+        statement calls into, if any.
+        """
+        node = self.generate(ast)
+        if node is None:
+            return []
+        nodes = [node]
+        module = _runtime_module(ast)
+        if module is not None:
+            nodes.insert(0, python_ast.Import(names=[python_ast.alias(name=module)]))
+        for node in nodes:
+            self._locate(node, ast.get("line") or 1)
+        return nodes
+
+    def generate(self, ast: Dict[str, Any]) -> Optional[python_ast.stmt]:
+        """Convert a single statement node to a Python statement."""
+        node_type = ast.get("type")
+        children = ast.get("children", [])
+
+        if node_type in ("let", "define", "set"):
+            target = python_ast.Name(id=self._identifier(children[0]), ctx=python_ast.Store())
+            return python_ast.Assign(targets=[target], value=self.expression(children[1]))
+        elif node_type == "print":
+            args = [self.expression(children[0])] if children else []
+            call = python_ast.Call(func=python_ast.Name(id="print", ctx=python_ast.Load()), args=args, keywords=[])
+            return python_ast.Expr(value=call)
+        elif node_type == "import":
+            return python_ast.Import(names=[python_ast.alias(name=self._identifier(children[0]))])
+        elif node_type == "return":
+            return python_ast.Return(value=self.expression(children[0]) if children else None)
+        elif node_type == "call_statement":
+            return python_ast.Expr(value=self.expression(children[0]))
+        elif node_type == "if":
+            orelse = self._block(children[2]) if len(children) > 2 else []
+            return python_ast.If(test=self.expression(children[0]), body=self._block(children[1]), orelse=orelse)
+        elif node_type == "for":
+            target = python_ast.Name(id=self._identifier(children[0]), ctx=python_ast.Store())
+            return python_ast.For(target=target, iter=self.expression(children[1]),
+                                  body=self._block(children[2]), orelse=[])
+        elif node_type == "parallel_for":
+            return self._parallel_for(ast)
+        elif node_type == "for_range":
+            # Both bounds are inclusive: "for i from 1 to 3" runs over range(1, 4)
+            target = python_ast.Name(id=self._identifier(children[0]), ctx=python_ast.Store())
+            end = children[2]
+            if end.get("type") == "number" and type(end.get("value")) is int:
+                stop = python_ast.Constant(value=end["value"] + 1)
+            else:
+                stop = python_ast.BinOp(left=self.expression(end), op=python_ast.Add(),
+                                        right=python_ast.Constant(value=1))
+            bounds = python_ast.Call(func=python_ast.Name(id="range", ctx=python_ast.Load()),
+                                     args=[self.expression(children[1]), stop], keywords=[])
+            return python_ast.For(target=target, iter=bounds, body=self._block(children[3]), orelse=[])
+        elif node_type == "while":
+            return python_ast.While(test=self.expression(children[0]), body=self._block(children[1]), orelse=[])
+        elif node_type == "vector_loop":
+            return self._vector_loop(ast)
+        elif node_type == "procedure":
+            return self._procedure(ast)
+        elif node_type == "load":
+            loader = python_ast.Call(func=_dotted(f"{DATASET_RUNTIME}.load_csv"),
+                                     args=[self.expression(children[1])], keywords=[])
+            return self._assign(children[0], loader)
+        elif node_type == "split":
+            source, first, first_percent, second, second_percent = children
+            targets = python_ast.Tuple(elts=[python_ast.Name(id=self._identifier(name), ctx=python_ast.Store())
+                                             for name in (first, second)], ctx=python_ast.Store())
+            parts = self._method(source, "split", [self.expression(first_percent), self.expression(second_percent)])
+            return python_ast.Assign(targets=[targets], value=parts)
+        elif node_type == "filter":
+            # The condition's names become parameters, bound by the runtime to columns or
+            # variables; locals() holds those of an enclosing procedure
+            source, condition, target = children
+            parameters = python_ast.arguments(posonlyargs=[], args=[python_ast.arg(arg=name)
+                                                                    for name in free_names(condition)],
+                                              kwonlyargs=[], kw_defaults=[], defaults=[])
+            predicate = python_ast.Lambda(args=parameters, body=self.expression(condition))
+            scope = python_ast.Call(func=python_ast.Name(id="locals", ctx=python_ast.Load()), args=[], keywords=[])
+            return self._assign(target, self._method(source, "where", [predicate, scope]))
+        elif node_type == "select":
+            *columns, source, target = children
+            names = [python_ast.Constant(value=self._identifier(column)) for column in columns]
+            return self._assign(target, self._method(source, "select", names))
+        else:
+            raise CodeGenerationError(f"Unsupported statement type: {node_type}")
+
+    def expression(self, ast: Dict[str, Any]) -> python_ast.expr:
+        """Convert an expression node to a Python expression.
+
+        The tree is walked with an explicit stack: operands are converted first and each operator
+        node is built from the finished ones, so long "plus" chains never
+        hit the recursion limit.
+        """
+        built: List[python_ast.expr] = []
+        # (node, True) once its operands have been scheduled
+        stack = [(ast, False)]
+        while stack:
+            node, ready = stack.pop()
+            node_type = node.get("type")
+            if ready:
+                operands = _operands(node)
+                count = len(built) - len(operands)
+                built[count:] = [self._operator(node, built[count:])]
+            elif node_type == "identifier":
+                built.append(python_ast.Name(id=node["value"], ctx=python_ast.Load()))
+            elif node_type in ("number", "string", "boolean"):
+                # Constants carry their own value, so no quoting or escaping is involved
+                built.append(python_ast.Constant(value=node["value"]))
+            elif node_type in ("value", "in_clause", "where_clause") and len(node.get("children", [])) == 1:
+                # Wrappers stand for their only child
+                stack.append((node["children"][0], False))
+            elif _operands(node) is not None:
+                stack.append((node, True))
+                # Pushed in reverse, so operands finish left to right
+                stack.extend((operand, False) for operand in reversed(_operands(node)))
+            else:
+                raise CodeGenerationError(f"Unsupported expression type: {node_type}")
+        return built[0]
+
+    def _operator(self, ast: Dict[str, Any], operands: List[python_ast.expr]) -> python_ast.expr:
+        """Build an operator or call node from its converted operands."""
+        node_type = ast.get("type")
+        if node_type in BINARY_OPERATORS or node_type == "value":
+            left, right = operands
+            # A two-part value is an addition ("5 plus 3")
+            operator = BINARY_OPERATORS.get(node_type, python_ast.Add)
+            return python_ast.BinOp(left=left, op=operator(), right=right)
+        elif node_type in COMPARISON_OPERATORS:
+            left, right = operands
+            return python_ast.Compare(left=left, ops=[COMPARISON_OPERATORS[node_type]()], comparators=[right])
+        elif node_type in BOOLEAN_OPERATORS:
+            return python_ast.BoolOp(op=BOOLEAN_OPERATORS[node_type](), values=operands)
+        elif node_type in UNARY_OPERATORS:
+            return python_ast.UnaryOp(op=UNARY_OPERATORS[node_type](), operand=operands[0])
+        name = ast["children"][0]
+        return python_ast.Call(func=python_ast.Name(id=self._identifier(name), ctx=python_ast.Load()),
+                               args=operands, keywords=[])
+
+    def _vector_loop(self, ast: Dict[str, Any]) -> python_ast.If:
+        """Lower a vectorized reduction: bulk evaluation for numeric arrays, else the original loop."""
+        loop, target, element, *condition = ast["children"]
+        line = ast.get("line") or 1
+        variable, collection = loop["children"][:2]
+        total = self._identifier(target)
+
+        def function(body):
+            arguments = python_ast.arguments(posonlyargs=[], args=[python_ast.arg(arg=self._identifier(variable))],
+                                             kwonlyargs=[], kw_defaults=[], defaults=[])
+            return python_ast.Lambda(args=arguments, body=self.expression(body))
+
+        bulk = python_ast.Assign(
+            targets=[python_ast.Name(id=total, ctx=python_ast.Store())],
+            value=python_ast.Call(func=_dotted(f"{VECTOR_RUNTIME}.accumulate"), keywords=[], args=[
+                python_ast.Name(id=total, ctx=python_ast.Load()), self.expression(collection), function(element),
+                function(condition[0]) if condition else python_ast.Constant(value=None)]))
+        fallback = self.generate(loop)
+        self._locate(bulk, line)
+        self._locate(fallback, line)
+        test = python_ast.Call(func=_dotted(f"{VECTOR_RUNTIME}.is_numeric_array"),
+                               args=[self.expression(collection)], keywords=[])
+        return python_ast.If(test=test, body=[bulk], orelse=[fallback])
+
+    def _parallel_for(self, ast: Dict[str, Any]) -> python_ast.stmt:
+        """Lower a parallel loop: a summing one to sum_each(), any other to a
+        body function that each() runs for every element."""
+        check_parallel(ast)
+        variable, collection, body = ast["children"][:3]
+        arguments, threads = loop_options(ast)
+        keywords = [python_ast.keyword(arg=name, value=self.expression(value)) for name, value in arguments.items()]
+        if threads:
+            keywords.append(python_ast.keyword(arg="threads", value=python_ast.Constant(value=True)))
+        parameters = python_ast.arguments(posonlyargs=[], args=[python_ast.arg(arg=self._identifier(variable))],
+                                          kwonlyargs=[], kw_defaults=[], defaults=[])
+        matched = reduction(ast)
+        if matched is not None:
+            target, element, condition = matched
+            total = python_ast.Name(id=self._identifier(target), ctx=python_ast.Load())
+            test = (python_ast.Lambda(args=parameters, body=self.expression(condition)) if condition is not None
+                    else python_ast.Constant(value=None))
+            return self._assign(target, python_ast.Call(
+                func=_dotted(f"{PARALLEL_RUNTIME}.sum_each"), keywords=keywords,
+                args=[total, python_ast.Lambda(args=parameters, body=self.expression(element)),
+                      self.expression(collection), test]))
+        decorator = python_ast.Call(func=_dotted(f"{PARALLEL_RUNTIME}.each"), args=[self.expression(collection)],
+                                    keywords=keywords)
+        function = python_ast.FunctionDef(name=LOOP_BODY, args=parameters, body=self._block(body),
+                                          decorator_list=[decorator], returns=None)
+        if "type_params" in python_ast.FunctionDef._fields:
+            function.type_params = []
+        return function
+
+    def _procedure(self, ast: Dict[str, Any]) -> python_ast.FunctionDef:
+        """Lower a procedure definition; a memoized one must be pure and gets a caching decorator."""
+        name, _, body = ast["children"][:3]
+        decorators = []
+        size = memo_size(ast)
+        if size is not None:
+            check_pure(ast)
+            decorators.append(python_ast.Call(func=_dotted(f"{MEMO_RUNTIME}.remembering"),
+                                              args=[python_ast.Constant(value=size)], keywords=[]))
+        statements = self._block(body)
+        written = global_writes(ast)
+        if written:
+            declaration = python_ast.Global(names=written)
+            self._locate(declaration, ast.get("line") or 1)
+            statements.insert(0, declaration)
+        arguments = python_ast.arguments(posonlyargs=[], args=[python_ast.arg(arg=name) for name in parameter_names(ast)],
+                                         kwonlyargs=[], kw_defaults=[], defaults=[])
+        function = python_ast.FunctionDef(name=self._identifier(name), args=arguments, body=statements,
+                                          decorator_list=decorators, returns=None)
+        if "type_params" in python_ast.FunctionDef._fields:
+            # Python 3.12+ requires the field
+            function.type_params = []
+        return function
+
+    def _assign(self, target: Dict[str, Any], value: python_ast.expr) -> python_ast.Assign:
+        """Assign ``value`` to the variable named by an identifier node."""
+        return python_ast.Assign(targets=[python_ast.Name(id=self._identifier(target), ctx=python_ast.Store())],
+                                 value=value)
+
+    def _method(self, owner: Dict[str, Any], method: str, args: List[python_ast.expr]) -> python_ast.Call:
+        """Call a method of the variable named by an identifier node."""
+        function = python_ast.Attribute(value=python_ast.Name(id=self._identifier(owner), ctx=python_ast.Load()),
+                                        attr=method, ctx=python_ast.Load())
+        return python_ast.Call(func=function, args=args, keywords=[])
+
+    def _block(self, ast: Dict[str, Any]) -> List[python_ast.stmt]:
+        """Convert the body of a compound statement; each statement keeps its own line."""
+        body = []
+        for statement in ast.get("children", []):
+            body.extend(self.statements(statement))
+        # Python blocks cannot be empty
+        return body or [python_ast.Pass()]
+
+    def _identifier(self, ast: Dict[str, Any]) -> str:
+        """Extract identifier value from AST node."""
+        if isinstance(ast, (dict, Node)) and ast.get("type") == "identifier":
+            return ast["value"]
+        raise CodeGenerationError(f"Expected an identifier, got {ast!r}")
+
+    def _locate(self, node: python_ast.AST, line: int):
+        """Point a generated statement and its sub-nodes at an NLang source line.
+
+        Statements nested in its blocks were located by _block() and keep
+        their own lines; an empty block's ``pass`` takes the given line.
+        """
+        if not self.locate:
+            return
+        stack = [node]
+        while stack:
+            child = stack.pop()
+            if "lineno" in child._attributes:
+                child.lineno = child.end_lineno = line
+                child.col_offset = child.end_col_offset = 0
+            stack.extend(sub for sub in python_ast.iter_child_nodes(child)
+                         if not isinstance(sub, python_ast.stmt) or isinstance(sub, python_ast.Pass))
+
+def _operands(ast: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """The sub-expressions an operator or call node is built from, or None for other nodes."""
+    node_type = ast.get("type")
+    if node_type in BINARY_OPERATORS or node_type in COMPARISON_OPERATORS or node_type in BOOLEAN_OPERATORS:
+        return ast["children"]
+    if node_type in UNARY_OPERATORS:
+        return ast["children"][:1]
+    if node_type == "call":
+        # The first child names the function
+        return ast["children"][1:]
+    if node_type == "value" and len(ast.get("children", ())) == 2:
+        return ast["children"]
+    return None
+
+def unwrap(statement: Dict[str, Any]) -> Dict[str, Any]:
+    """The let/if/for/... node of a statement; single-statement parses wrap
+    it in start/statement nodes."""
+    while statement.get("type") in ("start", "statement"):
+        statement = statement["children"][0]
+    return statement
+
+def _runtime_module(ast: Dict[str, Any]) -> Optional[str]:
+    """The runtime module a statement's lowering calls into, if any."""
+    node_type = ast.get("type")
+    if node_type == "load":
+        return DATASET_RUNTIME
+    if node_type == "procedure" and len(ast["children"]) > 3:
+        return MEMO_RUNTIME
+    if node_type == "parallel_for":
+        return PARALLEL_RUNTIME
+    return None
+
+def _dotted(name: str) -> python_ast.expr:
+    """Load a dotted name such as ``package.module.function``."""
+    first, *attributes = name.split(".")
+    node = python_ast.Name(id=first, ctx=python_ast.Load())
+    for attribute in attributes:
+        node = python_ast.Attribute(value=node, attr=attribute, ctx=python_ast.Load())
+    return node
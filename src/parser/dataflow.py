@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+src/parser/dataflow.py
+
+Dependency analysis of a program's top-level statements, so independent
+ones can run concurrently on a thread pool (see nlang_runtime/dataflow.py).
+
+A statement depends on an earlier one when
+- it reads a name the earlier one writes (def-use),
+- it writes a name the earlier one reads or writes,
+- both have visible effects (print, call statements), so output keeps
+  its source order,
+- either is a barrier: imports, returns and unknown statements.
+
+A call to a procedure defined in the program counts as reading, writing
+and printing whatever that procedure does. Calls to any other function
+are assumed not to print or touch program variables: that is what lets
+"let model be load_model(...)" statements overlap.
+"""
+
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .nodes import Node
+from .procedures import BINDING_CHILDREN, check_pure, parameter_names
+
+# Statements whose effects the analysis understands; any other is a barrier
+KNOWN_STATEMENTS = frozenset(BINDING_CHILDREN) | {
+    "set", "print", "call_statement", "if", "while", "block", "vector_loop", "parallel_for", "import", "return",
+}
+
+# Statements that must run in order with every other statement
+BARRIER_STATEMENTS = ("import", "return")
+
+# Statements with output, run in source order among themselves
+VISIBLE_STATEMENTS = ("print", "call_statement")
+
+# Statements worth a worker thread even without a call
+LOOP_STATEMENTS = ("for", "for_range", "while", "vector_loop", "parallel_for")
+
+class Effects(NamedTuple):
+    """What running a statement (or calling a procedure) reads and changes."""
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    visible: bool
+    barrier: bool
+    # Calls a function or loops, so it may take a while: run it on a worker thread
+    offload: bool
+
+class Step(NamedTuple):
+    """A top-level statement as scheduled: what it waits for and which globals it sets."""
+    dependencies: Tuple[int, ...]
+    offload: bool
+    writes: Tuple[str, ...]
+
+def analyze(statement: Dict[str, Any], procedures: Optional[Dict[str, Effects]] = None) -> Effects:
+    """The effects of running one statement, including the procedures it calls."""
+    reads, bound, assigned, visible, barrier, offload, calls = _walk([statement])
+    for name in calls:
+        effects = (procedures or {}).get(name)
+        if effects is not None:
+            reads |= effects.reads
+            assigned |= effects.writes
+            visible = visible or effects.visible
+            barrier = barrier or effects.barrier
+    return Effects(frozenset(reads), frozenset(bound | assigned), visible, barrier, offload)
+
+def procedure_effects(statements: List[Dict[str, Any]],
+                      known: Optional[Dict[str, Effects]] = None) -> Dict[str, Effects]:
+    """The global effects of calling each procedure the program defines at top level.
+
+    ``known`` gives the effects of procedures defined elsewhere (earlier
+    batches of a streamed program) that these may call.
+    """
+    local_effects = {}
+    callees = {}
+    for statement in statements:
+        if statement.get("type") != "procedure":
+            continue
+        name = statement["children"][0].get("value")
+        body = statement["children"][2].get("children", ())
+        reads, bound, assigned, visible, barrier, _, calls = _walk(body, in_procedure=True)
+        local = bound | set(parameter_names(statement))
+        local_effects[name] = Effects(frozenset(reads - local), frozenset(assigned - local), visible, barrier, True)
+        callees[name] = calls
+
+    # Procedures calling procedures: merge until nothing changes
+    effects = dict(known or {})
+    effects.update(local_effects)
+    changed = True
+    while changed:
+        changed = False
+        for name, called in callees.items():
+            merged = effects[name]
+            for callee in called:
+                other = effects.get(callee)
+                if other is not None and callee != name:
+                    merged = Effects(merged.reads | other.reads, merged.writes | other.writes,
+                                     merged.visible or other.visible, merged.barrier or other.barrier, True)
+            if merged != effects[name]:
+                effects[name] = merged
+                changed = True
+    return effects
+
+def check_program(statements: List[Dict[str, Any]],
+                  known: Optional[Dict[str, Effects]] = None) -> Dict[str, Effects]:
+    """Check what the program's procedures do where that matters; return their effects.
+
+    A memoized procedure may not call one that prints or sets globals,
+    and a parallel loop may not call one that sets globals. Lowering
+    checks each statement on its own; these are the checks that need the
+    rest of the program.
+    """
+    procedures = procedure_effects(statements, known)
+    if procedures:
+        for statement in statements:
+            check_statement(statement, procedures)
+    return procedures
+
+def check_statement(statement: Dict[str, Any], procedures: Dict[str, Effects]):
+    """Raise ProcedureError or ParallelLoopError for a memoized procedure or
+    parallel loop, in or nested in the statement, that calls one with effects."""
+    # The parallel module imports the optimizer, which imports this one
+    from .parallel import check_parallel
+
+    stack = [statement]
+    while stack:
+        node = stack.pop()
+        children = node.get("children", ())
+        node_type = node.get("type")
+        if node_type == "procedure" and len(children) > 3:
+            check_pure(node, procedures)
+        elif node_type == "parallel_for":
+            check_parallel(node, procedures)
+        # Only statements in blocks (and procedure bodies) can hold more
+        for child in children:
+            if isinstance(child, (dict, Node)) and child.get("type") == "block":
+                stack.extend(child.get("children", ()))
+
+def dependencies(effects: List[Effects]) -> List[Tuple[int, ...]]:
+    """For each statement, the earlier statements it must wait for."""
+    last_writer: Dict[str, int] = {}
+    readers: Dict[str, List[int]] = {}
+    last_visible = None
+    last_barrier = None
+    since_barrier: List[int] = []
+    result = []
+    for index, effect in enumerate(effects):
+        waits = set()
+        if last_barrier is not None:
+            waits.add(last_barrier)
+        if effect.barrier:
+            waits.update(since_barrier)
+        else:
+            for name in effect.reads:
+                if name in last_writer:
+                    waits.add(last_writer[name])
+            for name in effect.writes:
+                if name in last_writer:
+                    waits.add(last_writer[name])
+                waits.update(readers.get(name, ()))
+            if effect.visible and last_visible is not None:
+                waits.add(last_visible)
+        waits.discard(index)
+        result.append(tuple(sorted(waits)))
+
+        if effect.barrier:
+            # Everything before has finished once the barrier has run
+            last_writer, readers, last_visible = {}, {}, None
+            last_barrier = index
+            since_barrier = []
+        else:
+            since_barrier.append(index)
+            for name in effect.reads:
+                readers.setdefault(name, []).append(index)
+            if effect.visible:
+                last_visible = index
+        for name in effect.writes:
+            last_writer[name] = index
+            readers[name] = []
+    return result
+
+def plan(statements: List[Dict[str, Any]]) -> Optional[List[Step]]:
+    """Schedule a program's top-level statements, or None if nothing could overlap.
+
+    Every statement must wait for the one before it in a plain chain,
+    which then runs faster as ordinary sequential code.
+    """
+    procedures = procedure_effects(statements)
+    effects = [analyze(statement, procedures) for statement in statements]
+    waits = dependencies(effects)
+    if all(index - 1 in waits[index] for index in range(1, len(waits))):
+        return None
+    if not any(effect.offload for effect in effects):
+        return None
+    return [Step(waits_for, effect.offload, tuple(sorted(effect.writes)))
+            for waits_for, effect in zip(waits, effects)]
+
+def step_name(index: int) -> str:
+    """Name of the function that runs top-level statement ``index``."""
+    return f"_nlang_step_{index}"
+
+def _walk(statements, in_procedure: bool = False):
+    """Collect (reads, bound, assigned, visible, barrier, offload, calls) over statements.
+
+    Procedure definitions bind their name; their bodies run only when
+    called and are not entered. Within a procedure's body, a return only
+    ends the procedure and is not a barrier.
+    """
+    reads, bound, assigned, calls = set(), set(), set(), set()
+    visible = barrier = offload = False
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, (dict, Node)):
+            continue
+        node_type = node.get("type")
+        children = node.get("children", ())
+        if node_type == "identifier":
+            reads.add(node.get("value"))
+            continue
+        if node_type == "call":
+            calls.add(children[0].get("value"))
+            offload = True
+        elif node_type == "import":
+            # "import a.b" binds a
+            bound.add(children[0].get("value").split(".")[0])
+            barrier = True
+            continue
+        elif node_type in BINDING_CHILDREN:
+            for position in BINDING_CHILDREN[node_type]:
+                bound.add(children[position].get("value"))
+            if node_type == "procedure":
+                continue
+        elif node_type == "set":
+            assigned.add(children[0].get("value"))
+        elif node_type in BARRIER_STATEMENTS:
+            barrier = barrier or not in_procedure
+        elif _is_statement(node) and node_type not in KNOWN_STATEMENTS:
+            barrier = True
+        if node_type in VISIBLE_STATEMENTS:
+            visible = True
+        if node_type in LOOP_STATEMENTS:
+            offload = True
+        stack.extend(children)
+    return reads, bound, assigned, visible, barrier, offload, calls
+
+def _is_statement(node: Any) -> bool:
+    """Whether a node is a statement: statements carry their source line."""
+    return node.get("line") is not None
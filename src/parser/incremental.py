@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+src/parser/incremental.py
+
+Incremental compilation: per-statement results cached by content hash.
+"""
+
+from collections import OrderedDict
+from types import CodeType
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Any, NamedTuple, Optional, Tuple
+from bisect import bisect_right
+import ast as python_ast
+import copy
+import hashlib
+import os
+import re
+import time
+
+from .nlang_parser import NLangParser, ParseError, preprocess_natural_language
+from .transpiler import PROGRAM_HEADER, bound_names, render_statements
+from .codegen import NLangCodeGenerator, CodeGenerationError, compile_module, unwrap
+from .dataflow import check_statement, plan, procedure_effects
+from .lexicon import active_signature
+from .optimizer import NLangOptimizer
+from .parallel import ParallelLoopError
+from .procedures import ProcedureError
+from .tracing import TRACER, Tracer
+
+# Strings and comments are skipped; a period ends a statement unless it
+# sits between two digits (a decimal point) or inside a begin ... end block
+_STATEMENT_END = re.compile(r'"[^"]*"?|#[^\n]*|\.(?![0-9])|(?<![0-9])\.|(?i:\b(begin|end)\b)')
+
+# Key tagging the statements given to the optimizer with their position,
+# which the copies it rewrites keep
+_SOURCE = "incremental_source"
+
+# Position lark reports inside its error messages
+_LARK_POSITION = re.compile(r'\bline \d+,')
+
+def split_statements(text: str) -> List[Tuple[str, int]]:
+    """Split NLang source into (statement text, first line) pairs.
+
+    Each statement runs up to and including its closing period; leading
+    whitespace is dropped. Periods inside ``begin ... end`` blocks belong
+    to the enclosing statement. Trailing text without a period is
+    returned as a final statement, as the parser accepts it too.
+    """
+    return list(iter_statements([text]))
+
+def iter_statements(chunks: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    """Like split_statements(), but reads the source as a stream of text chunks.
+
+    Only the current, unfinished statement is buffered, so a file object
+    can be split in constant memory.
+    """
+    buffer = ''
+    line = 1
+    # Where scanning resumes in the buffer, and the begin ... end depth there:
+    # each chunk only scans text that earlier chunks could not settle
+    scan = 0
+    depth = 0
+    for chunk in chunks:
+        buffer += chunk
+        consumed = 0
+        for match in _STATEMENT_END.finditer(buffer, scan):
+            # A match touching the end of the buffer may still grow: an open
+            # string, a comment, a period that turns out to be a decimal
+            # point, or a keyword that is the start of a longer name
+            if match.end() == len(buffer):
+                scan = match.start()
+                break
+            scan = match.end()
+            depth = _block_depth(match, depth)
+            if match.group() != '.' or depth:
+                continue
+            statement, line = _take_statement(buffer[consumed:match.end()], line)
+            if statement:
+                yield statement
+            consumed = match.end()
+        else:
+            # The last few characters may still become "begin" or "end"
+            scan = max(scan, len(buffer) - len('begin') + 1)
+        buffer = buffer[consumed:]
+        scan -= consumed
+
+    # End of input: everything left is final
+    consumed = 0
+    for match in _STATEMENT_END.finditer(buffer, scan):
+        depth = _block_depth(match, depth)
+        if match.group() == '.' and not depth:
+            statement, line = _take_statement(buffer[consumed:match.end()], line)
+            if statement:
+                yield statement
+            consumed = match.end()
+    rest = buffer[consumed:]
+    stripped = rest.strip()
+    if stripped and not all(l.strip().startswith('#') for l in stripped.splitlines() if l.strip()):
+        yield stripped, line + rest.count('\n', 0, len(rest) - len(rest.lstrip()))
+
+def _block_depth(match: re.Match, depth: int) -> int:
+    """Nesting depth of begin ... end blocks after a _STATEMENT_END match."""
+    keyword = match.group(1)
+    if keyword is None:
+        return depth
+    if keyword.lower() == 'begin':
+        return depth + 1
+    return max(depth - 1, 0)
+
+def _take_statement(chunk: str, line: int) -> Tuple[Optional[Tuple[str, int]], int]:
+    """Strip a statement's leading whitespace; return it with its line, and the next line."""
+    stripped = chunk.lstrip()
+    statement = None
+    if stripped:
+        statement = (stripped, line + chunk.count('\n', 0, len(chunk) - len(stripped)))
+    return statement, line + chunk.count('\n')
+
+class _CachedStatement:
+    """Everything derived from one statement's text."""
+    __slots__ = ('ast', 'python', 'nodes', 'offset', 'line', 'error', 'names')
+
+    def __init__(self, ast, python, nodes, error, names=()):
+        self.ast = ast
+        self.python = python
+        # Names the statement binds or imports, for "did you mean" suggestions
+        self.names = names
+        # Python statements generated for it (a runtime import may precede the statement)
+        self.nodes = nodes
+        # Line of the statement keyword within its text, and where the node currently points
+        self.offset = 0
+        self.line = None
+        self.error = error
+
+class CompileResult(NamedTuple):
+    """Output of one incremental compile."""
+    python: str
+    code: Optional[CodeType]
+    statements: int
+    hits: int
+    misses: int
+    # Every name the program binds or imports (see symbols.py)
+    names: FrozenSet[str] = frozenset()
+
+class IncrementalCompiler:
+    """Compile NLang programs, reprocessing only statements whose text changed.
+
+    The preprocessed text, AST, Python source and Python AST of every
+    statement are cached under the hash of its source text. A statement's
+    Python depends only on its own text, so an edit never invalidates any
+    other statement; the program around the statements is rebuilt on every
+    compile from cached parts. One compiler can be shared by the REPL and
+    a file watcher.
+
+    The passes that need the whole program (procedure checks, the
+    optimizer) rerun on every compile over the cached ASTs, so the output
+    matches NLangToPython.convert(); only the statements the optimizer
+    rewrites are generated again.
+    """
+
+    # Number of distinct statements kept in the cache
+    MAX_ENTRIES = 100000
+
+    def __init__(self, parser: Optional[NLangParser] = None, tracer: Optional[Tracer] = None,
+                 concurrent: bool = False, optimize: bool = True):
+        self.tracer = tracer or TRACER
+        # Run independent top-level statements concurrently (see dataflow.py)
+        self.concurrent = concurrent
+        self.parser = parser or NLangParser(tracer=self.tracer)
+        self.codegen = NLangCodeGenerator()
+        self.optimizer = NLangOptimizer() if optimize else None
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, text: str, filename: str = "<nlang>",
+                errors: Optional[List[ParseError]] = None) -> CompileResult:
+        """Compile a program to Python source and a code object.
+
+        Errors are appended to ``errors`` when given, otherwise printed as
+        warnings, mirroring NLangParser.parse_program().
+        """
+        with self.tracer.stage("incremental_compile") as info:
+            result = self._compile(text, filename, errors)
+            info.update(statements=result.statements, hits=result.hits, misses=result.misses)
+        return result
+    
+    def _compile(self, text: str, filename: str, errors: Optional[List[ParseError]]) -> CompileResult:
+        chunks = split_statements(text)
+        # A statement compiles differently once the domain packs change
+        packs = active_signature().encode() + b"\0"
+        keys = [hashlib.sha256(packs + statement_text.encode()).digest() for statement_text, _ in chunks]
+        
+        # Front-end work for every new statement is batched into one parse
+        missing = {}
+        for key, (statement_text, _) in zip(keys, chunks):
+            if key not in self._cache and key not in missing:
+                missing[key] = statement_text
+        if missing:
+            with self.tracer.stage("front_end", statements=len(missing)):
+                entries = self._compile_statements(list(missing.values()))
+            for key, entry in zip(missing, entries):
+                self._cache[key] = entry
+        
+        # Per statement that compiled: AST, Python source, Python statements, line
+        compiled = []
+        names = set()
+        # Entries whose nodes are already part of this program
+        placed = set()
+        for key, (_, line) in zip(keys, chunks):
+            entry = self._cache[key]
+            self._cache.move_to_end(key)
+            
+            if entry.error is not None:
+                error = ParseError(entry.error.message, line + (entry.error.line or 1) - 1)
+                if errors is None:
+                    print(f"Warning: Could not parse statement: {error}")
+                else:
+                    errors.append(error)
+                continue
+            if entry.nodes is not None:
+                # The statement may have moved since it was cached; nested
+                # statements move with it
+                line += entry.offset
+                nodes = entry.nodes
+                if key in placed:
+                    # A repeated statement gets its own copy, at its own line
+                    nodes = copy.deepcopy(nodes)
+                    if entry.line != line:
+                        for node in nodes:
+                            python_ast.increment_lineno(node, line - entry.line)
+                elif entry.line != line:
+                    for node in nodes:
+                        python_ast.increment_lineno(node, line - entry.line)
+                    entry.line = line
+                placed.add(key)
+                compiled.append((entry.ast, entry.python, nodes, line))
+                names.update(entry.names)
+        
+        # Checks that need the whole program; statements failing them are left out
+        procedures = procedure_effects([ast for ast, _, _, _ in compiled])
+        if procedures:
+            checked = []
+            for statement in compiled:
+                try:
+                    check_statement(statement[0], procedures)
+                except (ProcedureError, ParallelLoopError) as e:
+                    error = ParseError(e.message, statement[3])
+                    if errors is None:
+                        print(f"Warning: Could not parse statement: {error}")
+                    else:
+                        errors.append(error)
+                    continue
+                checked.append(statement)
+            compiled = checked
+        if self.optimizer is not None and compiled:
+            with self.tracer.stage("optimize", statements=len(compiled)) as info:
+                compiled = self._optimize(compiled)
+                info["kept"] = len(compiled)
+        
+        lines = list(PROGRAM_HEADER)
+        steps = plan([ast for ast, _, _, _ in compiled]) if self.concurrent else None
+        if steps is not None:
+            # The schedule wraps the cached nodes afresh on every compile
+            body = self.codegen.schedule(steps, [nodes for _, _, nodes, _ in compiled])
+            lines.extend(render_statements(body))
+        else:
+            lines.extend(python for _, python, _, _ in compiled if python)
+            body = [node for _, _, nodes, _ in compiled for node in nodes]
+        
+        while len(self._cache) > self.MAX_ENTRIES:
+            self._cache.popitem(last=False)
+        
+        misses = len(missing)
+        hits = len(chunks) - misses
+        self.hits += hits
+        self.misses += misses
+        with self.tracer.stage("bytecode"):
+            code = compile_module(python_ast.Module(body=body, type_ignores=[]), filename)
+        return CompileResult("\n".join(lines), code, len(chunks), hits, misses, frozenset(names))
+    
+    def _optimize(self, compiled: List[tuple]) -> List[tuple]:
+        """Optimize the program; statements left as they were keep their cached Python.
+
+        A rewritten statement is generated again and moved to the line of
+        the statement it came from, like cached nodes are.
+        """
+        tagged = []
+        for index, (ast, _, _, _) in enumerate(compiled):
+            statement = dict(unwrap(ast))
+            statement[_SOURCE] = index
+            tagged.append(statement)
+        
+        optimized = []
+        # An import the optimizer adds belongs with the statement after it
+        following = None
+        for statement in reversed(self.optimizer.optimize(tagged)):
+            index = statement.get(_SOURCE)
+            if index is None and statement.get("type") == "vector_loop":
+                index = statement["children"][0].get(_SOURCE)
+            if index is None:
+                index = following
+            following = index
+            ast, python, nodes, line = compiled[index]
+            if statement is not tagged[index]:
+                try:
+                    nodes = self.codegen.statements(statement)
+                except (CodeGenerationError, ProcedureError, ParallelLoopError):
+                    # Keep the program as written rather than fail it
+                    return compiled
+                shift = line - (ast.get("line") or 1)
+                if shift:
+                    for node in nodes:
+                        python_ast.increment_lineno(node, shift)
+                ast = statement
+                python = "\n".join(render_statements(nodes))
+            optimized.append((ast, python, nodes, line))
+        optimized.reverse()
+        return optimized
+    
+    def _compile_statements(self, texts: List[str]) -> List[_CachedStatement]:
+        """Run the full front end on new statements, in a single parse.
+        
+        The statements are parsed as one program with the same parser as
+        convert(); results and errors are mapped back to their statement by
+        line number.
+        """
+        starts = []
+        line = 1
+        for statement_text in texts:
+            starts.append(line)
+            line += statement_text.count('\n') + 1
+        
+        errors = []
+        program = preprocess_natural_language('\n'.join(texts))
+        parsed = [[] for _ in texts]
+        failed = [None] * len(texts)
+        for ast in self.parser.parse_program(program, errors):
+            parsed[bisect_right(starts, ast.get("line") or 1) - 1].append(ast)
+        for error in errors:
+            index = bisect_right(starts, error.line or 1) - 1
+            if failed[index] is None:
+                relative_line = (error.line or 1) - starts[index] + 1
+                message = _LARK_POSITION.sub(f"line {relative_line},", error.message, count=1)
+                failed[index] = ParseError(message, relative_line)
+        
+        entries = []
+        for index, statements in enumerate(parsed):
+            if failed[index] is not None or len(statements) != 1:
+                entries.append(_CachedStatement(None, None, None, failed[index] or ParseError("Expected a single statement")))
+                continue
+            ast = statements[0]
+            # Lines relative to the statement's own text
+            relative_line = ast.get("line") - starts[index] + 1
+            try:
+                nodes = self.codegen.statements(ast)
+                python = "\n".join(render_statements(nodes))
+            except CodeGenerationError as e:
+                entries.append(_CachedStatement(ast, None, None, ParseError(str(e), relative_line)))
+                continue
+            except (ProcedureError, ParallelLoopError) as e:
+                error_line = (e.line or ast.get("line")) - starts[index] + 1
+                entries.append(_CachedStatement(ast, None, None, ParseError(e.message, error_line)))
+                continue
+            variables, imports = bound_names(ast)
+            entry = _CachedStatement(ast, python, nodes, None, tuple(set(variables) | set(imports)))
+            entry.offset = relative_line - 1
+            entry.line = ast.get("line")
+            entries.append(entry)
+        return entries
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cumulative cache statistics."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._cache),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+def watch(path: str, on_change: Callable[[str], None], interval: float = 0.5):
+    """Call ``on_change`` with the file's text now and whenever it changes.
+
+    Polls the file's mtime and size; runs until interrupted.
+    """
+    last = None
+    while True:
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature is not None and signature != last:
+            last = signature
+            with open(path, 'r') as f:
+                on_change(f.read())
+        time.sleep(interval)
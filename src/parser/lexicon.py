@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+src/parser/lexicon.py
+
+Domain packs: JSON or YAML files that teach the preprocessor new nouns
+and verbs, compiled into a binary lexicon that is memory-mapped.
+
+A pack maps phrases to the NLang text they stand for::
+
+    {
+        "name": "ml",
+        "verbs": {"fit": "call fit", "report": "print"},
+        "nouns": {"random forest": "random_forest", "learning rate": "lr"}
+    }
+
+"nouns", "verbs" and "phrases" are all phrase tables; they are kept
+apart only for the reader. A phrase is one or more words (letters, digits
+and underscores) and matches case-insensitively across any whitespace,
+outside string literals and comments; the longest phrase wins. Packs are
+applied before the built-in phrases, so a replacement may itself use them
+("report" -> "print", "is at least" -> ">="). When two packs define a
+phrase, the later pack wins.
+
+Packs are listed, as files or directories of them, in NLANG_PACKS
+(separated like PATH). All the packs in use are compiled into one file,
+``<cache dir>/lexicons/<content hash>.nlx``, holding a table of phrases
+sorted by their UTF-8 bytes:
+
+    header   magic "NLX1", entry count, longest phrase in words, content hash
+    index    per entry: phrase offset, phrase length, text offset, text length
+    strings  UTF-8 phrases and replacement texts
+
+Opening it maps the file without reading it, and each lookup is a binary
+search touching a few pages, so neither startup nor preprocessing grows
+with the size of the packs. A small ``<stat hash>.ref`` file names the
+lexicon for the packs' current paths, sizes and modification times, so
+packs are only read and hashed again after they change; editing a pack
+back to earlier contents finds the lexicon built for those.
+
+Long-running processes see pack edits: the packs are stat()ed again at
+most once every CHECK_INTERVAL seconds, or at once on reload_packs().
+
+This module is imported on the artifact cache's startup path and so
+imports nothing beyond os, hashlib, time and _thread up front.
+"""
+
+from __future__ import annotations
+
+import _thread
+import hashlib
+import os
+import time
+
+from .build_info import get_cache_dir
+
+# Seconds a pack signature is trusted before the packs are stat()ed again
+CHECK_INTERVAL = 1.0
+
+# Environment variable listing the pack files and directories in use
+PACKS_ENV = "NLANG_PACKS"
+
+# File name extensions of packs found in a directory
+PACK_EXTENSIONS = (".json", ".yaml", ".yml")
+
+# Sections of a pack holding phrase tables
+PACK_SECTIONS = ("nouns", "verbs", "phrases")
+
+MAGIC = b"NLX1"
+# Bump when the lexicon layout changes; part of the content hash
+LEXICON_FORMAT = "1"
+
+# First words remembered, per lexicon, as starting a phrase or not
+_FIRST_WORD_CACHE_SIZE = 65536
+
+class PackError(Exception):
+    """Raised for a domain pack that cannot be read or declares a bad phrase."""
+
+    def __init__(self, message: str, path: str | None = None):
+        super().__init__(message if path is None else f"{path}: {message}")
+        self.message = message
+        self.path = path
+
+class Lexicon:
+    """A compiled phrase table, mapped from a file or held in memory."""
+
+    def __init__(self, source):
+        """Open a lexicon file (by path) or wrap lexicon bytes."""
+        import struct
+
+        self._file = None
+        if isinstance(source, (bytes, bytearray)):
+            self._map = source
+        else:
+            import mmap
+
+            self._file = open(source, "rb")
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file cannot be mapped
+                self._file.close()
+                raise ValueError("empty lexicon file")
+        header = struct.Struct("<4sII32s")
+        if len(self._map) < header.size:
+            self.close()
+            raise ValueError("truncated lexicon")
+        magic, self.count, self.max_words, digest = header.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("bad lexicon header")
+        self.digest = digest.hex()
+        self._strings = header.size + 16 * self.count
+        if len(self._map) < self._strings:
+            self.close()
+            raise ValueError("truncated lexicon")
+        self._index = memoryview(self._map)[header.size:self._strings].cast("I")
+        self._first_words: dict = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        """Unmap the file; the lexicon cannot be used afterwards."""
+        index = getattr(self, "_index", None)
+        if index is not None:
+            index.release()
+            self._index = None
+        if self._file is not None:
+            self._map.close()
+            self._file.close()
+            self._file = None
+
+    def _phrase(self, position: int) -> bytes:
+        start = self._strings + self._index[4 * position]
+        return self._map[start:start + self._index[4 * position + 1]]
+
+    def _text(self, position: int) -> str:
+        start = self._strings + self._index[4 * position + 2]
+        return self._map[start:start + self._index[4 * position + 3]].decode()
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Position of the first phrase not below ``key``."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._phrase(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, phrase: str) -> str | None:
+        """The text a phrase stands for, or None; ``phrase`` must be normalized."""
+        key = phrase.encode()
+        position = self._lower_bound(key)
+        if position < self.count and self._phrase(position) == key:
+            return self._text(position)
+        return None
+
+    def starts_phrase(self, word: str) -> bool:
+        """Whether some phrase begins with the (lowercase) word."""
+        known = self._first_words.get(word)
+        if known is None:
+            key = word.encode()
+            position = self._lower_bound(key)
+            # Phrases only hold words and single spaces, so "word" and
+            # "word ..." sort right where "word" would
+            if position < self.count:
+                found = self._phrase(position)
+                known = found == key or found.startswith(key + b" ")
+            else:
+                known = False
+            if len(self._first_words) >= _FIRST_WORD_CACHE_SIZE:
+                self._first_words.clear()
+            self._first_words[word] = known
+        return known
+
+    def rewrite(self, text: str) -> str:
+        """Replace every phrase outside string literals and comments with its text."""
+        scanner, next_word = _scanners()
+        pieces = []
+        position = 0
+        match = scanner.search(text)
+        while match is not None:
+            word = match.group("word")
+            end = match.end()
+            if word is not None and self.starts_phrase(word.lower()):
+                # Gather the words that follow, then try the longest phrase first
+                words = [word.lower()]
+                ends = [end]
+                while len(words) < self.max_words:
+                    following = next_word.match(text, ends[-1])
+                    if following is None:
+                        break
+                    words.append(following.group(1).lower())
+                    ends.append(following.end())
+                for length in range(len(words), 0, -1):
+                    replacement = self.get(" ".join(words[:length]))
+                    if replacement is not None:
+                        pieces.append(text[position:match.start()])
+                        pieces.append(replacement)
+                        position = end = ends[length - 1]
+                        break
+            match = scanner.search(text, end)
+        if not pieces:
+            return text
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+_SCANNERS = None
+
+def _scanners():
+    """(token scanner, next-word matcher); compiled on first use."""
+    global _SCANNERS
+    if _SCANNERS is None:
+        import re
+
+        _SCANNERS = (re.compile(r'"[^"]*"?|#[^\n]*|(?P<word>\w+)'), re.compile(r'\s+(\w+)'))
+    return _SCANNERS
+
+def pack_paths() -> list[str]:
+    """The pack files and directories listed in NLANG_PACKS."""
+    value = os.environ.get(PACKS_ENV)
+    return [path for path in value.split(os.pathsep) if path] if value else []
+
+def pack_files(paths: list[str]) -> list[str]:
+    """Expand directories into the packs they hold, in name order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(PACK_EXTENSIONS)))
+        else:
+            files.append(path)
+    return files
+
+def pack_signature(paths: list[str] | None = None) -> str:
+    """Hash of the packs' paths, sizes and modification times; "" without packs.
+
+    Cheap enough for every startup: it only stats the packs. Use
+    current_signature() for the packs in use, which is cheaper still.
+    """
+    files = pack_files(pack_paths() if paths is None else paths)
+    if not files:
+        return ""
+    digest = hashlib.sha256(LEXICON_FORMAT.encode())
+    for path in files:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+        except OSError:
+            digest.update(f"{os.path.abspath(path)}\0missing\0".encode())
+    return digest.hexdigest()
+
+def read_packs(files: list[str]) -> tuple[dict, str]:
+    """Merge the phrase tables of some packs; return (phrases, content hash)."""
+    import re
+
+    phrase_pattern = re.compile(r'\w+(?: \w+)*')
+    digest = hashlib.sha256(LEXICON_FORMAT.encode())
+    phrases = {}
+    for path in files:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise PackError(f"cannot read pack: {e.strerror}", path)
+        digest.update(hashlib.sha256(data).digest())
+        pack = _parse_pack(data, path)
+        for section in PACK_SECTIONS:
+            table = pack.get(section) or {}
+            if not isinstance(table, dict):
+                raise PackError(f"'{section}' must map phrases to text", path)
+            for phrase, text in table.items():
+                normalized = " ".join(str(phrase).lower().split())
+                if not phrase_pattern.fullmatch(normalized):
+                    raise PackError(f"phrase {phrase!r} must be words of letters, digits and underscores", path)
+                if not isinstance(text, str):
+                    raise PackError(f"text of {phrase!r} must be a string", path)
+                phrases[normalized] = text
+    return phrases, digest.hexdigest()
+
+def _parse_pack(data: bytes, path: str) -> dict:
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise PackError("YAML packs need PyYAML (pip install pyyaml)", path)
+        try:
+            pack = yaml.safe_load(data)
+        except yaml.YAMLError as e:
+            raise PackError(f"invalid YAML: {e}", path)
+    else:
+        import json
+
+        try:
+            pack = json.loads(data)
+        except ValueError as e:
+            raise PackError(f"invalid JSON: {e}", path)
+    if not isinstance(pack, dict):
+        raise PackError("a pack must be a mapping", path)
+    return pack
+
+def build_lexicon(phrases: dict, digest: str) -> bytes:
+    """Lay out a phrase table in the lexicon format."""
+    from array import array
+    import struct
+
+    index = array("I")
+    strings = bytearray()
+    max_words = 0
+    for key, text in sorted((phrase.encode(), text.encode()) for phrase, text in phrases.items()):
+        index.extend((len(strings), len(key), len(strings) + len(key), len(text)))
+        strings += key
+        strings += text
+        max_words = max(max_words, key.count(b" ") + 1)
+    header = struct.pack("<4sII32s", MAGIC, len(phrases), max_words, bytes.fromhex(digest))
+    return header + index.tobytes() + bytes(strings)
+
+def compile_packs(paths: list[str], directory: str | None = None) -> Lexicon | None:
+    """Open the lexicon of some packs, compiling it first if they changed.
+
+    Returns None when the paths hold no packs. When the cache directory
+    cannot be written, the lexicon is built in memory.
+    """
+    files = pack_files(paths)
+    if not files:
+        return None
+    directory = directory or os.path.join(get_cache_dir(), "lexicons")
+    reference = os.path.join(directory, pack_signature(files) + ".ref")
+    try:
+        with open(reference) as f:
+            digest = f.read().strip()
+        lexicon = Lexicon(os.path.join(directory, digest + ".nlx"))
+        if lexicon.digest == digest:
+            return lexicon
+        lexicon.close()
+    except (OSError, ValueError):
+        pass
+
+    phrases, digest = read_packs(files)
+    path = os.path.join(directory, digest + ".nlx")
+    try:
+        if not os.path.exists(path):
+            _write_atomic(path, build_lexicon(phrases, digest))
+        _write_atomic(reference, digest.encode())
+        return Lexicon(path)
+    except (OSError, ValueError):
+        # Compiling is best effort; the packs still apply
+        return Lexicon(build_lexicon(phrases, digest))
+
+def _write_atomic(path: str, data: bytes):
+    """Write via a temp file and rename, so readers never map a partial lexicon."""
+    import tempfile
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# The lexicon preprocess_natural_language() applies, opened on first use
+_active: Lexicon | None = None
+_active_paths: list[str] | None = None
+# pack_signature() of the packs _active was compiled from
+_active_signature: str | None = None
+# The packs given to use_packs(); None follows NLANG_PACKS
+_requested: list[str] | None = None
+# (paths, pack_signature() of them, time.monotonic() when it was taken);
+# one tuple, so threads never see the parts of two different checks
+_checked: tuple[list[str], str, float] | None = None
+# threading itself would add a millisecond and more to a cached run's startup
+_active_lock = _thread.allocate_lock()
+
+def active_lexicon() -> Lexicon | None:
+    """The lexicon of the packs in use, or None without packs.
+
+    Long-running processes (the REPL, the compile server, executor
+    workers) see pack edits: the lexicon is compiled again when
+    current_signature() changes.
+    """
+    active_signature()
+    return _active
+
+def current_signature() -> str:
+    """pack_signature() of the packs in use, taken again at most once per CHECK_INTERVAL.
+
+    Switching packs (use_packs() or NLANG_PACKS) takes effect at once, as
+    does reload_packs().
+    """
+    global _checked
+    paths = active_paths()
+    checked = _checked
+    now = time.monotonic()
+    if checked is None or checked[0] != paths or now - checked[2] >= CHECK_INTERVAL:
+        checked = _checked = (paths, pack_signature(paths), now)
+    return checked[1]
+
+def active_signature() -> str:
+    """current_signature(), switching to a new lexicon if the packs changed."""
+    global _active, _active_paths, _active_signature
+    paths = active_paths()
+    signature = current_signature()
+    if signature != _active_signature or paths != _active_paths:
+        with _active_lock:
+            if signature != _active_signature or paths != _active_paths:
+                # The old lexicon is left for the garbage collector, as another
+                # thread may still be rewriting text with it
+                _active = compile_packs(paths)
+                _active_paths, _active_signature = paths, signature
+    return signature
+
+def active_paths() -> list[str]:
+    """The pack files and directories in use."""
+    return pack_paths() if _requested is None else _requested
+
+def use_packs(paths: list[str] | None) -> Lexicon | None:
+    """Switch to the given packs (None: those in NLANG_PACKS); return their lexicon."""
+    global _requested
+    _requested = None if paths is None else list(paths)
+    return reload_packs()
+
+def reload_packs() -> Lexicon | None:
+    """Check the packs for edits now, rather than after CHECK_INTERVAL; return their lexicon."""
+    global _checked
+    _checked = None
+    return active_lexicon()
@@ -5,36 +5,306 @@ src/parser/nlang_parser.py
 Enhanced NLang parser with natural language constructs and AST generation.
 """
 
-from lark import Lark, Transformer, v_args
+from lark import Lark, Transformer
+from lark.visitors import Transformer_NonRecursive
+from lark.exceptions import UnexpectedCharacters, UnexpectedInput, UnexpectedToken
+from lark.parsers.lalr_analysis import Shift
+from contextlib import contextmanager
 from typing import Dict, List, Any, Optional
+import gc
+import os
 import re
+import sys
+import tempfile
+import threading
 
-class NLangASTBuilder(Transformer):
-    """Transform parse trees into structured AST nodes."""
+import lark
+
+from .nodes import (NodeArena, make_node, Identifier, Number, String, Boolean, Memoize, Parameters, Block,
+                    Let, Define, Print, Import, Set, Return, CallStatement, If, For, ParallelFor, ForRange, While,
+                    Load, Split, Filter, Select, Procedure)
+from .tracing import TRACER, Tracer
+from .procedures import DEFAULT_MEMO_SIZE
+from .build_info import DEFAULT_GRAMMAR, get_cache_dir, grammar_hash
+from .lexicon import active_lexicon
+
+# Compiled parsers shared by every NLangParser in this process,
+# keyed by (grammar hash, start rule, lexer).
+_PARSERS: Dict[tuple, Lark] = {}
+_PARSERS_LOCK = threading.Lock()
+
+def _parser_cache_file(grammar_path: str, digest: str, start: str, lexer: str) -> str:
+    """Path of the serialized LALR tables for a grammar/lark/python combination."""
+    stem = os.path.splitext(os.path.basename(grammar_path))[0]
+    name = "%s-%s-%s-%s-lark%s-py%d%d.pickle" % (
+        stem, start, lexer, digest[:16], lark.__version__, *sys.version_info[:2])
+    return os.path.join(get_cache_dir(), 'parsers', name)
+
+def _build_parser(grammar_path: str, digest: str, start: str, lexer: str) -> Lark:
+    """Load compiled parser tables from disk, building and saving them on a miss."""
+    cache_file = _parser_cache_file(grammar_path, digest, start, lexer)
+    try:
+        with open(cache_file, 'rb') as f:
+            return Lark.load(f)
+    except Exception:
+        pass
+    
+    parser = Lark.open(grammar_path, parser='lalr', lexer=lexer, start=start)
+    
+    # Write to a temp file and rename, so concurrent processes never see a partial file
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                parser.save(f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        # An unwritable cache directory only costs us the warm start
+        pass
+    
+    return parser
+
+@contextmanager
+def _gc_paused():
+    """Suspend the cyclic GC while building large acyclic trees.
+    
+    Parse trees only grow during a parse, so every collection would rescan
+    the whole tree built so far and make big programs quadratic.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def load_parser(grammar_path: str = DEFAULT_GRAMMAR, start: str = 'start',
+                lexer: str = 'contextual') -> Lark:
+    """Return the shared compiled LALR parser for a grammar.
+    
+    Parsers are built at most once per process and their tables are cached
+    on disk under get_cache_dir(), keyed by the grammar hash and lark version.
+    """
+    digest = grammar_hash(grammar_path)
+    key = (digest, start, lexer)
+    parser = _PARSERS.get(key)
+    if parser is None:
+        with _PARSERS_LOCK:
+            parser = _PARSERS.get(key)
+            if parser is None:
+                parser = _build_parser(grammar_path, digest, start, lexer)
+                _PARSERS[key] = parser
+    return parser
+
+def _statement(node_type: str, children: list) -> Dict[str, Any]:
+    """Build a statement node from its keyword token and operands."""
+    keyword, *operands = children
+    return {"type": node_type, "children": operands, "line": keyword.line}
+
+def _number(token) -> Any:
+    """Number literals without a decimal point are ints, the rest floats."""
+    return float(token) if '.' in token else int(token)
+
+def _load_operands(children: list) -> list:
+    """The keyword, variable and path of a load, without its optional noun."""
+    return [children[0], *children[-2:]]
+
+def _procedure_parts(children: list):
+    """Split a procedure's parse children into name, parameters, body and optional memoize."""
+    keyword, name, *parameters, body = children
+    memoize = parameters.pop() if parameters and parameters[-1].get("type") == "memoize" else None
+    return keyword, name, parameters, body, memoize
+
+def _procedure(children: list) -> Dict[str, Any]:
+    keyword, name, parameters, body, memoize = _procedure_parts(children)
+    operands = [name, {"type": "parameters", "children": parameters}, body]
+    return {"type": "procedure", "children": operands + ([memoize] if memoize else []), "line": keyword.line}
+
+def _memoize_size(children: list) -> int:
+    """The cache size of a memoize qualifier, given its number (if any) already built."""
+    return children[0].get("value") if children else DEFAULT_MEMO_SIZE
+
+def _parallel_operands(children: list) -> list:
+    """A parallel loop's keyword, variable, collection and body, then its options."""
+    keyword, variable, collection, *options, body = children
+    return [keyword, variable, collection, body, *options]
+
+def _block_statements(children: list) -> list:
+    """The statements of a block, without their statement wrappers."""
+    return [child["children"][0] if child.get("type") == "statement" else child for child in children]
+
+class NLangASTBuilder(Transformer_NonRecursive):
+    """Transform parse trees into structured AST nodes.
+    
+    The builders walk the tree with an explicit stack: a long chain of
+    "plus" terms nests one level per term, far past the recursion limit.
+    """
     
     def __default__(self, data, children, meta):
         return {"type": data, "children": children}
     
-    # Statement types
-    def let_statement(self, children):      return {"type": "let", "children": children}
-    def define_statement(self, children):   return {"type": "define", "children": children}
-    def print_statement(self, children):    return {"type": "print", "children": children}
-    def import_statement(self, children):   return {"type": "import", "children": children}
+    # Statement types; the leading keyword token is dropped but its line is kept
+    def let_statement(self, children):      return _statement("let", children)
+    def define_statement(self, children):   return _statement("define", children)
+    def print_statement(self, children):    return _statement("print", children)
+    def import_statement(self, children):   return _statement("import", children)
+    def set_statement(self, children):      return _statement("set", children)
+    def return_statement(self, children):   return _statement("return", children)
+    def call_statement(self, children):     return _statement("call_statement", children)
+    def if_statement(self, children):       return _statement("if", children)
+    def for_statement(self, children):      return _statement("for", children)
+    def parallel_for_statement(self, children): return _statement("parallel_for", _parallel_operands(children))
+    def for_range_statement(self, children): return _statement("for_range", children)
+    def while_statement(self, children):    return _statement("while", children)
+    def load_statement(self, children):     return _statement("load", _load_operands(children))
+    def split_statement(self, children):    return _statement("split", children)
+    def filter_statement(self, children):   return _statement("filter", children)
+    def select_statement(self, children):   return _statement("select", children)
+    def procedure_statement(self, children): return _procedure(children)
+    def parameter(self, children):          return children[-1]
+    def memoize(self, children):            return {"type": "memoize", "value": _memoize_size(children)}
+    def block(self, children):              return {"type": "block", "children": _block_statements(children)}
     
     # Expression types
     def IDENTIFIER(self, token):           return {"type": "identifier", "value": str(token)}
-    def NUMBER(self, token):               return {"type": "number", "value": float(token)}
+    def NUMBER(self, token):               return {"type": "number", "value": _number(token)}
     def STRING(self, token):               return {"type": "string", "value": token[1:-1]}
+    def TRUE(self, token):                 return {"type": "boolean", "value": True}
+    def FALSE(self, token):                return {"type": "boolean", "value": False}
     
     # Values and expressions
     def value(self, children):             return {"type": "value", "children": children}
 
+class NLangNodeBuilder(Transformer_NonRecursive):
+    """Transform parse trees into compact slotted AST nodes (see nodes.py)."""
+    
+    def __default__(self, data, children, meta):
+        return make_node(str(data), children)
+    
+    # Statement types; the leading keyword token is dropped but its line is kept
+    def let_statement(self, children):      return Let(children[1:], children[0].line)
+    def define_statement(self, children):   return Define(children[1:], children[0].line)
+    def print_statement(self, children):    return Print(children[1:], children[0].line)
+    def import_statement(self, children):   return Import(children[1:], children[0].line)
+    def set_statement(self, children):      return Set(children[1:], children[0].line)
+    def return_statement(self, children):   return Return(children[1:], children[0].line)
+    def call_statement(self, children):     return CallStatement(children[1:], children[0].line)
+    def if_statement(self, children):       return If(children[1:], children[0].line)
+    def for_statement(self, children):      return For(children[1:], children[0].line)
+    def parallel_for_statement(self, children): return ParallelFor(_parallel_operands(children)[1:], children[0].line)
+    def for_range_statement(self, children): return ForRange(children[1:], children[0].line)
+    def while_statement(self, children):    return While(children[1:], children[0].line)
+    def load_statement(self, children):     return Load(_load_operands(children)[1:], children[0].line)
+    def split_statement(self, children):    return Split(children[1:], children[0].line)
+    def filter_statement(self, children):   return Filter(children[1:], children[0].line)
+    def select_statement(self, children):   return Select(children[1:], children[0].line)
+    def parameter(self, children):          return children[-1]
+    def memoize(self, children):            return Memoize(_memoize_size(children))
+    
+    def procedure_statement(self, children):
+        keyword, name, parameters, body, memoize = _procedure_parts(children)
+        operands = [name, Parameters(parameters), body]
+        return Procedure(operands + ([memoize] if memoize else []), keyword.line)
+    
+    def block(self, children):              return Block(_block_statements(children))
+    
+    # Expression types
+    def IDENTIFIER(self, token):           return Identifier(str(token))
+    def NUMBER(self, token):               return Number(_number(token))
+    def STRING(self, token):               return String(token[1:-1])
+    def TRUE(self, token):                 return Boolean(True)
+    def FALSE(self, token):                return Boolean(False)
+
+class NLangArenaBuilder(Transformer_NonRecursive):
+    """Transform a program parse tree into a NodeArena; callbacks return node indices."""
+    
+    def __init__(self, arena: NodeArena):
+        super().__init__()
+        self.arena = arena
+    
+    def __default__(self, data, children, meta):
+        return self.arena.add(str(data), children)
+    
+    def program(self, children):
+        for statement in children:
+            self.arena.add_root(statement)
+        return self.arena
+    
+    def statement(self, children):          return children[0]
+    
+    def let_statement(self, children):      return self.arena.add("let", children[1:], line=children[0].line)
+    def define_statement(self, children):   return self.arena.add("define", children[1:], line=children[0].line)
+    def print_statement(self, children):    return self.arena.add("print", children[1:], line=children[0].line)
+    def import_statement(self, children):   return self.arena.add("import", children[1:], line=children[0].line)
+    def set_statement(self, children):      return self.arena.add("set", children[1:], line=children[0].line)
+    def return_statement(self, children):   return self.arena.add("return", children[1:], line=children[0].line)
+    def call_statement(self, children):     return self.arena.add("call_statement", children[1:], line=children[0].line)
+    def if_statement(self, children):       return self.arena.add("if", children[1:], line=children[0].line)
+    def for_statement(self, children):      return self.arena.add("for", children[1:], line=children[0].line)
+    def parallel_for_statement(self, children):
+        return self.arena.add("parallel_for", _parallel_operands(children)[1:], line=children[0].line)
+    def for_range_statement(self, children): return self.arena.add("for_range", children[1:], line=children[0].line)
+    def while_statement(self, children):    return self.arena.add("while", children[1:], line=children[0].line)
+    def load_statement(self, children):     return self.arena.add("load", _load_operands(children)[1:], line=children[0].line)
+    def split_statement(self, children):    return self.arena.add("split", children[1:], line=children[0].line)
+    def filter_statement(self, children):   return self.arena.add("filter", children[1:], line=children[0].line)
+    def select_statement(self, children):   return self.arena.add("select", children[1:], line=children[0].line)
+    def parameter(self, children):          return children[-1]
+    
+    def memoize(self, children):
+        size = self.arena.values[children[0]] if children else DEFAULT_MEMO_SIZE
+        return self.arena.add("memoize", value=size)
+    
+    def procedure_statement(self, children):
+        keyword, name, *parameters, body = children
+        memoize = []
+        if parameters and self.arena.kind_names[self.arena.kinds[parameters[-1]]] == "memoize":
+            memoize = [parameters.pop()]
+        operands = [name, self.arena.add("parameters", parameters), body] + memoize
+        return self.arena.add("procedure", operands, line=keyword.line)
+    
+    def IDENTIFIER(self, token):           return self.arena.add("identifier", value=str(token))
+    def NUMBER(self, token):               return self.arena.add("number", value=_number(token))
+    def STRING(self, token):               return self.arena.add("string", value=token[1:-1])
+    def TRUE(self, token):                 return self.arena.add("boolean", value=True)
+    def FALSE(self, token):                return self.arena.add("boolean", value=False)
+
 class NLangParser:
     """Main parser for NLang programs."""
     
-    def __init__(self):
-        self.parser = Lark.open('grammar/nlang_working.lark', parser='lalr', start='start')
-        self.transformer = NLangASTBuilder()
+    def __init__(self, grammar_path: str = DEFAULT_GRAMMAR, compact: bool = False,
+                 tracer: Optional[Tracer] = None):
+        # Parser tables are loaded on first use, so creating a parser is free
+        self.grammar_path = grammar_path
+        self._parser = None
+        self._program_parser = None
+        # Compact parsers build slotted nodes instead of dicts
+        self.transformer = NLangNodeBuilder() if compact else NLangASTBuilder()
+        self.tracer = tracer or TRACER
+        self._statement_boundaries = None
+    
+    @property
+    def parser(self) -> Lark:
+        """The single-statement parser."""
+        if self._parser is None:
+            self._parser = load_parser(self.grammar_path)
+        return self._parser
+    
+    @property
+    def program_parser(self) -> Lark:
+        """The whole-program parser.
+        
+        It uses the basic lexer so that error recovery can keep lexing past
+        a bad statement regardless of the parser state.
+        """
+        if self._program_parser is None:
+            self._program_parser = load_parser(self.grammar_path, start='program', lexer='basic')
+        return self._program_parser
     
     def parse(self, text: str) -> Dict[str, Any]:
         """Parse NLang text into an AST."""
@@ -43,59 +313,183 @@ class NLangParser:
             text = text.strip() + '.'
         
         try:
-            tree = self.parser.parse(text)
-            ast = self.transformer.transform(tree)
+            with self.tracer.stage("parse"):
+                tree = self.parser.parse(text)
+            with self.tracer.stage("transform"):
+                ast = self.transformer.transform(tree)
             return ast
         except Exception as e:
             raise ParseError(f"Failed to parse: {e}")
     
-    def parse_program(self, text: str) -> List[Dict[str, Any]]:
-        """Parse a multi-line NLang program."""
-        statements = []
-        lines = text.strip().split('\n')
+    def parse_program(self, text: str, errors: Optional[List["ParseError"]] = None) -> List[Dict[str, Any]]:
+        """Parse a multi-line NLang program in a single pass.
         
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                try:
-                    ast = self.parse(line)
-                    statements.append(ast)
-                except ParseError as e:
-                    print(f"Warning: Could not parse line '{line}': {e}")
+        Statements end with a period and may span several lines. A statement
+        that fails to parse is skipped up to its closing period and parsing
+        resumes with the next one. Errors are appended to ``errors`` when
+        given, otherwise they are printed as warnings.
+        """
+        if not text.strip():
+            return []
+        program = self._parse_program(text, self.transformer, errors)
+        
+        # Unwrap each statement node down to the let/if/for/... node
+        return [statement["children"][0] for statement in program["children"]]
+    
+    def parse_program_arena(self, text: str, errors: Optional[List["ParseError"]] = None) -> NodeArena:
+        """Parse a program into a NodeArena, for very large programs.
+        
+        Behaves like parse_program(); iterating the arena yields the
+        statements as compact nodes.
+        """
+        if not text.strip():
+            return NodeArena()
+        return self._parse_program(text, NLangArenaBuilder(NodeArena()), errors)
+    
+    def _parse_program(self, text: str, transformer: Transformer, errors: Optional[List["ParseError"]]):
+        """Parse a whole program with recovery and apply ``transformer`` to the tree."""
+        # As with single statements, the final period is optional
+        # (only trailing space is stripped, so statements keep their lines)
+        text = text.rstrip()
+        if not text.endswith('.'):
+            text += '.'
         
-        return statements
+        recovered = []
+        
+        def on_error(e: UnexpectedInput) -> bool:
+            recovered.append(ParseError(str(e), e.line))
+            self._recover(e, text)
+            return True
+        
+        with _gc_paused():
+            with self.tracer.stage("parse", chars=len(text)) as info:
+                tree = self.program_parser.parse(text, on_error=on_error)
+                info["errors"] = len(recovered)
+            with self.tracer.stage("transform") as info:
+                result = transformer.transform(tree)
+                info["statements"] = len(result) if isinstance(result, NodeArena) else len(result["children"])
+        
+        for error in recovered:
+            if errors is None:
+                print(f"Warning: Could not parse statement: {error}")
+            else:
+                errors.append(error)
+        return result
+    
+    def _recover(self, e: UnexpectedInput, text: str):
+        """Panic-mode recovery: drop the broken statement and its remaining input.
+        
+        The parser stacks are unwound to the innermost state where a new
+        statement may begin, and the lexer is advanced past the next period.
+        """
+        interactive = e.interactive_parser
+        state = interactive.parser_state
+        boundaries = self._get_statement_boundaries(interactive)
+        
+        # Unwind the partial statement
+        depth = len(state.state_stack)
+        while depth > 1 and state.state_stack[depth - 1] not in boundaries:
+            depth -= 1
+        del state.state_stack[depth:]
+        del state.value_stack[depth - 1:]
+        
+        # Skip input up to and including the statement's closing period
+        if isinstance(e, UnexpectedToken) and e.token.type in ('DOT', '$END'):
+            return
+        lexer_state = interactive.lexer_thread.state
+        while True:
+            try:
+                for token in interactive.lexer_thread.lex(state):
+                    if token.type == 'DOT':
+                        return
+                return
+            except UnexpectedCharacters:
+                # Step over the offending character and keep skipping
+                pos = lexer_state.line_ctr.char_pos
+                lexer_state.line_ctr.feed(text[pos:pos + 1])
+    
+    def _get_statement_boundaries(self, interactive) -> set:
+        """Parser states between statements: those that shift every statement keyword.
+        
+        A keyword such as "to" can also continue a statement ("for i from 1
+        to 3"), so accepting one is not enough to mark a boundary.
+        """
+        if self._statement_boundaries is None:
+            parse_conf = interactive.parser_state.parse_conf
+            # The table also holds gotos on rule names, which are lowercase
+            starts = {name for name in parse_conf.states[parse_conf.start_state] if name.isupper()} - {'$END'}
+            self._statement_boundaries = {
+                state for state, actions in parse_conf.states.items()
+                if all(token in actions and actions[token][0] is Shift for token in starts)
+            }
+        return self._statement_boundaries
 
 class ParseError(Exception):
     """Custom exception for parsing errors."""
-    pass
+    
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message if line is None else f"Line {line}: {message}")
+        self.message = message
+        self.line = line
 
 # Natural language preprocessing
+NATURAL_LANGUAGE_PHRASES = {
+    'create': 'define',
+    'make': 'define',
+    'assign': 'set',
+    'put': 'set',
+    'show': 'print',
+    'display': 'print',
+    'say': 'print',
+    'announce': 'print',
+    'multiplied by': '*',
+    'divided by': '/',
+    'plus': '+',
+    'minus': '-',
+    'times': '*',
+    'exceeds': '>',
+    'is at least': '>=',
+    'is less than': '<',
+    'equals': '==',
+    'is': '==',
+}
+
+def _compile_preprocessor(phrases: Dict[str, str]):
+    """Build one scanner that matches string literals, comments and phrases.
+    
+    Longer phrases are tried first so that 'is at least' wins over 'is';
+    words inside a phrase may be separated by any whitespace.
+    """
+    alternatives = []
+    for phrase in sorted(phrases, key=len, reverse=True):
+        alternatives.append(r'\s+'.join(re.escape(word) for word in phrase.split()))
+    # A cheap first-character check lets the scanner skip most positions outright
+    first_chars = ''.join(sorted({phrase[0].lower() for phrase in phrases} | {phrase[0].upper() for phrase in phrases}))
+    pattern = r'(?=["#%s])(?:(?P<string>"[^"]*"?)|(?P<comment>#[^\n]*)|\b(?P<phrase>%s)\b)' % (
+        re.escape(first_chars), '|'.join(alternatives))
+    return re.compile(pattern, re.IGNORECASE)
+
+_PREPROCESSOR = _compile_preprocessor(NATURAL_LANGUAGE_PHRASES)
+
 def preprocess_natural_language(text: str) -> str:
-    """Convert natural language constructs to formal syntax."""
-    # Convert common natural language patterns
-    patterns = [
-        (r'\bcreate\b', 'define'),
-        (r'\bmake\b', 'define'),
-        (r'\bassign\b', 'set'),
-        (r'\bput\b', 'set'),
-        (r'\bshow\b', 'print'),
-        (r'\bdisplay\b', 'print'),
-        (r'\bsay\b', 'print'),
-        (r'\bannounce\b', 'print'),
-        (r'\bmultiplied by\b', '*'),
-        (r'\bdivided by\b', '/'),
-        (r'\bplus\b', '+'),
-        (r'\bminus\b', '-'),
-        (r'\btimes\b', '*'),
-        (r'\bexceeds\b', '>'),
-        (r'\bis at least\b', '>='),
-        (r'\bis less than\b', '<'),
-        (r'\bequals\b', '=='),
-        (r'\bis\b', '=='),
-    ]
-    
-    processed = text.lower()
-    for pattern, replacement in patterns:
-        processed = re.sub(pattern, replacement, processed)
-    
-    return processed 
\ No newline at end of file
+    """Convert natural language constructs to formal syntax.
+    
+    Keywords and identifiers are lowercased and phrases rewritten in a
+    single scan; string literals and comments are copied unchanged. The
+    phrases of installed domain packs (see lexicon.py) are rewritten first.
+    """
+    lexicon = active_lexicon()
+    if lexicon is not None:
+        text = lexicon.rewrite(text)
+    pieces = []
+    position = 0
+    for match in _PREPROCESSOR.finditer(text):
+        pieces.append(text[position:match.start()].lower())
+        phrase = match.group('phrase')
+        if phrase is None:
+            pieces.append(match.group())
+        else:
+            pieces.append(NATURAL_LANGUAGE_PHRASES[' '.join(phrase.lower().split())])
+        position = match.end()
+    pieces.append(text[position:].lower())
+    return ''.join(pieces)
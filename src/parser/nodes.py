@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+src/parser/nodes.py
+
+Compact AST node classes and an array-backed node arena.
+
+They hold a program in about a third of the memory of dict ASTs, but
+get() goes through getattr() and is slower to walk than dict.get(), so
+the compilers parse into dicts and compact nodes are opt-in
+(NLangParser(compact=True), parse_program_arena()).
+"""
+
+from array import array
+from typing import Dict, List, Any, Optional, Iterator
+
+class Node:
+    """Base class for compact AST nodes.
+
+    Nodes answer the same read-only lookups as the dict AST
+    (``node.get("type")``, ``node["children"]``), so the transpiler and
+    code generator accept either form.
+    """
+    __slots__ = ()
+    type = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the equivalent dict AST node, with its subtree converted too."""
+        # Post-order with an explicit stack, so deep expressions do not recurse
+        built: List[Any] = []
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, Node):
+                built.append(node)
+            elif isinstance(node, Leaf):
+                built.append({"type": node.type, "value": node.value})
+            elif not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+            else:
+                start = len(built) - len(node.children)
+                converted = {"type": node.type, "children": built[start:]}
+                if isinstance(node, Statement):
+                    converted["line"] = node.line
+                built[start:] = [converted]
+        return built[0]
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Node, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Node) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+class Leaf(Node):
+    """A node holding a single literal or name."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+class Identifier(Leaf):
+    __slots__ = ()
+    type = "identifier"
+
+class Number(Leaf):
+    __slots__ = ()
+    type = "number"
+
+class String(Leaf):
+    __slots__ = ()
+    type = "string"
+
+class Boolean(Leaf):
+    __slots__ = ()
+    type = "boolean"
+
+class Memoize(Leaf):
+    """A procedure's "remembering results" qualifier; the value is the cache size."""
+    __slots__ = ()
+    type = "memoize"
+
+class Branch(Node):
+    """A node with an immutable tuple of children."""
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = tuple(children)
+
+class Value(Branch):
+    __slots__ = ()
+    type = "value"
+
+class Add(Branch):
+    __slots__ = ()
+    type = "add"
+
+class Subtract(Branch):
+    __slots__ = ()
+    type = "subtract"
+
+class Multiply(Branch):
+    __slots__ = ()
+    type = "multiply"
+
+class Divide(Branch):
+    __slots__ = ()
+    type = "divide"
+
+class Negate(Branch):
+    __slots__ = ()
+    type = "negate"
+
+class Equal(Branch):
+    __slots__ = ()
+    type = "equal"
+
+class NotEqual(Branch):
+    __slots__ = ()
+    type = "not_equal"
+
+class Less(Branch):
+    __slots__ = ()
+    type = "less"
+
+class LessEqual(Branch):
+    __slots__ = ()
+    type = "less_equal"
+
+class Greater(Branch):
+    __slots__ = ()
+    type = "greater"
+
+class GreaterEqual(Branch):
+    __slots__ = ()
+    type = "greater_equal"
+
+class Not(Branch):
+    __slots__ = ()
+    type = "not"
+
+class And(Branch):
+    __slots__ = ()
+    type = "and"
+
+class Or(Branch):
+    __slots__ = ()
+    type = "or"
+
+class Call(Branch):
+    """A function call; the first child is the function's identifier."""
+    __slots__ = ()
+    type = "call"
+
+class Parameters(Branch):
+    __slots__ = ()
+    type = "parameters"
+
+class Workers(Branch):
+    """A parallel loop's "using N workers" option: one expression, the number of processes."""
+    __slots__ = ()
+    type = "workers"
+
+class Threads(Branch):
+    """A parallel loop's "using N threads" option."""
+    __slots__ = ()
+    type = "threads"
+
+class Chunks(Branch):
+    """A parallel loop's "in chunks of N" option."""
+    __slots__ = ()
+    type = "chunks"
+
+class Block(Branch):
+    """The statements in the body of an if, for or while."""
+    __slots__ = ()
+    type = "block"
+
+class Statement(Branch):
+    """A statement, tagged with the source line it starts on."""
+    __slots__ = ('line',)
+
+    def __init__(self, children, line: Optional[int] = None):
+        self.children = tuple(children)
+        self.line = line
+
+class Let(Statement):
+    __slots__ = ()
+    type = "let"
+
+class Define(Statement):
+    __slots__ = ()
+    type = "define"
+
+class Print(Statement):
+    __slots__ = ()
+    type = "print"
+
+class Import(Statement):
+    __slots__ = ()
+    type = "import"
+
+class Set(Statement):
+    __slots__ = ()
+    type = "set"
+
+class Return(Statement):
+    __slots__ = ()
+    type = "return"
+
+class CallStatement(Statement):
+    __slots__ = ()
+    type = "call_statement"
+
+class If(Statement):
+    __slots__ = ()
+    type = "if"
+
+class For(Statement):
+    __slots__ = ()
+    type = "for"
+
+class ForRange(Statement):
+    __slots__ = ()
+    type = "for_range"
+
+class ParallelFor(Statement):
+    """Children: loop variable, collection, body block, then any workers/threads/chunks options."""
+    __slots__ = ()
+    type = "parallel_for"
+
+class While(Statement):
+    __slots__ = ()
+    type = "while"
+
+class Load(Statement):
+    __slots__ = ()
+    type = "load"
+
+class Split(Statement):
+    __slots__ = ()
+    type = "split"
+
+class Filter(Statement):
+    __slots__ = ()
+    type = "filter"
+
+class Select(Statement):
+    __slots__ = ()
+    type = "select"
+
+class Procedure(Statement):
+    """Children: name, parameters, body block, then an optional memoize leaf."""
+    __slots__ = ()
+    type = "procedure"
+
+class VectorLoop(Statement):
+    """A reduction loop lowered by the optimizer; its first child is the original loop."""
+    __slots__ = ()
+    type = "vector_loop"
+
+class GenericNode(Branch):
+    """Any other grammar rule, e.g. the start/statement wrappers."""
+    __slots__ = ('type',)
+
+    def __init__(self, node_type: str, children):
+        self.type = node_type
+        self.children = tuple(children)
+
+# Node classes by AST type name
+NODE_CLASSES = {
+    cls.type: cls
+    for cls in (Identifier, Number, String, Boolean, Memoize, Value, Add, Subtract, Multiply, Divide, Negate,
+                Equal, NotEqual, Less, LessEqual, Greater, GreaterEqual, Not, And, Or, Call, Parameters,
+                Workers, Threads, Chunks, Block, Let, Define, Print, Import, Set, Return, CallStatement, If,
+                For, ParallelFor, ForRange, While,
+                Load, Split, Filter, Select, Procedure, VectorLoop)
+}
+
+def make_node(node_type: str, children=(), value: Any = None, line: Optional[int] = None) -> Node:
+    """Create the compact node for an AST type name."""
+    cls = NODE_CLASSES.get(node_type)
+    if cls is None:
+        return GenericNode(node_type, children)
+    if issubclass(cls, Leaf):
+        return cls(value)
+    if issubclass(cls, Statement):
+        return cls(children, line)
+    return cls(children)
+
+class NodeArena:
+    """Array-backed storage for the statements of a large program.
+
+    Each node costs a handful of machine words in flat arrays instead of a
+    Python object. Nodes are referred to by integer index; statements are
+    materialized as Node objects one at a time when iterated, so a whole
+    program can be walked without ever holding all of its node objects.
+    """
+
+    def __init__(self):
+        self.kind_names: List[str] = []
+        self._kind_codes: Dict[str, int] = {}
+        self.kinds = array('H')
+        self.lines = array('l')
+        self.values: List[Any] = []
+        self.first_child = array('l')
+        self.child_count = array('l')
+        self.child_index = array('l')
+        self.roots = array('l')
+
+    def add(self, node_type: str, children=(), value: Any = None, line: Optional[int] = None) -> int:
+        """Append a node whose children are already in the arena; return its index."""
+        code = self._kind_codes.get(node_type)
+        if code is None:
+            code = self._kind_codes[node_type] = len(self.kind_names)
+            self.kind_names.append(node_type)
+        self.kinds.append(code)
+        self.lines.append(line or 0)
+        self.values.append(value)
+        self.first_child.append(len(self.child_index))
+        self.child_count.append(len(children))
+        self.child_index.extend(children)
+        return len(self.kinds) - 1
+
+    def add_root(self, index: int):
+        """Mark a node as a top-level statement."""
+        self.roots.append(index)
+
+    def node(self, index: int) -> Node:
+        """Materialize the node at ``index`` and its subtree."""
+        # Post-order with an explicit stack, so deep expressions do not recurse
+        built: List[Node] = []
+        stack = [(index, False)]
+        while stack:
+            current, expanded = stack.pop()
+            start = self.first_child[current]
+            count = self.child_count[current]
+            if count and not expanded:
+                stack.append((current, True))
+                stack.extend((child, False) for child in reversed(self.child_index[start:start + count]))
+                continue
+            children = built[len(built) - count:] if count else ()
+            if count:
+                del built[len(built) - count:]
+            built.append(make_node(self.kind_names[self.kinds[current]], children,
+                                   self.values[current], self.lines[current] or None))
+        return built[0]
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    def __getitem__(self, position: int) -> Node:
+        return self.node(self.roots[position])
+
+    def __iter__(self) -> Iterator[Node]:
+        for root in self.roots:
+            yield self.node(root)
+
+    def nbytes(self) -> int:
+        """Approximate size of the arena's arrays and value slots, in bytes."""
+        arrays = (self.kinds, self.lines, self.first_child, self.child_count, self.child_index, self.roots)
+        return sum(a.itemsize * len(a) for a in arrays) + 8 * len(self.values)
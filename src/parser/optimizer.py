@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+src/parser/optimizer.py
+
+Optimization pass over NLang AST statements, run before code generation.
+"""
+
+from collections import Counter
+from typing import Dict, List, Any, Optional, Set
+import math
+
+from .dataflow import Effects, procedure_effects
+from .nodes import Node, make_node
+
+# Arithmetic node types folded by the optimizer
+FOLDABLE_OPERATORS = {
+    "add": lambda left, right: left + right,
+    "subtract": lambda left, right: left - right,
+    "multiply": lambda left, right: left * right,
+    "divide": lambda left, right: left / right,
+}
+
+# Statements that assign their second child to their first
+ASSIGNMENTS = ("let", "define", "set")
+
+# Statements whose operands the optimizer understands; anything else
+# (control flow, future statement types) is left untouched and ends
+# constant propagation
+KNOWN_STATEMENTS = ASSIGNMENTS + ("print", "import")
+
+# Expression types that work element by element when an operand is a
+# NumPy array, with the same result per element as on plain numbers
+ELEMENTWISE_OPERATORS = ("add", "subtract", "multiply", "negate", "equal", "not_equal",
+                         "less", "less_equal", "greater", "greater_equal")
+
+# Runtime module with the bulk versions of lowered loops
+VECTOR_RUNTIME = "nlang_runtime.vectorize"
+
+# Runtime module behind the load/split/filter/select verbs
+DATASET_RUNTIME = "nlang_runtime.dataset"
+
+# Runtime module caching the results of "remembering results" procedures
+MEMO_RUNTIME = "nlang_runtime.memoize"
+
+# Runtime module running "for each ... in parallel" loops
+PARALLEL_RUNTIME = "nlang_runtime.parallel"
+
+# Runtime module running the statements of a concurrent program
+DATAFLOW_RUNTIME = "nlang_runtime.dataflow"
+
+class NLangOptimizer:
+    """Simplify a straight-line program before it is transpiled.
+
+    Passes, in order:
+
+    * constant folding of arithmetic on numbers and concatenation of strings;
+    * constant propagation of variables last assigned a constant by
+      ``let``/``define``/``set``;
+    * dead-store elimination of constant assignments overwritten before
+      being read (the last assignment to a variable is always kept, since
+      the variable outlives the program in the REPL);
+    * removal of imports whose module is never referenced;
+    * lowering of "for each" loops that only sum or count into bulk NumPy
+      evaluation, keeping the loop for collections that are not numeric
+      arrays.
+
+    Folding only happens when evaluating the expression at run time could
+    not raise and its result can be written back as a literal, so
+    optimized programs fail exactly where unoptimized ones do. A call to
+    one of the program's procedures reads and sets whatever the procedure
+    does, transitively (see dataflow.procedure_effects); other functions
+    are assumed not to touch program variables.
+    """
+
+    # Longer strings are not copied into every place a variable is read
+    MAX_PROPAGATED_STRING = 64
+    # Integer results wider than this are left to be computed at run time
+    MAX_FOLDED_INT_BITS = 128
+
+    def __init__(self, fold_constants: bool = True, propagate_constants: bool = True,
+                 eliminate_dead_stores: bool = True, remove_unused_imports: bool = True,
+                 vectorize_loops: bool = True):
+        self.fold_constants = fold_constants
+        self.propagate_constants = propagate_constants
+        self.eliminate_dead_stores = eliminate_dead_stores
+        self.remove_unused_imports = remove_unused_imports
+        self.vectorize_loops = vectorize_loops
+
+    def optimize(self, statements: List[Dict[str, Any]],
+                 procedures: Optional[Dict[str, Effects]] = None) -> List[Dict[str, Any]]:
+        """Return an optimized copy of a list of statements; the input is not modified.
+
+        ``procedures`` gives the effects of procedures defined before these
+        statements, for a program optimized in batches.
+        """
+        statements = [self._unwrap(statement) for statement in statements]
+        procedures = procedure_effects(statements, procedures)
+        if self.fold_constants or self.propagate_constants:
+            statements = self._simplify_statements(statements, procedures)
+        if self.eliminate_dead_stores:
+            statements = self._eliminate_dead_stores(statements, procedures)
+        if self.remove_unused_imports:
+            statements = self._remove_unused_imports(statements)
+        if self.vectorize_loops:
+            statements = self._vectorize_loops(statements)
+        return statements
+
+    def _unwrap(self, statement: Dict[str, Any]) -> Dict[str, Any]:
+        """Strip the start/statement wrappers of single-statement parses."""
+        while statement.get("type") in ("start", "statement"):
+            statement = statement["children"][0]
+        return statement
+
+    def _simplify_statements(self, statements: List[Dict[str, Any]],
+                             procedures: Dict[str, Effects]) -> List[Dict[str, Any]]:
+        """Fold and propagate constants through the program, in order."""
+        constants: Dict[str, Node] = {}
+        result = []
+        for statement in statements:
+            node_type = statement.get("type")
+            children = statement.get("children", [])
+            if procedures:
+                # Procedures the statement calls may set variables before it reads them
+                _, writes, barrier = _call_effects(statement, procedures)
+                if barrier:
+                    constants.clear()
+                for name in writes:
+                    constants.pop(name, None)
+
+            if node_type in ASSIGNMENTS and len(children) >= 2:
+                name = _identifier(children[0])
+                value = self._simplify(children[1], constants)
+                statement = _with_children(statement, [children[0], value] + list(children[2:]))
+                if name is not None:
+                    if self.propagate_constants and self._propagates(value):
+                        constants[name] = value
+                    else:
+                        constants.pop(name, None)
+            elif node_type == "print" and children:
+                statement = _with_children(statement, [self._simplify(children[0], constants)] + list(children[1:]))
+            elif node_type == "import" and children:
+                # The module now owns the name
+                constants.pop(_identifier(children[0]), None)
+            elif node_type not in KNOWN_STATEMENTS:
+                constants.clear()
+            result.append(statement)
+        return result
+
+    def _simplify(self, expression: Any, constants: Dict[str, Node]) -> Any:
+        """Fold an expression bottom-up, substituting propagated constants.
+
+        Uses an explicit stack, so arbitrarily deep expressions are fine.
+        """
+        results = []
+        stack = [(expression, False)]
+        while stack:
+            node, expanded = stack.pop()
+            node_type = node.get("type") if isinstance(node, (dict, Node)) else None
+
+            if node_type == "identifier":
+                results.append(constants.get(node.get("value"), node))
+                continue
+            if node_type != "value" and node_type not in FOLDABLE_OPERATORS:
+                # Leaves, and expression types the optimizer does not know
+                results.append(node)
+                continue
+
+            children = node.get("children", [])
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            count = len(children)
+            new_children = results[len(results) - count:] if count else []
+            del results[len(results) - count:]
+            if node_type == "value" and count == 1:
+                # A value wrapper is transparent to both backends
+                results.append(new_children[0])
+            elif node_type in FOLDABLE_OPERATORS and self.fold_constants:
+                results.append(self._fold(node, new_children))
+            else:
+                results.append(_with_children(node, new_children))
+        return results[0]
+
+    def _fold(self, node: Any, children: List[Any]) -> Any:
+        """Evaluate an arithmetic node with constant operands, if that is safe."""
+        left, right = children
+        left_type, right_type = _kind(left), _kind(right)
+        if left_type == right_type == "number":
+            try:
+                value = FOLDABLE_OPERATORS[node.get("type")](left.get("value"), right.get("value"))
+            except ArithmeticError:
+                # e.g. division by zero: keep the error for run time
+                return _with_children(node, children)
+            if isinstance(value, float) and math.isfinite(value):
+                return make_node("number", value=value)
+            if isinstance(value, int) and value.bit_length() <= self.MAX_FOLDED_INT_BITS:
+                return make_node("number", value=value)
+        elif left_type == right_type == "string" and node.get("type") == "add":
+            return make_node("string", value=left.get("value") + right.get("value"))
+        return _with_children(node, children)
+
+    def _propagates(self, value: Any) -> bool:
+        """Whether a constant is worth copying into later reads."""
+        kind = _kind(value)
+        if kind == "number":
+            return True
+        return kind == "string" and len(value.get("value")) <= self.MAX_PROPAGATED_STRING
+
+    def _eliminate_dead_stores(self, statements: List[Dict[str, Any]],
+                               procedures: Dict[str, Effects]) -> List[Dict[str, Any]]:
+        """Drop constant assignments that are overwritten before anything reads them.
+
+        Walks the program backwards, tracking variables that are written
+        again before their next read.
+        """
+        overwritten: Set[str] = set()
+        kept = []
+        for statement in reversed(statements):
+            node_type = statement.get("type")
+            children = statement.get("children", [])
+
+            if node_type in ASSIGNMENTS and len(children) >= 2:
+                name = _identifier(children[0])
+                if name in overwritten and _kind(children[1]) in ("number", "string"):
+                    continue
+                if name is not None:
+                    overwritten.add(name)
+                overwritten -= _reads(children[1:])
+            elif node_type == "import" and children:
+                overwritten.discard(_identifier(children[0]))
+            elif node_type in KNOWN_STATEMENTS:
+                overwritten -= _reads(children)
+            else:
+                overwritten.clear()
+            if procedures:
+                # Procedures the statement calls read variables too
+                reads, _, barrier = _call_effects(statement, procedures)
+                if barrier:
+                    overwritten.clear()
+                overwritten -= reads
+            kept.append(statement)
+        kept.reverse()
+        return kept
+
+    def _remove_unused_imports(self, statements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop imports of modules the program never refers to."""
+        used: Set[str] = set()
+        for statement in statements:
+            node_type = statement.get("type")
+            children = statement.get("children", [])
+            if node_type == "import":
+                continue
+            if node_type in ASSIGNMENTS:
+                children = children[1:]
+            elif node_type not in KNOWN_STATEMENTS:
+                # Unknown statements may bind or use names in any position
+                children = [statement]
+            used |= _reads(children)
+        return [
+            statement for statement in statements
+            if statement.get("type") != "import"
+            or not statement.get("children")
+            or _identifier(statement["children"][0]) in used
+        ]
+
+    def _vectorize_loops(self, statements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lower top-level reduction loops to vector_loop statements.
+
+        The bulk path does not assign the loop variable, so a loop is only
+        lowered when no other statement reads it. An import of the runtime
+        module goes before the first lowered loop.
+        """
+        readers = Counter()
+        for statement in statements:
+            readers.update(_reads([statement]))
+
+        result = []
+        imported = False
+        for statement in statements:
+            reduction = _reduction(statement) if statement.get("type") == "for" else None
+            if reduction is None or readers[_identifier(statement["children"][0])] > 1:
+                result.append(statement)
+                continue
+            line = statement.get("line")
+            if not imported:
+                module = _new_node(statement, "identifier", value=VECTOR_RUNTIME)
+                result.append(_new_node(statement, "import", [module], line=line))
+                imported = True
+            result.append(_new_node(statement, "vector_loop", [statement] + reduction, line=line))
+        return result
+
+def _reduction(loop: Any) -> Optional[List[Any]]:
+    """Match a loop that only sums into one variable: [target, element, condition?].
+
+    The body must be a single ``set total to total + element``, optionally
+    under an ``if condition`` without ``otherwise``; element and condition
+    may only combine the loop variable and names the loop leaves alone
+    with element-wise operators. Anything else, e.g. a print or a call
+    that could have side effects, keeps the loop as it is.
+    """
+    children = loop.get("children", [])
+    if len(children) != 3:
+        return None
+    variable, collection, body = children
+    if _identifier(variable) is None or _identifier(collection) is None:
+        return None
+    body = body.get("children", [])
+    if len(body) != 1:
+        return None
+
+    statement, condition = body[0], None
+    if statement.get("type") == "if":
+        parts = statement.get("children", [])
+        if len(parts) != 2 or len(parts[1].get("children", [])) != 1:
+            return None
+        condition, statement = parts[0], parts[1]["children"][0]
+    if statement.get("type") not in ASSIGNMENTS or len(statement.get("children", [])) < 2:
+        return None
+
+    target, value = statement["children"][:2]
+    total = _identifier(target)
+    if total is None or total in (_identifier(variable), _identifier(collection)):
+        return None
+    if not isinstance(value, (dict, Node)) or value.get("type") != "add":
+        return None
+    left, element = value["children"]
+    if _identifier(left) != total:
+        return None
+    for expression in (element, condition):
+        if expression is not None and (not _elementwise(expression) or total in _reads([expression])):
+            return None
+    return [target, element] + ([condition] if condition is not None else [])
+
+def _elementwise(expression: Any) -> bool:
+    """Whether an expression gives the same per-element results on arrays and numbers."""
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, (dict, Node)):
+            return False
+        node_type = node.get("type")
+        if node_type in ("identifier", "boolean") or _kind(node) == "number":
+            continue
+        children = node.get("children", [])
+        if node_type == "divide":
+            # Dividing an array by zero gives inf instead of raising
+            if _kind(children[1]) != "number" or not children[1].get("value"):
+                return False
+        elif node_type not in ELEMENTWISE_OPERATORS:
+            return False
+        stack.extend(children)
+    return True
+
+def _new_node(like: Any, node_type: str, children=(), value: Any = None, line: Optional[int] = None) -> Any:
+    """A new node in the same form (dict or compact) as ``like``."""
+    if isinstance(like, Node):
+        return make_node(node_type, children, value=value, line=line)
+    if value is not None:
+        return {"type": node_type, "value": value}
+    return {"type": node_type, "children": list(children), "line": line}
+
+def _kind(node: Any) -> Optional[str]:
+    """The type of a constant node ("number" or "string"), else None."""
+    if isinstance(node, (dict, Node)):
+        node_type = node.get("type")
+        if node_type == "number" and type(node.get("value")) in (int, float):
+            return node_type
+        if node_type == "string" and isinstance(node.get("value"), str):
+            return node_type
+    return None
+
+def _identifier(node: Any) -> Optional[str]:
+    """The name of an identifier node, else None."""
+    if isinstance(node, (dict, Node)) and node.get("type") == "identifier":
+        return node.get("value")
+    return None
+
+def _reads(nodes) -> Set[str]:
+    """Every identifier appearing in the given subtrees."""
+    names = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (dict, Node)):
+            if node.get("type") == "identifier":
+                names.add(node.get("value"))
+            else:
+                stack.extend(node.get("children", ()))
+    return names
+
+def _call_effects(statement: Any, procedures: Dict[str, Effects]):
+    """(reads, writes, barrier) of the program's procedures a statement calls."""
+    reads: Set[str] = set()
+    writes: Set[str] = set()
+    barrier = False
+    stack = [statement]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (dict, Node)):
+            children = node.get("children", ())
+            if node.get("type") == "call":
+                effects = procedures.get(_identifier(children[0]))
+                if effects is not None:
+                    reads |= effects.reads
+                    writes |= effects.writes
+                    barrier = barrier or effects.barrier
+            stack.extend(children)
+    return reads, writes, barrier
+
+def free_names(expression: Any) -> List[str]:
+    """The identifiers an expression reads, sorted.
+
+    A "where" condition is lowered to a function taking these as
+    parameters, which the dataset runtime binds to columns or variables.
+    """
+    return sorted(_reads([expression]))
+
+def _with_children(node: Any, children: List[Any]) -> Any:
+    """Return ``node`` with new children, or ``node`` itself if none changed."""
+    old = node.get("children", [])
+    if len(old) == len(children) and all(a is b for a, b in zip(old, children)):
+        return node
+    if isinstance(node, Node):
+        return make_node(node.type, children, line=node.get("line"))
+    rebuilt = dict(node)
+    rebuilt["children"] = list(children)
+    return rebuilt
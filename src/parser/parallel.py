@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+src/parser/parallel.py
+
+Analysis of "for each ... in parallel" loops
+("For each row in rows using 8 workers, print score(row).").
+
+The body of a parallel loop runs in separate workers, one chunk of the
+collection each, so no iteration may change a variable another one or
+the rest of the program sees. The only exception is a loop that just
+sums (or counts) into one variable:
+
+    for each row in rows in parallel, set total to total plus row.
+    for each row in rows in parallel, if row > 0, set count to count plus 1.
+
+which lowers to per-chunk subtotals added up in order (see
+nlang_runtime/parallel.py). Any other body may only print, call and
+bind names of its own, which stay private to the iteration. Procedures it
+calls may not set globals either: in a worker process the change would
+be lost, and on threads iterations would race for it.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .optimizer import free_names
+from .procedures import body_statements, called_procedures, unbound_writes
+
+# Option node type -> keyword argument of the runtime's each()/sum_each()
+OPTION_ARGUMENTS = {
+    "workers": "workers",
+    "threads": "workers",
+    "chunks": "chunk_size",
+}
+
+# Name of the function a parallel loop's body is lowered to
+LOOP_BODY = "_nlang_loop_body"
+
+class ParallelLoopError(Exception):
+    """Raised for a parallel loop whose iterations could not run independently."""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message if line is None else f"Line {line}: {message}")
+        self.message = message
+        self.line = line
+
+def loop_options(loop: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """The runtime keyword arguments a loop's options give, as expression
+    nodes, and whether it runs on threads."""
+    arguments = {}
+    threads = False
+    for option in loop["children"][3:]:
+        node_type = option.get("type")
+        arguments[OPTION_ARGUMENTS[node_type]] = option["children"][0]
+        threads = threads or node_type == "threads"
+    return arguments, threads
+
+def reduction(loop: Dict[str, Any]) -> Optional[Tuple[Any, Any, Optional[Any]]]:
+    """Match a body that only sums into one variable: (target, element, condition or None).
+
+    The body must be a single ``set total to total + element``, optionally
+    under an ``if condition`` without ``otherwise``, where neither element
+    nor condition reads the total.
+    """
+    variable, _, body = loop["children"][:3]
+    statements = body.get("children", ())
+    if len(statements) != 1:
+        return None
+    statement, condition = statements[0], None
+    if statement.get("type") == "if":
+        parts = statement.get("children", ())
+        if len(parts) != 2 or len(parts[1].get("children", ())) != 1:
+            return None
+        condition, statement = parts[0], parts[1]["children"][0]
+    if statement.get("type") != "set":
+        return None
+    target, value = statement["children"]
+    total = target.get("value")
+    if total == variable.get("value") or value.get("type") != "add":
+        return None
+    left, element = value["children"]
+    if left.get("type") != "identifier" or left.get("value") != total:
+        return None
+    for expression in (element, condition):
+        if expression is not None and total in free_names(expression):
+            return None
+    return target, element, condition
+
+def check_parallel(loop: Dict[str, Any], procedures: Optional[Dict[str, Any]] = None):
+    """Raise ParallelLoopError unless the loop's iterations can run independently.
+
+    ``procedures`` maps the program's procedures to the effects of calling
+    them, transitively (see dataflow.procedure_effects); when given, the
+    procedures the body calls may not set globals.
+    """
+    for callee in called_procedures(loop):
+        effects = (procedures or {}).get(callee)
+        if effects is not None and effects.writes:
+            written = min(effects.writes)
+            raise ParallelLoopError(f"A parallel loop cannot call '{callee}', which sets the global variable "
+                                    f"'{written}' that its iterations would share", loop.get("line"))
+    if reduction(loop) is not None:
+        return
+    variable = loop["children"][0].get("value")
+    for statement in body_statements(loop):
+        if statement.get("type") == "return":
+            raise ParallelLoopError("A parallel loop cannot return: its iterations run in separate workers",
+                                    statement.get("line"))
+    written = unbound_writes(loop, [variable])
+    if written:
+        raise ParallelLoopError(f"A parallel loop cannot set '{written[0]}', which its iterations would share; "
+                                f"it can only sum into one variable (set {written[0]} to {written[0]} plus ...)",
+                                loop.get("line"))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+src/parser/procedures.py
+
+Scope and purity analysis of procedure definitions
+("To square a number n: return n times n.").
+
+Names bound inside a procedure (parameters, let/define, loop variables,
+dataset verbs) are its locals; a "set" of any other name changes a
+global. A procedure qualified with "remembering results" or
+"deterministic" has its results cached by argument, so it must not print,
+call a function for its effects ("call ...") or change globals: a cached
+call would silently skip those effects.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from .nodes import Node
+
+# Results kept by "remembering results" when no number is given
+DEFAULT_MEMO_SIZE = 128
+
+# Statement type -> positions of the children it binds as variables
+BINDING_CHILDREN = {
+    "let": (0,),
+    "define": (0,),
+    "for": (0,),
+    "for_range": (0,),
+    "load": (0,),
+    "split": (1, 3),
+    "filter": (2,),
+    "select": (-1,),
+    "procedure": (0,),
+}
+
+class ProcedureError(Exception):
+    """Raised for a procedure definition that cannot be compiled as written."""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message if line is None else f"Line {line}: {message}")
+        self.message = message
+        self.line = line
+
+def parameter_names(procedure: Dict[str, Any]) -> List[str]:
+    """The names of a procedure's parameters, in order."""
+    return [parameter.get("value") for parameter in procedure["children"][1].get("children", ())]
+
+def memo_size(procedure: Dict[str, Any]) -> Optional[int]:
+    """How many results a procedure remembers, or None if it is not memoized."""
+    children = procedure["children"]
+    if len(children) < 4:
+        return None
+    size = children[3].get("value")
+    if type(size) is not int or size < 1:
+        raise ProcedureError(f"Procedure '{_name(procedure)}' must remember a whole, positive number of results",
+                             procedure.get("line"))
+    return size
+
+def global_writes(procedure: Dict[str, Any]) -> List[str]:
+    """Names the procedure sets without binding them itself, in order of appearance."""
+    return unbound_writes(procedure, parameter_names(procedure))
+
+def unbound_writes(owner: Dict[str, Any], bound: Iterable[str]) -> List[str]:
+    """Names set in a procedure's or loop's body that neither ``bound`` nor
+    the body itself binds, in order of appearance."""
+    bound = set(bound)
+    written = []
+    for statement in body_statements(owner):
+        node_type = statement.get("type")
+        children = statement.get("children", ())
+        for position in BINDING_CHILDREN.get(node_type, ()):
+            bound.add(children[position].get("value"))
+        if node_type == "set":
+            written.append(children[0].get("value"))
+    return list(dict.fromkeys(name for name in written if name not in bound))
+
+def check_pure(procedure: Dict[str, Any], procedures: Optional[Dict[str, Any]] = None):
+    """Raise ProcedureError if a memoized procedure has output or changes a global.
+
+    ``procedures`` maps the program's procedures to the effects of calling
+    them, transitively (see dataflow.procedure_effects); when given, the
+    procedures it calls may not print or change globals either.
+    """
+    name = _name(procedure)
+    for statement in body_statements(procedure):
+        if statement.get("type") == "print":
+            raise ProcedureError(f"Procedure '{name}' remembers its results, so it cannot print",
+                                 statement.get("line"))
+        if statement.get("type") == "call_statement":
+            # Called only for its effects, and counted as output like print
+            # (see dataflow.VISIBLE_STATEMENTS), in callees too
+            callee = statement["children"][0]["children"][0].get("value")
+            raise ProcedureError(f"Procedure '{name}' remembers its results, so it cannot call '{callee}' "
+                                 f"for its effects", statement.get("line"))
+    written = global_writes(procedure)
+    if written:
+        raise ProcedureError(f"Procedure '{name}' remembers its results, so it cannot set "
+                             f"the global variable '{written[0]}'", procedure.get("line"))
+    for callee in called_procedures(procedure):
+        effects = (procedures or {}).get(callee)
+        if effects is None or callee == name:
+            continue
+        if effects.writes:
+            raise ProcedureError(f"Procedure '{name}' remembers its results, so it cannot call '{callee}', "
+                                 f"which sets the global variable '{min(effects.writes)}'", procedure.get("line"))
+        if effects.visible:
+            raise ProcedureError(f"Procedure '{name}' remembers its results, so it cannot call '{callee}', "
+                                 f"which has output", procedure.get("line"))
+
+def called_procedures(owner: Dict[str, Any]) -> List[str]:
+    """Names of the functions called in the body of a procedure or loop, in
+    order of appearance; nested procedures are not entered."""
+    called = []
+    for statement in body_statements(owner):
+        if statement.get("type") == "procedure":
+            continue
+        # Nested blocks are statements of their own in body_statements()
+        stack = [child for child in reversed(statement.get("children", ()))
+                 if isinstance(child, (dict, Node)) and child.get("type") != "block"]
+        while stack:
+            node = stack.pop()
+            children = node.get("children", ())
+            if node.get("type") == "call":
+                called.append(children[0].get("value"))
+            stack.extend(child for child in reversed(children) if isinstance(child, (dict, Node)))
+    return list(dict.fromkeys(called))
+
+def _name(procedure: Dict[str, Any]) -> str:
+    return procedure["children"][0].get("value")
+
+def body_statements(statement: Dict[str, Any]):
+    """Every statement in the body of a procedure or a "for each" loop
+    (their third child), including nested blocks.
+
+    Nested procedures are yielded (they bind their name) but not entered:
+    their bodies are their own scope.
+    """
+    stack = list(reversed(statement["children"][2].get("children", ())))
+    while stack:
+        statement = stack.pop()
+        yield statement
+        if statement.get("type") == "procedure":
+            continue
+        for child in reversed(statement.get("children", ())):
+            if isinstance(child, (dict, Node)) and child.get("type") == "block":
+                stack.extend(reversed(child.get("children", ())))
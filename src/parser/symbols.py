@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+src/parser/symbols.py
+
+"Did you mean" suggestions for names a program uses but never defines:
+
+    I couldn't find a variable called "totl". Did you mean "total"?
+
+The symbol table holds the names a program binds and imports (collected
+by NLangTranspiler), the variables of the running session and Python's
+builtins. It is indexed by character trigram, so a lookup only compares
+the query with the few names sharing the most trigrams with it, however
+many names there are. A name spelled out in words is also matched to its
+initials and back ("learning_rate" and "lr").
+
+Tables are meant to live as long as the session or worker they serve:
+syncing one with the names of a new compile only indexes the names it
+has not seen and forgets those gone, and the builtins are indexed once per process, in a table the
+others fall back to.
+"""
+
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Tuple
+import builtins
+import re
+
+# Names compared in full with a query, out of those sharing the most trigrams with it
+CANDIDATES = 32
+
+# Python's message for an undefined name, for errors that lack a .name attribute
+_UNDEFINED = re.compile(r"name '(\w+)' is not defined")
+
+class SymbolTable:
+    """Names known to a program, indexed for suggestions."""
+
+    def __init__(self, names: Iterable[str] = (), parent: Optional["SymbolTable"] = None):
+        # Searched along with this table, and left unchanged by it
+        self.parent = parent
+        # Names by position; forgotten names leave None until the next reindex
+        self._names: List[Optional[str]] = []
+        # Name -> its position in _names
+        self._known: Dict[str, int] = {}
+        # Trigram -> positions in _names of the names containing it
+        self._trigrams: Dict[str, List[int]] = {}
+        # Initials of a multi-word name -> the names having them
+        self._initials: Dict[str, List[str]] = {}
+        self.update(names)
+
+    @classmethod
+    def from_transpiler(cls, transpiler) -> "SymbolTable":
+        """The names bound and imported by the last program the transpiler converted."""
+        return cls(transpiler.variables | transpiler.imports)
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._known or (self.parent is not None and name in self.parent)
+
+    def add(self, name: str):
+        """Index a name; private names (starting with "_") are left out."""
+        if name in self._known or name.startswith("_"):
+            return
+        position = len(self._names)
+        self._known[name] = position
+        self._names.append(name)
+        trigrams = self._trigrams
+        for trigram in _trigrams(name):
+            postings = trigrams.get(trigram)
+            if postings is None:
+                trigrams[trigram] = [position]
+            else:
+                postings.append(position)
+        initials = _initials(name)
+        if initials is not None:
+            self._initials.setdefault(initials, []).append(name)
+
+    def update(self, names: Iterable[str]):
+        """Index several names."""
+        for name in names:
+            self.add(name)
+
+    def discard(self, name: str):
+        """Forget a name, if the table has it."""
+        position = self._known.pop(name, None)
+        if position is None:
+            return
+        self._names[position] = None
+        initials = _initials(name)
+        if initials is not None:
+            self._initials[initials].remove(name)
+        # Postings of forgotten names are skipped, until they outnumber the others
+        if len(self._names) > 2 * len(self._known) + CANDIDATES:
+            names = list(self._known)
+            self._names, self._known, self._trigrams, self._initials = [], {}, {}, {}
+            self.update(names)
+
+    def sync(self, names: Iterable[str]):
+        """Make the table hold exactly ``names``, indexing only the new ones."""
+        names = set(names)
+        for name in [name for name in self._known if name not in names]:
+            self.discard(name)
+        self.update(names)
+
+    def suggest(self, name: str, limit: int = 1) -> List[str]:
+        """Up to ``limit`` known names close to ``name``, best first.
+
+        Close means a few typos away (insertions, deletions, substitutions
+        and swaps of adjacent characters; more for longer names), or the
+        same words abbreviated to initials or the reverse.
+        """
+        name = name.lower()
+        scored = []
+        table = self
+        while table is not None:
+            scored.extend(table._scored(name))
+            table = table.parent
+        found = [candidate for _, _, candidate in sorted(scored)]
+
+        # "learning_rate" for "lr", and "lr" for "learning_rate"
+        initials = _initials(name)
+        if initials is not None and initials in self:
+            found.append(initials)
+        table = self
+        while table is not None:
+            found.extend(table._initials.get(name, ()))
+            table = table.parent
+        return list(dict.fromkeys(found))[:limit]
+
+    def _scored(self, name: str) -> List[Tuple[int, int, str]]:
+        """(distance, -shared trigrams, name) for this table's names close to ``name``."""
+        budget = _max_distance(name)
+        overlap = Counter()
+        for trigram in set(_trigrams(name)):
+            postings = self._trigrams.get(trigram)
+            if postings:
+                overlap.update(postings)
+        scored = []
+        for position, shared in nlargest(CANDIDATES, overlap.items(), key=lambda item: item[1]):
+            candidate = self._names[position]
+            if candidate is None or candidate == name or abs(len(candidate) - len(name)) > budget:
+                continue
+            distance = _distance(name, candidate.lower(), budget)
+            if distance <= budget:
+                scored.append((distance, -shared, candidate))
+        return scored
+
+# Python's builtins, indexed on first use and shared by every table
+_builtins: Optional[SymbolTable] = None
+
+def builtin_table() -> SymbolTable:
+    """The table of Python's builtins, built once per process."""
+    global _builtins
+    if _builtins is None:
+        # Exception classes are left out: a typo rarely meant one
+        _builtins = SymbolTable(name for name in dir(builtins) if not name[0].isupper())
+    return _builtins
+
+def symbol_table(*sources: Iterable[str]) -> SymbolTable:
+    """A table of the given names, falling back to Python's builtins.
+
+    Keep it and update() it with the names of later compiles, rather than
+    building a new one for every error.
+    """
+    table = SymbolTable(parent=builtin_table())
+    for names in sources:
+        table.update(names)
+    return table
+
+def undefined_name(error: BaseException) -> Optional[str]:
+    """The name a NameError is about, or None for any other error."""
+    if not isinstance(error, NameError):
+        return None
+    name = getattr(error, "name", None)
+    if name:
+        return name
+    match = _UNDEFINED.search(str(error))
+    return match.group(1) if match else None
+
+def explain_name_error(name: str, table: SymbolTable) -> str:
+    """The friendly message for an undefined name."""
+    message = f'I couldn\'t find a variable called "{name}".'
+    suggestions = table.suggest(name)
+    if suggestions:
+        message += f' Did you mean "{suggestions[0]}"?'
+    return message
+
+def error_line(error: BaseException, filename: str) -> Optional[int]:
+    """Line of the innermost frame of ``filename`` in the error's traceback."""
+    line = None
+    traceback = error.__traceback__
+    while traceback is not None:
+        if traceback.tb_frame.f_code.co_filename == filename:
+            line = traceback.tb_lineno
+        traceback = traceback.tb_next
+    return line
+
+def _trigrams(name: str) -> List[str]:
+    # Padding gives short names trigrams too and weights their first letters
+    padded = f"  {name.lower()} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def _initials(name: str) -> Optional[str]:
+    words = [word for word in name.lower().split("_") if word]
+    return "".join(word[0] for word in words) if len(words) > 1 else None
+
+def _max_distance(name: str) -> int:
+    """Typos allowed in a name: 1 up to 5 characters, 2 up to 8, then 3."""
+    return 1 if len(name) <= 5 else 2 if len(name) <= 8 else 3
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting a swap of adjacent characters as one edit;
+    anything above ``limit`` is reported as ``limit + 1``."""
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        smallest = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            smallest = min(smallest, value)
+        if smallest > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
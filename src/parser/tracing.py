@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+src/parser/tracing.py
+
+Per-stage timing hooks for the compile pipeline.
+"""
+
+from typing import Any, Callable, Dict, List, NamedTuple
+import os
+import sys
+import threading
+import time
+
+# Set to 1 to record stage timings, or to "stderr" to also log every stage
+TRACE_ENV = "NLANG_TRACE"
+
+class StageEvent(NamedTuple):
+    """One finished pipeline stage."""
+    stage: str
+    seconds: float
+    # Nesting level; a stage's time includes that of deeper stages run inside it
+    depth: int
+    # Statement counts, cache hits and the like, filled in by the stage
+    info: Dict[str, Any]
+
+class _Depth(threading.local):
+    """Stage nesting level, counted separately in every thread."""
+    value = 0
+
+class _Stage:
+    """Context manager timing one stage; yields the event's info dict."""
+    __slots__ = ('tracer', 'name', 'info', 'start')
+
+    def __init__(self, tracer: "Tracer", name: str, info: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.info = info
+
+    def __enter__(self) -> Dict[str, Any]:
+        self.tracer._depth.value += 1
+        self.start = time.perf_counter()
+        return self.info
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.tracer._depth.value -= 1
+        if exc_type is not None:
+            self.info["error"] = exc_type.__name__
+        self.tracer.emit(StageEvent(self.name, seconds, self.tracer._depth.value, self.info))
+        return False
+
+class _NullStage:
+    """Stand-in returned while tracing is off."""
+    __slots__ = ()
+
+    def __enter__(self) -> Dict[str, Any]:
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class Tracer:
+    """Emit a StageEvent to every subscribed listener as each stage finishes.
+
+    Pipeline code wraps its stages in ``with tracer.stage("parse") as info:``
+    and may record counts in ``info``. While the tracer is disabled,
+    stage() returns a shared no-op context manager and listeners are never
+    called.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._listeners: List[Callable[[StageEvent], None]] = []
+        self._depth = _Depth()
+
+    def stage(self, name: str, **info: Any):
+        """Time a stage; the context manager yields a dict for extra details."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, info)
+
+    def subscribe(self, listener: Callable[[StageEvent], None]):
+        """Call ``listener`` with every event from now on."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[StageEvent], None]):
+        """Stop calling ``listener``."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def emit(self, event: StageEvent):
+        """Hand an event to every listener."""
+        for listener in self._listeners:
+            listener(event)
+
+class TimingRecorder:
+    """Listener keeping the events since it was last cleared."""
+
+    def __init__(self):
+        self.events: List[StageEvent] = []
+
+    def __call__(self, event: StageEvent):
+        self.events.append(event)
+
+    def clear(self):
+        self.events = []
+
+    def format(self) -> str:
+        """A table of the recorded stages, nested stages indented under their parent."""
+        # Events arrive as stages finish, so children come before their parent
+        pending: List[list] = [[]]
+        for event in self.events:
+            while len(pending) <= event.depth + 1:
+                pending.append([])
+            children, pending[event.depth + 1] = pending[event.depth + 1], []
+            pending[event.depth].append((event, children))
+        ordered = _flatten(pending[0])
+
+        lines = [f"{'stage':<28} {'ms':>10}  details"]
+        for event in ordered:
+            label = "  " * event.depth + event.stage
+            details = ", ".join(f"{key}={value}" for key, value in event.info.items())
+            lines.append(f"{label:<28} {event.seconds * 1000:>10.3f}  {details}")
+        return "\n".join(lines)
+
+def _flatten(nodes) -> List[StageEvent]:
+    """Pre-order list of (event, children) pairs."""
+    events = []
+    stack = list(reversed(nodes))
+    while stack:
+        event, children = stack.pop()
+        events.append(event)
+        stack.extend(reversed(children))
+    return events
+
+def log_to_stderr(event: StageEvent):
+    """Listener printing one line per stage."""
+    details = "".join(f" {key}={value}" for key, value in event.info.items())
+    print(f"[nlang] {'  ' * event.depth}{event.stage}: {event.seconds * 1000:.3f} ms{details}", file=sys.stderr)
+
+def _tracer_from_env() -> Tracer:
+    setting = os.environ.get(TRACE_ENV, "")
+    tracer = Tracer(enabled=setting not in ("", "0"))
+    if setting == "stderr":
+        tracer.subscribe(log_to_stderr)
+    return tracer
+
+# Tracer used by the pipeline unless one is passed in
+TRACER = _tracer_from_env()
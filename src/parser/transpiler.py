@@ -3,236 +3,521 @@
 src/parser/transpiler.py
 
 Transpiler that converts NLang AST to Python code.
+
+Statements are lowered once, by NLangCodeGenerator, into Python AST
+nodes; NLangTranspiler writes those nodes out as source. The source and
+the code objects compiled from the same statements therefore always
+agree, and a new construct only needs lowering in codegen.py.
 """
 
-from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 import ast as python_ast
+import hashlib
+import re
+import threading
+
+from .nodes import Node
+from .codegen import CodeGenerationError, NLangCodeGenerator, unwrap
+from .dataflow import check_program
+from .optimizer import NLangOptimizer
+from .procedures import BINDING_CHILDREN
+from .tracing import TRACER, Tracer
+
+# First lines of every generated program
+PROGRAM_HEADER = [
+    "#!/usr/bin/env python3",
+    '"""Generated Python code from NLang."""',
+    "",
+]
+
+# Python operator node class -> (operator text, precedence)
+OPERATORS = {
+    python_ast.Or: ("or", 1),
+    python_ast.And: ("and", 2),
+    python_ast.Not: ("not ", 3),
+    python_ast.Eq: ("==", 4),
+    python_ast.NotEq: ("!=", 4),
+    python_ast.Lt: ("<", 4),
+    python_ast.LtE: ("<=", 4),
+    python_ast.Gt: (">", 4),
+    python_ast.GtE: (">=", 4),
+    python_ast.Add: ("+", 5),
+    python_ast.Sub: ("-", 5),
+    python_ast.Mult: ("*", 6),
+    python_ast.Div: ("/", 6),
+    python_ast.USub: ("-", 7),
+}
+
+# Precedence of a negative number, which is written with a leading minus
+_NEGATIVE = OPERATORS[python_ast.USub][1]
+
+# Indentation of one block level in generated code
+INDENT = "    "
+
+class _Scope(threading.local):
+    """Names bound and modules imported by the program being transpiled.
+
+    Each thread sees its own, so one transpiler can serve several threads.
+    """
 
-class NLangTranspiler:
-    """Convert NLang AST to Python code."""
-    
     def __init__(self):
-        self.indent_level = 0
         self.variables = set()
         self.imports = set()
+
+class NLangTranspiler:
+    """Convert NLang AST to Python code.
+
+    The transpiler holds no state between calls: every transpile() and
+    transpile_program() starts with empty variable and import sets,
+    private to the calling thread.
+    """
+    
+    def __init__(self):
+        self._scope = _Scope()
+        # Source has no use for the nodes' line numbers
+        self._codegen = NLangCodeGenerator(locate=False)
+    
+    @property
+    def variables(self) -> set:
+        """Names bound by the last node or program transpiled in this thread."""
+        return self._scope.variables
+    
+    @property
+    def imports(self) -> set:
+        """Modules imported by the last node or program transpiled in this thread."""
+        return self._scope.imports
     
     def transpile(self, ast: Dict[str, Any]) -> str:
-        """Convert a single AST node to Python code."""
-        node_type = ast.get("type")
-        
-        if node_type == "let":
-            return self._transpile_let(ast)
-        elif node_type == "define":
-            return self._transpile_define(ast)
-        elif node_type == "set":
-            return self._transpile_set(ast)
-        elif node_type == "print":
-            return self._transpile_print(ast)
-        elif node_type == "if":
-            return self._transpile_if(ast)
-        elif node_type == "for":
-            return self._transpile_for(ast)
-        elif node_type == "while":
-            return self._transpile_while(ast)
-        elif node_type == "import":
-            return self._transpile_import(ast)
-        elif node_type == "return":
-            return self._transpile_return(ast)
-        else:
-            return self._transpile_expression(ast)
+        """Convert a single statement node to Python code."""
+        self._begin()
+        statement = unwrap(ast)
+        self._record(statement)
+        return "\n".join(render_statements(self._codegen.statements(statement)))
     
-    def transpile_program(self, statements: List[Dict[str, Any]]) -> str:
-        """Convert a list of AST statements to a complete Python program."""
-        lines = []
-        
-        # Add standard imports
-        lines.append("#!/usr/bin/env python3")
-        lines.append('"""Generated Python code from NLang."""')
-        lines.append("")
-        
-        # Add any required imports
-        if self.imports:
-            for imp in sorted(self.imports):
-                lines.append(f"import {imp}")
-            lines.append("")
-        
-        # Transpile each statement
+    def _begin(self):
+        """Start a call with empty variable and import sets."""
+        self._scope.variables = set()
+        self._scope.imports = set()
+    
+    def _record(self, statement: Dict[str, Any]):
+        """Add the names a statement binds and the modules it imports, nested ones included."""
+        variables, imports = bound_names(statement)
+        self.variables.update(variables)
+        self.imports.update(imports)
+    
+    def transpile_program(self, statements: List[Dict[str, Any]], concurrent: bool = False) -> str:
+        """Convert a list of AST statements to a complete Python program.
+
+        With ``concurrent``, independent statements run concurrently when
+        the program has any (see dataflow.py).
+        """
+        self._begin()
+        module = self._codegen.generate_program(statements, concurrent)
         for statement in statements:
-            # Extract the actual statement from the AST
-            if statement.get("type") == "start":
-                # Get the statement from the start node
-                statement_node = statement.get("children", [{}])[0]
-                if statement_node.get("type") == "statement":
-                    actual_statement = statement_node.get("children", [{}])[0]
-                    python_code = self.transpile(actual_statement)
-                    if python_code:
-                        lines.append(python_code)
-            else:
-                python_code = self.transpile(statement)
-                if python_code:
-                    lines.append(python_code)
-        
-        return "\n".join(lines)
-    
-    def _transpile_let(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'let' statements (variable declarations)."""
-        children = ast.get("children", [])
-        if len(children) >= 2:
-            var_name = self._extract_identifier(children[0])
-            value = self._transpile_expression(children[1])
-            self.variables.add(var_name)
-            return f"{var_name} = {value}"
-        return ""
-    
-    def _transpile_define(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'define' statements (variable assignments)."""
-        children = ast.get("children", [])
-        if len(children) >= 2:
-            var_name = self._extract_identifier(children[0])
-            value = self._transpile_expression(children[1])
-            self.variables.add(var_name)
-            return f"{var_name} = {value}"
-        return ""
-    
-    def _transpile_set(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'set' statements (variable assignments)."""
-        return self._transpile_define(ast)
-    
-    def _transpile_print(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'print' statements."""
-        children = ast.get("children", [])
-        if children:
-            value = self._transpile_expression(children[0])
-            return f"print({value})"
-        return "print()"
-    
-    def _transpile_if(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'if' statements."""
-        children = ast.get("children", [])
-        if len(children) >= 2:
-            condition = self._transpile_expression(children[0])
-            body = self._transpile_expression(children[1])
-            return f"if {condition}:\n    {body}"
-        return ""
-    
-    def _transpile_for(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'for' statements."""
-        children = ast.get("children", [])
-        if len(children) >= 2:
-            iterator = self._extract_identifier(children[0])
-            collection = self._transpile_expression(children[1])
-            return f"for {iterator} in {collection}:"
-        return ""
-    
-    def _transpile_while(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'while' statements."""
-        children = ast.get("children", [])
-        if len(children) >= 1:
-            condition = self._transpile_expression(children[0])
-            return f"while {condition}:"
-        return ""
-    
-    def _transpile_import(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'import' statements."""
-        children = ast.get("children", [])
-        if children:
-            module = self._extract_identifier(children[0])
-            self.imports.add(module)
-            return f"import {module}"
-        return ""
-    
-    def _transpile_return(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'return' statements."""
-        children = ast.get("children", [])
-        if children:
-            value = self._transpile_expression(children[0])
-            return f"return {value}"
-        return "return"
-    
-    def _transpile_expression(self, ast: Dict[str, Any]) -> str:
-        """Transpile expressions."""
-        if not isinstance(ast, dict):
-            return str(ast)
-        
-        node_type = ast.get("type")
-        
-        if node_type == "identifier":
-            return ast.get("value", "")
-        elif node_type == "number":
-            return str(ast.get("value", 0))
-        elif node_type == "string":
-            return f'"{ast.get("value", "")}"'
-        elif node_type == "boolean":
-            return str(ast.get("value", False))
-        elif node_type == "value":
-            # Handle value nodes (which contain the actual value)
-            children = ast.get("children", [])
-            if len(children) == 1:
-                return self._transpile_expression(children[0])
-            elif len(children) == 2:
-                # Handle binary operations like "5 plus 3"
-                left = self._transpile_expression(children[0])
-                right = self._transpile_expression(children[1])
-                return f"{left} + {right}"  # Default to addition for now
+            self._record(unwrap(statement))
+        return "\n".join(PROGRAM_HEADER + render_statements(module.body))
+
+def bound_names(statement: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """(variables, modules) a statement binds and imports, in the blocks it
+    holds (procedure bodies included) as well."""
+    variables = []
+    imports = []
+    stack = [statement]
+    while stack:
+        node = stack.pop()
+        node_type = node.get("type")
+        children = node.get("children", ())
+        if node_type == "import":
+            imports.append(children[0].get("value"))
+        elif node_type == "set":
+            variables.append(children[0].get("value"))
+        for position in BINDING_CHILDREN.get(node_type, ()):
+            variables.append(children[position].get("value"))
+        for child in children:
+            if not isinstance(child, (dict, Node)):
+                continue
+            if child.get("type") == "block":
+                stack.extend(child.get("children", ()))
+            elif node_type == "vector_loop" and child.get("type") == "for":
+                # The loop kept for collections that are not numeric arrays
+                stack.append(child)
+    return variables, imports
+
+def render_statements(nodes: List[python_ast.stmt], indent: str = "") -> List[str]:
+    """Source lines for Python statements, as NLangCodeGenerator builds them."""
+    lines = []
+    for node in nodes:
+        kind = type(node)
+        if kind is python_ast.Assign:
+            target = node.targets[0]
+            if type(target) is python_ast.Tuple:
+                written = ", ".join(render_expression(element) for element in target.elts)
             else:
-                return str(children)
-        elif node_type == "in_clause":
-            return self._transpile_in_clause(ast)
-        elif node_type == "where_clause":
-            return self._transpile_where_clause(ast)
+                written = render_expression(target)
+            lines.append(f"{indent}{written} = {render_expression(node.value)}")
+        elif kind is python_ast.Expr:
+            lines.append(indent + render_expression(node.value))
+        elif kind is python_ast.Import:
+            lines.append(f"{indent}import {', '.join(alias.name for alias in node.names)}")
+        elif kind is python_ast.Return:
+            lines.append(indent + ("return" if node.value is None else f"return {render_expression(node.value)}"))
+        elif kind is python_ast.Global:
+            lines.append(f"{indent}global {', '.join(node.names)}")
+        elif kind is python_ast.Pass:
+            lines.append(indent + "pass")
+        elif kind is python_ast.If:
+            lines.append(f"{indent}if {render_expression(node.test)}:")
+            lines.extend(render_statements(node.body, indent + INDENT))
+            if node.orelse:
+                lines.append(f"{indent}else:")
+                lines.extend(render_statements(node.orelse, indent + INDENT))
+        elif kind is python_ast.For:
+            lines.append(f"{indent}for {render_expression(node.target)} in {render_expression(node.iter)}:")
+            lines.extend(render_statements(node.body, indent + INDENT))
+        elif kind is python_ast.While:
+            lines.append(f"{indent}while {render_expression(node.test)}:")
+            lines.extend(render_statements(node.body, indent + INDENT))
+        elif kind is python_ast.FunctionDef:
+            lines.extend(f"{indent}@{render_expression(decorator)}" for decorator in node.decorator_list)
+            lines.append(f"{indent}def {node.name}({', '.join(argument.arg for argument in node.args.args)}):")
+            lines.extend(render_statements(node.body, indent + INDENT))
         else:
-            # Handle complex expressions
-            children = ast.get("children", [])
-            if len(children) == 1:
-                return self._transpile_expression(children[0])
-            elif len(children) == 2:
-                left = self._transpile_expression(children[0])
-                right = self._transpile_expression(children[1])
-                return f"{left} {right}"
+            raise CodeGenerationError(f"Cannot write out a {kind.__name__} statement")
+    return lines
+
+def render_expression(node: python_ast.expr) -> str:
+    """Source for a Python expression, parenthesized only where precedence requires.
+
+    The tree is walked with an explicit stack of pending nodes and literal
+    text, and the output is joined once at the end, so arbitrarily deep
+    expressions (long "plus" chains, nested parentheses) take linear time
+    and never hit the recursion limit.
+    """
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            parts.append(item)
+            continue
+        kind = type(item)
+        if kind is python_ast.Name:
+            parts.append(item.id)
+        elif kind is python_ast.Constant:
+            # repr() escapes quotes, backslashes and newlines in strings
+            parts.append(repr(item.value))
+        elif kind is python_ast.BinOp:
+            _push_binary(item.left, item.op, item.right, stack)
+        elif kind is python_ast.Compare:
+            _push_binary(item.left, item.ops[0], item.comparators[0], stack)
+        elif kind is python_ast.BoolOp:
+            # Written left-associatively, as "a and b and c" is parsed
+            *rest, last = item.values
+            left = rest[0]
+            for value in rest[1:]:
+                left = python_ast.BoolOp(op=item.op, values=[left, value])
+            _push_binary(left, item.op, last, stack)
+        elif kind is python_ast.UnaryOp:
+            operator, precedence = OPERATORS[type(item.op)]
+            if _precedence(item.operand) < precedence:
+                stack.extend((")", item.operand, f"{operator}("))
             else:
-                return str(children)
-    
-    def _transpile_in_clause(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'in' clauses."""
-        children = ast.get("children", [])
-        if children:
-            return self._transpile_expression(children[0])
-        return ""
-    
-    def _transpile_where_clause(self, ast: Dict[str, Any]) -> str:
-        """Transpile 'where' clauses."""
-        children = ast.get("children", [])
-        if children:
-            return self._transpile_expression(children[0])
-        return ""
-    
-    def _extract_identifier(self, ast: Dict[str, Any]) -> str:
-        """Extract identifier value from AST node."""
-        if isinstance(ast, dict) and ast.get("type") == "identifier":
-            return ast.get("value", "")
-        elif isinstance(ast, str):
-            return ast
+                stack.extend((item.operand, operator))
+        elif kind is python_ast.Call:
+            arguments = list(item.args) + list(item.keywords)
+            stack.append(")")
+            for index in range(len(arguments) - 1, -1, -1):
+                argument = arguments[index]
+                if type(argument) is python_ast.keyword:
+                    stack.extend((argument.value, f"{argument.arg}="))
+                else:
+                    stack.append(argument)
+                if index:
+                    stack.append(", ")
+            stack.extend(("(", item.func))
+        elif kind is python_ast.Attribute:
+            stack.extend((f".{item.attr}", item.value))
+        elif kind is python_ast.Lambda:
+            stack.extend((item.body, f"lambda {', '.join(argument.arg for argument in item.args.args)}: "))
+        elif kind is python_ast.Tuple or kind is python_ast.List:
+            elements = item.elts
+            closing = "]" if kind is python_ast.List else ",)" if len(elements) == 1 else ")"
+            stack.append(closing)
+            for index in range(len(elements) - 1, -1, -1):
+                stack.append(elements[index])
+                if index:
+                    stack.append(", ")
+            stack.append("[" if kind is python_ast.List else "(")
         else:
-            return str(ast)
+            raise CodeGenerationError(f"Cannot write out a {kind.__name__} expression")
+    return "".join(parts)
+
+def _push_binary(left: python_ast.expr, op: python_ast.AST, right: python_ast.expr, stack: list):
+    """Schedule a binary operation, parenthesizing operands only where precedence requires.
+
+    Pushed in reverse: the stack pops the left operand first. Operators
+    are left-associative, so a right operand of equal precedence needs
+    parentheses, and comparisons do not associate at all.
+    """
+    operator, precedence = OPERATORS[type(op)]
+    if _precedence(right) <= precedence:
+        stack.extend((")", right, f" {operator} ("))
+    else:
+        stack.extend((right, f" {operator} "))
+    if _precedence(left) < precedence or (precedence == 4 and type(left) is python_ast.Compare):
+        stack.extend((")", left, "("))
+    else:
+        stack.append(left)
+
+def _precedence(node: python_ast.expr) -> int:
+    """How tightly an expression binds; names, literals and calls bind tightest."""
+    kind = type(node)
+    if kind is python_ast.BinOp or kind is python_ast.UnaryOp or kind is python_ast.BoolOp:
+        return OPERATORS[type(node.op)][1]
+    if kind is python_ast.Compare:
+        return OPERATORS[type(node.ops[0])][1]
+    if kind is python_ast.Lambda:
+        return 0
+    if kind is python_ast.Constant and type(node.value) in (int, float) and node.value < 0:
+        return _NEGATIVE
+    return 100
+
+# An import statement, after preprocessing and removing strings and comments
+_IMPORT_STATEMENT = re.compile(r'import\s+([a-z_][a-z0-9_]*)\s*\.?')
+
+# String literals and comments, which may hold text that looks like an import
+_STRINGS_AND_COMMENTS = re.compile(r'"[^"]*"?|#[^\n]*')
 
 class NLangToPython:
     """High-level interface for converting NLang to Python."""
     
-    def __init__(self):
+    # Number of compiled programs kept by compile()
+    CODE_CACHE_SIZE = 256
+    
+    def __init__(self, optimize: bool = True, tracer: Optional[Tracer] = None, concurrent: bool = False):
         self.transpiler = NLangTranspiler()
+        self.parser = None
+        # Run independent top-level statements concurrently (see dataflow.py)
+        self.concurrent = concurrent
+        # Optimization pass run between parsing and code generation; None to disable
+        self.optimizer = NLangOptimizer() if optimize else None
+        # Receives per-stage timings (see tracing.py)
+        self.tracer = tracer or TRACER
+        self._preprocess = None
+        self._code_cache = OrderedDict()
+        # Guards the lazy front end and the code cache; everything else is per call
+        self._lock = threading.Lock()
     
-    def convert(self, nlang_code: str) -> str:
-        """Convert NLang code to Python."""
+    def _load_front_end(self):
+        """Import the parser module (and lark) and create the parser, on first use."""
         from .nlang_parser import NLangParser, preprocess_natural_language
         
-        # Preprocess natural language
-        processed_code = preprocess_natural_language(nlang_code)
+        with self._lock:
+            # Reuse one parser across calls. It builds dict ASTs, which the
+            # passes walk faster than compact nodes (see nodes.py)
+            if self.parser is None:
+                self.parser = NLangParser(tracer=self.tracer)
+            self._preprocess = preprocess_natural_language
+    
+    def _parse(self, nlang_code: str, errors: Optional[list] = None) -> list:
+        """Preprocess, parse and optimize a program into statements."""
+        if self._preprocess is None:
+            self._load_front_end()
+        
+        with self.tracer.stage("preprocess", chars=len(nlang_code)):
+            processed_code = self._preprocess(nlang_code)
+        return self.parse_processed(processed_code, errors)
+    
+    def parse_processed(self, processed_code: str, errors: Optional[list] = None) -> list:
+        """Parse and optimize preprocessed NLang into statements.
+        
+        transpile_statements() and compile_statements() both take the
+        result, so a caller wanting the source and the code object parses
+        only once.
+        """
+        if self._preprocess is None:
+            self._load_front_end()
+        
+        statements = self.parser.parse_program(processed_code, errors)
+        if self.optimizer is not None:
+            with self.tracer.stage("optimize", statements=len(statements)) as info:
+                statements = self.optimizer.optimize(statements)
+                info["kept"] = len(statements)
+        return statements
+    
+    def convert(self, nlang_code: str, errors: Optional[list] = None) -> str:
+        """Convert NLang code to Python.
+        
+        Statements that fail to parse are left out; their errors are
+        appended to ``errors`` when given, otherwise printed as warnings.
+        Safe to call from several threads at once.
+        """
+        with self.tracer.stage("convert"):
+            statements = self._parse(nlang_code, errors)
+            return self.transpile_statements(statements)
+    
+    def transpile_statements(self, statements: list) -> str:
+        """Python source for statements from parse_processed()."""
+        with self.tracer.stage("transpile", statements=len(statements)):
+            return self.transpiler.transpile_program(statements, self.concurrent)
+    
+    def to_module(self, nlang_code: str) -> python_ast.Module:
+        """Convert NLang code to a Python AST module."""
+        return self._generate(self._parse(nlang_code))
+    
+    def _generate(self, statements: list) -> python_ast.Module:
+        from .codegen import NLangCodeGenerator
+        
+        with self.tracer.stage("codegen", statements=len(statements)):
+            return NLangCodeGenerator().generate_program(statements, self.concurrent)
+    
+    def compile_statements(self, statements: list, filename: str = "<nlang>") -> CodeType:
+        """Compile statements from parse_processed() to a code object, bypassing the code cache."""
+        from .codegen import compile_module
+        
+        module = self._generate(statements)
+        with self.tracer.stage("bytecode"):
+            return compile_module(module, filename)
+    
+    def compile(self, nlang_code: str, filename: str = "<nlang>") -> CodeType:
+        """Compile NLang code straight to a Python code object.
+        
+        Goes through the AST backend, so no Python source is generated or
+        re-tokenized. Code objects are cached by source hash, filename and
+        domain packs, and line numbers in tracebacks refer to the NLang
+        source.
+        """
+        from .lexicon import active_signature
+        
+        with self.tracer.stage("compile") as info:
+            key = (hashlib.sha256(nlang_code.encode()).digest(), filename, active_signature())
+            with self._lock:
+                code = self._code_cache.get(key)
+                if code is not None:
+                    self._code_cache.move_to_end(key)
+            info["cache_hit"] = code is not None
+            if code is not None:
+                return code
+            
+            code = self.compile_statements(self._parse(nlang_code), filename)
+            with self._lock:
+                self._code_cache[key] = code
+                if len(self._code_cache) > self.CODE_CACHE_SIZE:
+                    self._code_cache.popitem(last=False)
+            return code
+    
+    def convert_stream(self, chunks: Iterable[str], imports: Optional[Iterable[str]] = None,
+                       errors: Optional[list] = None, batch_size: int = 1000) -> Iterator[str]:
+        """Convert NLang source read as a stream of text chunks, yielding Python lines.
         
-        # Parse into AST
-        parser = NLangParser()
-        statements = parser.parse_program(processed_code)
+        Statements are parsed and transpiled in batches of ``batch_size``, so
+        memory stays constant however long the input is. When ``imports``
+        is given (see scan_imports) those modules are hoisted into the
+        header and import statements are dropped from the body; otherwise
+        imports stay where they appear. The optimizer, if enabled, sees one
+        batch at a time and never removes imports, as a later batch may use
+        them.
+        """
+        from .incremental import iter_statements
+        
+        if self._preprocess is None:
+            self._load_front_end()
+        optimizer = None
+        if self.optimizer is not None:
+            optimizer = NLangOptimizer(
+                fold_constants=self.optimizer.fold_constants,
+                propagate_constants=self.optimizer.propagate_constants,
+                eliminate_dead_stores=self.optimizer.eliminate_dead_stores,
+                # Later batches may use the imports and loop variables of this one
+                remove_unused_imports=False,
+                vectorize_loops=False,
+            )
+        
+        yield from PROGRAM_HEADER
+        hoisted = imports is not None
+        if hoisted:
+            modules = sorted(set(imports))
+            for module in modules:
+                yield f"import {module}"
+            if modules:
+                yield ""
+        
+        # Effects of the procedures defined so far, which later batches may call
+        procedures = {}
+        batch = []
+        for statement in iter_statements(chunks):
+            batch.append(statement)
+            if len(batch) >= batch_size:
+                yield from self._convert_batch(batch, hoisted, errors, optimizer, procedures)
+                batch = []
+        if batch:
+            yield from self._convert_batch(batch, hoisted, errors, optimizer, procedures)
+    
+    def _convert_batch(self, batch: List[tuple], skip_imports: bool, errors: Optional[list],
+                       optimizer, procedures: dict) -> Iterator[str]:
+        """Parse and transpile a batch of (statement text, line) pairs in one parser call."""
+        from .nlang_parser import ParseError, preprocess_natural_language
+        from .incremental import _LARK_POSITION
         
-        # Transpile to Python
-        python_code = self.transpiler.transpile_program(statements)
+        # Rebuild the batch's text with the original line breaks so error lines can be re-based
+        first_line = batch[0][1]
+        pieces = []
+        line = first_line
+        for statement_text, start in batch:
+            pieces.append('\n' * (start - line) if start > line else ' ')
+            pieces.append(statement_text)
+            line = start + statement_text.count('\n')
+        
+        batch_errors = []
+        statements = self.parser.parse_program(preprocess_natural_language(''.join(pieces)), batch_errors)
+        for error in batch_errors:
+            line = (error.line or 1) + first_line - 1
+            error = ParseError(_LARK_POSITION.sub(f"line {line},", error.message, count=1), line)
+            if errors is None:
+                print(f"Warning: Could not parse statement: {error}")
+            else:
+                errors.append(error)
+        
+        if optimizer is not None:
+            statements = optimizer.optimize(statements, procedures)
+        procedures.update(check_program(statements, procedures))
+        
+        for statement in statements:
+            if skip_imports and statement.get("type") == "import":
+                continue
+            python_code = self.transpiler.transpile(statement)
+            if python_code:
+                yield python_code
+    
+    def scan_imports(self, chunks: Iterable[str]) -> List[str]:
+        """Header pass: collect the modules a program imports, without parsing it."""
+        from .nlang_parser import preprocess_natural_language
+        from .incremental import iter_statements
+        from .lexicon import active_lexicon
+        
+        # A domain pack may define phrases that stand for imports
+        every_statement = active_lexicon() is not None
+        modules = set()
+        for statement_text, _ in iter_statements(chunks):
+            # No built-in phrase rewrites to "import", so most statements are skipped cheaply
+            if not every_statement and 'import' not in statement_text.lower():
+                continue
+            code = _STRINGS_AND_COMMENTS.sub('', preprocess_natural_language(statement_text))
+            match = _IMPORT_STATEMENT.fullmatch(code.strip())
+            if match:
+                modules.add(match.group(1))
+        return sorted(modules)
+    
+    def convert_file(self, source_path: str, target_path: str, errors: Optional[list] = None):
+        """Transpile one file into another in constant memory.
         
-        return python_code 
\ No newline at end of file
+        The source is read twice: once by scan_imports() to build the
+        import header, then streamed through convert_stream().
+        """
+        with open(source_path, 'r') as source:
+            imports = self.scan_imports(source)
+        with open(source_path, 'r') as source, open(target_path, 'w') as target:
+            for python_line in self.convert_stream(source, imports=imports, errors=errors):
+                target.write(python_line + "\n")